@@ -26,10 +26,10 @@ def get_sources_with_unread() -> List[Dict[str, Any]]:
     return [s for s in r.json() if s.get('unread_count', 0) > 0]
 
 
-def get_digest(date: str = None) -> Dict[str, Any]:
-    """获取指定日期的日报"""
+def get_digest(date: str = None, top: int = 5) -> Dict[str, Any]:
+    """获取指定日期的日报，每个分类只取综合排名前 top 条"""
     date = date or datetime.utcnow().strftime("%Y-%m-%d")
-    r = httpx.get(f"{RSS_API_BASE}/digest", params={"date": date})
+    r = httpx.get(f"{RSS_API_BASE}/digest", params={"date": date, "top": top, "rank": "score"})
     return r.json()
 
 
@@ -65,8 +65,13 @@ def clean_summary(text: str, max_words: int = 100) -> str:
 
 def format_digest_report(summary_data: Dict) -> str:
     """格式化日报报告"""
-    entries = summary_data.get('entries', [])
     categories = summary_data.get('categories', {})
+    # 各分类已由后端按综合分排好，精选部分取全局综合分最高的条目
+    entries = sorted(
+        (entry for cat_entries in categories.values() for entry in cat_entries),
+        key=lambda entry: entry.get('score') or 0,
+        reverse=True,
+    )
     
     if not entries:
         return "📭 今日暂无新内容更新"
@@ -78,7 +83,7 @@ def format_digest_report(summary_data: Dict) -> str:
     # 按分类展示
     for category, cat_entries in categories.items():
         report += f"### 📁 {category}\n\n"
-        for entry in cat_entries[:5]:  # 每类最多5条
+        for entry in cat_entries:
             report += f"**{entry['title'][:60]}...**\n\n"
             report += f"> {clean_summary(entry.get('summary', ''), 50)}\n\n"
         report += "\n"
@@ -91,7 +96,7 @@ def format_digest_report(summary_data: Dict) -> str:
         report += f"> 来源: {item['source']}\n\n"
         report += f">{item['summary']}\n\n"
     
-    report += f"\n💡 共收录 {len(entries)} 条更新，来源: {', '.join(set(e.get('source_title', '') for e in entries))}"
+    report += f"\n💡 共收录 {summary_data.get('total', len(entries))} 条更新，来源: {', '.join(set(e.get('source_title', '') for e in entries))}"
     
     return report
 
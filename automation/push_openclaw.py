@@ -1,18 +1,27 @@
 import json
 import os
 from datetime import datetime
+from zoneinfo import ZoneInfo
 
 import httpx
 
 API_BASE = os.getenv("RSS_API_BASE", "http://localhost:8000")
 OPENCLAW_WEBHOOK = os.getenv("OPENCLAW_WEBHOOK")
+# 每个分类推送的条目数，按综合排名由后端挑选
+PUSH_TOP = int(os.getenv("PUSH_TOP", "5"))
+# 推送哪个时区的“今天”，如 Asia/Shanghai
+DIGEST_TZ = os.getenv("DIGEST_TZ", "UTC")
 
 
 def main() -> None:
     if not OPENCLAW_WEBHOOK:
         raise SystemExit("请设置 OPENCLAW_WEBHOOK 环境变量")
-    target_date = datetime.utcnow().strftime("%Y-%m-%d")
-    digest = httpx.get(f"{API_BASE}/digest?date={target_date}", timeout=20).json()
+    target_date = datetime.now(ZoneInfo(DIGEST_TZ)).strftime("%Y-%m-%d")
+    digest = httpx.get(
+        f"{API_BASE}/digest",
+        params={"date": target_date, "tz": DIGEST_TZ, "top": PUSH_TOP, "rank": "score"},
+        timeout=20,
+    ).json()
     payload = {
         "type": "rss-daily-digest",
         "date": digest.get("date"),
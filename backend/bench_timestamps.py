@@ -0,0 +1,88 @@
+# 日期解析压测
+# 用真实 Feed 中常见的日期写法，对比 dateutil.parser.parse 与 timestamps.parse_timestamp
+# (冷缓存 = 每个字符串都不同，热缓存 = 重复拉取同一批 Feed)
+#
+#   python bench_timestamps.py --items 200000
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser as date_parser
+
+import timestamps
+
+# 各类 Feed 生成器的实际输出格式 (WordPress、Blogger、Medium、GitHub、Substack、Hugo、Jekyll、YouTube、旧式 RSS 等)
+FORMATS = [
+    "%a, %d %b %Y %H:%M:%S +0000",
+    "%a, %d %b %Y %H:%M:%S GMT",
+    "%a, %d %b %Y %H:%M:%S -0700",
+    "%a, %d %b %Y %H:%M:%S +0800",
+    "%a, %d %b %Y %H:%M:%S EST",
+    "%a, %d %b %Y %H:%M:%S PDT",
+    "%a, %d %b %Y %H:%M:%S Z",
+    "%a, %d %b %Y %H:%M GMT",
+    "%d %b %Y %H:%M:%S +0100",
+    "%a, %d %b %y %H:%M:%S GMT",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%dT%H:%M:%S+00:00",
+    "%Y-%m-%dT%H:%M:%S-05:00",
+    "%Y-%m-%dT%H:%M:%S.%f+08:00",
+    "%Y-%m-%dT%H:%M:%S+0900",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+    "%A, %d %B %Y %H:%M:%S +0200",
+    "%B %d, %Y",
+]
+
+
+def corpus(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    values = []
+    for _ in range(count):
+        moment = start + timedelta(seconds=rng.randrange(10 * 365 * 86400), microseconds=rng.randrange(10**6))
+        values.append(moment.strftime(rng.choice(FORMATS)))
+    return values
+
+
+def dateutil_parse(value: str):
+    parsed = date_parser.parse(value, tzinfos=timestamps._DATEUTIL_ZONES)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def run(name: str, parse, values: list) -> float:
+    started = time.perf_counter()
+    for value in values:
+        parse(value)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<28} {len(values) / elapsed:>12,.0f} dates/s  ({elapsed * 1e6 / len(values):.2f} us/date)")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark feed timestamp parsing")
+    parser.add_argument("--items", type=int, default=200_000)
+    args = parser.parse_args()
+
+    values = corpus(args.items)
+    mismatches = sum(1 for value in values[:5000] if timestamps.parse_timestamp(value) != dateutil_parse(value))
+    print(f"{len(FORMATS)} formats, {len(values)} dates, mismatches vs dateutil in first 5000: {mismatches}")
+
+    baseline = run("dateutil.parser.parse", dateutil_parse, values)
+    timestamps._parse.cache_clear()
+    cold = run("parse_timestamp (cold)", timestamps.parse_timestamp, values)
+    repeated = values[: timestamps.CACHE_SIZE]
+    for value in repeated:
+        timestamps.parse_timestamp(value)
+    warm = run("parse_timestamp (cached)", timestamps.parse_timestamp, repeated)
+    warm *= len(values) / len(repeated)
+    print(f"speedup: {baseline / cold:.1f}x cold, {baseline / warm:.1f}x cached")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from fingerprint import tokenize
+from snapshots import SnapshotCache
+
+N_FEATURES = 1 << 18
+SIMILARITY_THRESHOLD = 0.3
+MIN_CLUSTER_SIZE = 2
+LABEL_TERMS = 3
+OTHER_TOPIC = "其他"
+
+# 过于常见、对主题没有区分度的词
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "with", "is", "are",
+    "was", "were", "be", "by", "at", "as", "it", "its", "this", "that", "from", "we",
+    "you", "our", "your", "has", "have", "will", "can", "not", "but", "how", "what",
+    "new", "via", "about", "more", "into", "than", "his", "her", "they", "their",
+}
+
+
+@dataclass
+class Topic:
+    cluster_id: int
+    label: str
+    size: int
+
+
+def _feature(token: str) -> Tuple[int, float]:
+    """特征哈希：crc32 决定列号，最高位决定符号以抵消碰撞"""
+    value = zlib.crc32(token.encode("utf-8"))
+    return value % N_FEATURES, 1.0 if value >> 31 else -1.0
+
+
+def build_matrix(documents: Sequence[str]) -> Tuple[sparse.csr_matrix, Dict[int, str]]:
+    """哈希 TF-IDF 矩阵 (行已 L2 归一化)，同时返回列号到代表词的映射用于生成标签"""
+    rows: List[int] = []
+    cols: List[int] = []
+    values: List[float] = []
+    names: Dict[int, str] = {}
+    for row, document in enumerate(documents):
+        counts = Counter(token for token in tokenize(document) if token not in _STOPWORDS)
+        for token, count in counts.items():
+            col, sign = _feature(token)
+            rows.append(row)
+            cols.append(col)
+            values.append(sign * (1.0 + np.log(count)))
+            names.setdefault(col, token)
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, cols)),
+        shape=(len(documents), N_FEATURES),
+    )
+    matrix.sum_duplicates()
+
+    # IDF 只在当天的文档集合上计算
+    df = np.bincount(matrix.indices, minlength=N_FEATURES).astype(np.float32)
+    idf = np.log((1.0 + len(documents)) / (1.0 + df)) + 1.0
+    matrix = matrix.multiply(idf[np.newaxis, :]).tocsr()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    matrix = sparse.diags(1.0 / norms).dot(matrix).tocsr()
+    return matrix, names
+
+
+def star_cluster(matrix: sparse.csr_matrix, threshold: float = SIMILARITY_THRESHOLD) -> np.ndarray:
+    """
+    星形聚类：相似度图上反复取度数最高的未分配节点作为中心，吸收其未分配邻居。
+    与连通分量相比不会因为链式相似把无关条目串成一个大簇。
+    """
+    count = matrix.shape[0]
+    labels = np.full(count, -1, dtype=np.int64)
+    if count == 0:
+        return labels
+
+    similarity = (matrix @ matrix.T).tocsr()
+    similarity.data[similarity.data < threshold] = 0
+    similarity.eliminate_zeros()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    degree = np.diff(similarity.indptr)
+    cluster = 0
+    for center in np.argsort(-degree, kind="stable"):
+        if labels[center] != -1:
+            continue
+        neighbors = similarity.indices[similarity.indptr[center]:similarity.indptr[center + 1]]
+        labels[center] = cluster
+        free = neighbors[labels[neighbors] == -1]
+        labels[free] = cluster
+        cluster += 1
+    return labels
+
+
+def _label(matrix: sparse.csr_matrix, members: np.ndarray, names: Dict[int, str]) -> str:
+    """取簇内权重最高的几个词作为主题名，只在簇内出现过的列上累加"""
+    block = matrix[members]
+    cols, inverse = np.unique(block.indices, return_inverse=True)
+    weights = np.bincount(inverse, weights=np.abs(block.data))
+    terms = [names[col] for col in cols[np.argsort(-weights, kind="stable")[:LABEL_TERMS]] if col in names]
+    return " / ".join(terms) or OTHER_TOPIC
+
+
+def cluster_documents(documents: Sequence[str]) -> List[Topic]:
+    """返回与输入一一对应的主题；过小的簇统一归入“其他”"""
+    if not documents:
+        return []
+    matrix, names = build_matrix(documents)
+    labels = star_cluster(matrix)
+    sizes = np.bincount(labels)
+
+    topics: Dict[int, Topic] = {}
+    other = Topic(cluster_id=-1, label=OTHER_TOPIC, size=int(np.sum(sizes[labels] < MIN_CLUSTER_SIZE)))
+    result: List[Topic] = []
+    for cluster in labels:
+        if sizes[cluster] < MIN_CLUSTER_SIZE:
+            result.append(other)
+            continue
+        if cluster not in topics:
+            members = np.flatnonzero(labels == cluster)
+            topics[cluster] = Topic(cluster_id=int(cluster), label=_label(matrix, members, names), size=int(sizes[cluster]))
+        result.append(topics[cluster])
+    return result
+
+
+# 按 (日期, 时区) 缓存聚类结果，最多保留 TOPIC_CACHE_DAYS 个键；当天条目或摘要变化时签名随之变化
+TOPIC_CACHE_DAYS = int(os.getenv("TOPIC_CACHE_DAYS", "62"))
+_cache: "SnapshotCache[Dict[int, Topic]]" = SnapshotCache(TOPIC_CACHE_DAYS)
+
+
+def topics_for_date(date: str, items: Sequence[Tuple[int, str]]) -> Dict[int, Topic]:
+    """items 为 (entry_id, 文本)，返回 entry_id -> Topic"""
+    signature = hashlib.sha1(
+        "\x1f".join(f"{entry_id}:{text}" for entry_id, text in items).encode("utf-8")
+    ).hexdigest()
+    cached = _cache.get(date, signature)
+    if cached is not None:
+        return cached
+    topics = cluster_documents([text for _, text in items])
+    assignments = {entry_id: topic for (entry_id, _), topic in zip(items, topics)}
+    _cache.put(date, signature, assignments)
+    return assignments
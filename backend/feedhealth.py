@@ -0,0 +1,79 @@
+import os
+import time
+from typing import Any, Dict, Optional
+
+from storage import SourceHealth
+
+# 单个源的拉取超时：按历史平均耗时的倍数估算，限定在上下限之间；没有历史时用默认值
+FETCH_TIMEOUT_DEFAULT = float(os.getenv("FETCH_TIMEOUT_DEFAULT", "20"))
+FETCH_TIMEOUT_MIN = float(os.getenv("FETCH_TIMEOUT_MIN", "5"))
+FETCH_TIMEOUT_MAX = float(os.getenv("FETCH_TIMEOUT_MAX", "30"))
+FETCH_TIMEOUT_FACTOR = 4.0
+# 一次 ingest 拉取阶段的总时限，超时仍未返回的源记为 straggler，不再等待
+INGEST_DEADLINE = float(os.getenv("INGEST_DEADLINE", "60"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+
+# 连续失败后的退避：BACKOFF_BASE * 2^(n-1)，最长 BACKOFF_MAX；连续失败 QUARANTINE_AFTER 次进入隔离
+BACKOFF_BASE = int(os.getenv("FETCH_BACKOFF_BASE", "300"))
+BACKOFF_MAX = int(os.getenv("FETCH_BACKOFF_MAX", str(24 * 3600)))
+QUARANTINE_AFTER = int(os.getenv("FETCH_QUARANTINE_AFTER", "8"))
+
+
+def fetch_timeout(health: Optional[SourceHealth]) -> float:
+    if health is None or health.avg_latency_ms is None:
+        return FETCH_TIMEOUT_DEFAULT
+    estimate = health.avg_latency_ms / 1000 * FETCH_TIMEOUT_FACTOR
+    return min(max(estimate, FETCH_TIMEOUT_MIN), FETCH_TIMEOUT_MAX)
+
+
+def backoff_seconds(consecutive_failures: int) -> int:
+    if consecutive_failures <= 0:
+        return 0
+    if consecutive_failures >= QUARANTINE_AFTER:
+        return BACKOFF_MAX
+    return min(BACKOFF_BASE * 2 ** (consecutive_failures - 1), BACKOFF_MAX)
+
+
+def next_attempt_after_failure(health: Optional[SourceHealth], now: Optional[float] = None) -> int:
+    failures = (health.consecutive_failures if health else 0) + 1
+    return int((now or time.time()) + backoff_seconds(failures))
+
+
+def next_attempt_after_deferral(now: Optional[float] = None) -> int:
+    """软失败只推迟一个基础退避周期，不随次数增长"""
+    return int((now or time.time()) + BACKOFF_BASE)
+
+
+def is_due(health: Optional[SourceHealth], now: Optional[float] = None) -> bool:
+    return health is None or not health.next_attempt_ts or health.next_attempt_ts <= (now or time.time())
+
+
+def status(health: Optional[SourceHealth]) -> str:
+    """unknown / ok / deferred / backoff / quarantined"""
+    if health is None:
+        return "unknown"
+    if health.consecutive_failures >= QUARANTINE_AFTER:
+        return "quarantined"
+    if health.consecutive_failures:
+        return "backoff"
+    if not is_due(health):
+        return "deferred"
+    return "ok"
+
+
+def describe(health: Optional[SourceHealth]) -> Dict[str, Any]:
+    """/sources/meta 中的 health 字段"""
+    next_attempt_ts = health.next_attempt_ts if health else None
+    return {
+        "status": status(health),
+        "consecutive_failures": health.consecutive_failures if health else 0,
+        "avg_latency_ms": round(health.avg_latency_ms) if health and health.avg_latency_ms is not None else None,
+        "last_success_at": health.last_success_at if health else None,
+        "last_failure_at": health.last_failure_at if health else None,
+        "last_error": health.last_error if health else None,
+        "next_attempt_at": (
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(next_attempt_ts))
+            if next_attempt_ts and next_attempt_ts > time.time() else None
+        ),
+        "timeout_seconds": fetch_timeout(health),
+    }
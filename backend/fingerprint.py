@@ -0,0 +1,85 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Iterable, List
+
+SIMHASH_BITS = 64
+# 64 位拆成 4 段 16 位：汉明距离 <= 3 的两个指纹至少有一段完全相同 (鸽巢原理)
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+NEAR_DUPLICATE_DISTANCE = 3
+# 太短的文本指纹不稳定，不参与近似去重
+MIN_FINGERPRINT_TOKENS = 8
+
+_TAG = re.compile(r"<[^>]+>")
+_WORD = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+_CJK_RUN = re.compile(r"[㐀-䶿一-鿿぀-ヿ가-힯]+")
+
+
+def strip_html(text: str) -> str:
+    return " ".join(_TAG.sub(" ", text).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """英文按词切分，中日韩文本按相邻两字 (bigram) 切分"""
+    lowered = strip_html(text).lower()
+    tokens = _WORD.findall(_CJK_RUN.sub(" ", lowered))
+    for run in _CJK_RUN.findall(lowered):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(tokens: Iterable[str]) -> int:
+    """按词频加权的 64 位 SimHash"""
+    weights = [0] * SIMHASH_BITS
+    for token, count in Counter(tokens).items():
+        value = _hash64(token)
+        for bit in range(SIMHASH_BITS):
+            if value >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+    result = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            result |= 1 << bit
+    return result
+
+
+def text_simhash(title: str, content: str) -> int | None:
+    tokens = tokenize(f"{title} {content}")
+    if len(tokens) < MIN_FINGERPRINT_TOKENS:
+        return None
+    return simhash(tokens)
+
+
+def content_hash(title: str, content: str) -> int:
+    """标题 + 正文的精确指纹 (忽略空白差异)，用于识别 feed 对已有条目的修改"""
+    normalized = " ".join(f"{title}\x1f{content}".split())
+    return to_signed(int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "big"))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+
+def band_keys(value: int) -> List[int]:
+    """LSH 分段键，供索引表按 (band, key) 精确查找候选"""
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (band * BAND_BITS)) & mask for band in range(SIMHASH_BANDS)]
+
+
+def to_signed(value: int) -> int:
+    """SQLite INTEGER 是有符号 64 位"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
@@ -1,18 +1,64 @@
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
 import os
-import asyncio
+import time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import httpx
 import feedparser
-from dateutil import parser as date_parser
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
+import feedhealth
+import ranking
+import storage
+import vector_index
+from clustering import topics_for_date
+from fingerprint import content_hash, text_simhash
+from storage import (
+    Entry,
+    Source,
+    SourceHealth,
+    add_entries,
+    add_source,
+    delete_source,
+    entry_signatures,
+    find_by_link_hashes,
+    find_near_duplicate,
+    get_entries,
+    get_source_health,
+    get_source_map,
+    init_db,
+    list_entries_between,
+    list_entry_texts_after,
+    list_sources,
+    list_sources_with_meta,
+    mark_entry_read,
+    record_fetch_deferred,
+    record_fetch_failure,
+    record_fetch_success,
+    search_entries,
+    set_source_weight,
+    update_entry_content,
+)
+from snapshots import SnapshotCache
+from summarizer import SUMMARY_SERVICE_URL, summarize_text
+from timestamps import parse_timestamp, to_epoch
+from urlnorm import item_link, link_hash
+from vector_index import embed, get_index
+
 # 配置外部服务地址
-SUMMARY_SERVICE_URL = os.getenv("SUMMARY_SERVICE_URL", "http://localhost:8001")
 SOURCE_SERVICE_URL = os.getenv("SOURCE_SERVICE_URL", "http://localhost:8002")
+FEED_USER_AGENT = os.getenv("FEED_USER_AGENT", "AntiLLMade/1.0 (+https://github.com/YiJing233/AntiLLMade)")
+# 缓存的日报快照天数 (日报、区间日报与周报共用)；区间日报最长天数
+DIGEST_SNAPSHOT_DAYS = int(os.getenv("DIGEST_SNAPSHOT_DAYS", "62"))
+MAX_RANGE_DAYS = 92
+# 日报按哪个时区划分一天 (请求可用 tz 覆盖)
+DIGEST_TZ = os.getenv("DIGEST_TZ", "UTC")
 
 app = FastAPI(title="AI RSS Digest")
 
@@ -35,6 +81,11 @@ class SourceCreate(BaseModel):
     url: str
     title: str
     category: str = Field(default="默认")
+    weight: float = Field(default=1.0, ge=0)
+
+
+class SourceWeight(BaseModel):
+    weight: float = Field(ge=0)
 
 
 class DigestEntry(BaseModel):
@@ -47,34 +98,52 @@ class DigestEntry(BaseModel):
     summary: str
     content: str
     unread: bool
+    # 多个来源转载的同一故事合并为一条
+    sources: List[str] = Field(default_factory=list)
+    duplicate_count: int = 0
+    topic: Optional[str] = None
+    # rank=score 时的综合分
+    score: Optional[float] = None
 
 
 class DailyDigest(BaseModel):
     date: str
+    tz: str = "UTC"
     total: int
     categories: Dict[str, List[DigestEntry]]
 
 
+class CategoryRollup(BaseModel):
+    total: int
+    unread: int
+    items: List[DigestEntry]
+
+
+class RangeDigest(BaseModel):
+    start: str
+    end: str
+    tz: str = "UTC"
+    total: int
+    # 每天的条目数
+    days: Dict[str, int]
+    categories: Dict[str, CategoryRollup]
+
+
+class EntryMatch(BaseModel):
+    id: int
+    title: str
+    link: str
+    published_at: str
+    source_title: str
+    category: str
+    summary: str
+    score: float
+
+
 # =====================================
 # 外部服务调用 (迭代 1)
 # =====================================
 
-async def summarize_text(content: str) -> str:
-    """调用外部 Summary Service"""
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{SUMMARY_SERVICE_URL}/summarize",
-                json={"text": content, "use_cache": True},
-            )
-            response.raise_for_status()
-            return response.json()["summary"]
-    except Exception as e:
-        print(f"Summary service error: {e}, falling back to text truncation")
-        from textwrap import shorten
-        return shorten(content, width=240, placeholder="...")
-
-
 async def fetch_sources() -> List[Dict]:
     """调用外部 Source Service 获取订阅源列表"""
     try:
@@ -88,209 +157,44 @@ async def fetch_sources() -> List[Dict]:
 
 
 # =====================================
-# 内部存储层 (保留向后兼容)
+# 向量索引 (语义检索 / 相关条目)
 # =====================================
 
-import sqlite3
-from contextlib import contextmanager
-from dataclasses import dataclass
-from typing import Iterable
-
-# Railway 持久化存储
-if os.getenv("RAILWAY_VOLUME_MOUNT_PATH"):
-    DB_PATH = os.path.join(os.getenv("RAILWAY_VOLUME_MOUNT_PATH"), "rss_app.db")
-else:
-    DB_PATH = "./rss_app.db"
-
-
-@dataclass
-class Source:
-    id: int
-    url: str
-    title: str
-    category: str
-
-
-@dataclass
-class Entry:
-    id: int
-    source_id: int
-    title: str
-    link: str
-    published_at: datetime
-    summary: str
-    content: str
-    unread: bool
-
-
-@contextmanager
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.commit()
-        conn.close()
-
-
-def init_db() -> None:
-    with get_conn() as conn:
-        conn.executescript("""
-            CREATE TABLE IF NOT EXISTS sources (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT NOT NULL UNIQUE,
-                title TEXT NOT NULL,
-                category TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source_id INTEGER NOT NULL,
-                title TEXT NOT NULL,
-                link TEXT NOT NULL,
-                published_at TEXT NOT NULL,
-                summary TEXT NOT NULL,
-                content TEXT NOT NULL,
-                unread INTEGER NOT NULL DEFAULT 1,
-                UNIQUE(source_id, link),
-                FOREIGN KEY(source_id) REFERENCES sources(id)
-            );
-        """)
-        try:
-            conn.execute("ALTER TABLE entries ADD COLUMN unread INTEGER NOT NULL DEFAULT 1")
-        except sqlite3.OperationalError:
-            pass
-
-
-def add_source(url: str, title: str, category: str) -> Source:
-    with get_conn() as conn:
-        cursor = conn.execute(
-            "INSERT OR IGNORE INTO sources (url, title, category) VALUES (?, ?, ?)",
-            (url, title, category),
-        )
-        if cursor.lastrowid:
-            source_id = cursor.lastrowid
-        else:
-            source_id = conn.execute(
-                "SELECT id FROM sources WHERE url = ?", (url,)
-            ).fetchone()["id"]
-        row = conn.execute(
-            "SELECT id, url, title, category FROM sources WHERE id = ?",
-            (source_id,),
-        ).fetchone()
-        return Source(**row)
-
-
-def list_sources() -> List[Source]:
-    with get_conn() as conn:
-        rows = conn.execute(
-            "SELECT id, url, title, category FROM sources ORDER BY id DESC"
-        ).fetchall()
-        return [Source(**row) for row in rows]
-
-
-def delete_source(source_id: int) -> None:
-    with get_conn() as conn:
-        conn.execute("DELETE FROM sources WHERE id = ?", (source_id,))
-
-
-def add_entries(entries: Iterable[Entry]) -> int:
-    inserted = 0
-    with get_conn() as conn:
-        for entry in entries:
-            cursor = conn.execute(
-                """
-                INSERT OR IGNORE INTO entries (
-                    source_id, title, link, published_at, summary, content, unread
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    entry.source_id,
-                    entry.title,
-                    entry.link,
-                    entry.published_at.isoformat(),
-                    entry.summary,
-                    entry.content,
-                    1 if entry.unread else 0,
-                ),
-            )
-            if cursor.rowcount:
-                inserted += 1
-    return inserted
-
-
-def list_entries_by_date(date_str: str) -> List[Entry]:
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT id, source_id, title, link, published_at, summary, content, unread
-            FROM entries
-            WHERE date(published_at) = date(?)
-            ORDER BY published_at DESC
-            """,
-            (date_str,),
-        ).fetchall()
-        entries: List[Entry] = []
-        for row in rows:
-            entries.append(
-                Entry(
-                    id=row["id"],
-                    source_id=row["source_id"],
-                    title=row["title"],
-                    link=row["link"],
-                    published_at=datetime.fromisoformat(row["published_at"]),
-                    summary=row["summary"],
-                    content=row["content"],
-                    unread=bool(row["unread"]),
-                )
+def sync_vector_index(batch_size: int = 1000) -> int:
+    """把索引之后新增的条目写入本地向量索引"""
+    index = get_index(storage.DB_PATH)
+    added = 0
+    # 读 max_id 与追加必须在同一把锁内，否则并发请求会把同一批条目追加两次
+    with vector_index.lock:
+        while True:
+            rows = list_entry_texts_after(index.max_id, limit=batch_size)
+            if not rows:
+                return added
+            added += index.add_many((entry_id, embed(text)) for entry_id, text in rows)
+
+
+def _to_matches(scored: List[tuple[int, float]]) -> List[EntryMatch]:
+    entries = get_entries([entry_id for entry_id, _ in scored])
+    sources = get_source_map()
+    matches: List[EntryMatch] = []
+    for entry_id, score in scored:
+        entry = entries.get(entry_id)
+        source = sources.get(entry.source_id) if entry else None
+        if not source:
+            continue
+        matches.append(
+            EntryMatch(
+                id=entry.id,
+                title=entry.title,
+                link=entry.link,
+                published_at=entry.published_at.isoformat(),
+                source_title=source.title,
+                category=source.category,
+                summary=entry.summary,
+                score=round(score, 4),
             )
-        return entries
-
-
-def mark_entry_read(entry_id: int) -> None:
-    with get_conn() as conn:
-        conn.execute("UPDATE entries SET unread = 0 WHERE id = ?", (entry_id,))
-
-
-def list_sources_with_meta() -> List[dict]:
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT
-                sources.id,
-                sources.url,
-                sources.title,
-                sources.category,
-                SUM(CASE WHEN entries.unread = 1 THEN 1 ELSE 0 END) AS unread_count,
-                MAX(entries.published_at) AS latest_entry_at
-            FROM sources
-            LEFT JOIN entries ON sources.id = entries.source_id
-            GROUP BY sources.id
-            ORDER BY sources.id DESC
-            """
-        ).fetchall()
-        results = []
-        for row in rows:
-            unread_count = row["unread_count"] or 0
-            results.append({
-                "id": row["id"],
-                "url": row["url"],
-                "title": row["title"],
-                "category": row["category"],
-                "unread_count": unread_count,
-                "has_unread": unread_count > 0,
-                "latest_entry_at": row["latest_entry_at"],
-            })
-        return results
-
-
-def get_source_map() -> dict[int, Source]:
-    with get_conn() as conn:
-        rows = conn.execute(
-            "SELECT id, url, title, category FROM sources"
-        ).fetchall()
-        return {row["id"]: Source(**row) for row in rows}
+        )
+    return matches
 
 
 # =====================================
@@ -300,6 +204,7 @@ def get_source_map() -> dict[int, Source]:
 @app.on_event("startup")
 def startup() -> None:
     init_db()
+    sync_vector_index()
 
 
 @app.get("/health")
@@ -308,7 +213,7 @@ def health() -> Dict[str, str]:
 
 
 @app.get("/")
-def root() -> Dict[str, str]:
+def root() -> Dict[str, Any]:
     return {
         "status": "ok",
         "message": "AntiLLMade RSS API (Monolithic)",
@@ -328,12 +233,24 @@ def sources() -> List[Dict[str, Any]]:
 
 @app.get("/sources/meta")
 def sources_meta() -> List[Dict[str, Any]]:
-    return list_sources_with_meta()
+    health = get_source_health()
+    return [
+        {**meta, "health": feedhealth.describe(health.get(meta["id"]))}
+        for meta in list_sources_with_meta()
+    ]
 
 
 @app.post("/sources")
 def create_source(payload: SourceCreate) -> Dict[str, Any]:
-    source = add_source(payload.url, payload.title, payload.category)
+    source = add_source(payload.url, payload.title, payload.category, payload.weight)
+    return source.__dict__
+
+
+@app.put("/sources/{source_id}/weight")
+def update_source_weight(source_id: int, payload: SourceWeight) -> Dict[str, Any]:
+    source = set_source_weight(source_id, payload.weight)
+    if source is None:
+        raise HTTPException(status_code=404, detail="订阅源不存在")
     return source.__dict__
 
 
@@ -349,62 +266,535 @@ def mark_read(entry_id: int) -> Dict[str, str]:
     return {"status": "read"}
 
 
+@app.get("/entries/{entry_id}/related", response_model=List[EntryMatch])
+def related_entries(entry_id: int, limit: int = 5) -> List[EntryMatch]:
+    """本地向量索引上的近邻条目"""
+    limit = max(limit, 1)
+    sync_vector_index()
+    index = get_index(storage.DB_PATH)
+    vector = index.vector_of(entry_id)
+    if vector is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    return _to_matches(index.search(vector, k=limit, exclude=entry_id))
+
+
+@app.get("/search", response_model=List[EntryMatch])
+def search(
+    q: str,
+    mode: Literal["keyword", "semantic"] = "keyword",
+    limit: int = 20,
+) -> List[EntryMatch]:
+    limit = max(limit, 1)
+    if mode == "semantic":
+        sync_vector_index()
+        return _to_matches(get_index(storage.DB_PATH).search(embed(q), k=limit))
+    return _to_matches([(entry.id, 1.0) for entry in search_entries(q, limit)])
+
+
+def download_feed(url: str, timeout: float) -> Tuple[bytes, Dict[str, str]]:
+    """
+    下载 Feed，返回 (响应体, 供 feedparser 判断编码与基准地址的响应头)。
+    timeout 既是连接 / 读取的套接字超时，也是整次下载的时限，拉取线程不会无限挂起。
+    """
+    deadline = time.monotonic() + timeout
+    with httpx.stream(
+        "GET", url, timeout=timeout, follow_redirects=True, headers={"User-Agent": FEED_USER_AGENT}
+    ) as response:
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        chunks = []
+        for chunk in response.iter_bytes():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"timeout after {timeout:.0f}s")
+            chunks.append(chunk)
+        headers = {"content-location": str(response.url)}
+        if "content-type" in response.headers:
+            headers["content-type"] = response.headers["content-type"]
+    return b"".join(chunks), headers
+
+
+class _FetchTask:
+    def __init__(self, source: Source, timeout: float):
+        self.source = source
+        self.timeout = timeout
+        self.started: Optional[float] = None
+
+    def run(self) -> Any:
+        self.started = time.monotonic()
+        body, headers = download_feed(self.source.url, self.timeout)
+        feed = feedparser.parse(body, response_headers=headers)
+        if getattr(feed, "bozo", False) and not feed.entries:
+            raise RuntimeError(f"unreadable feed: {getattr(feed, 'bozo_exception', 'parse error')}")
+        return feed
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000 if self.started else 0.0
+
+
+def _fetch_feeds(
+    sources: List[Source], health: Dict[int, SourceHealth]
+) -> Tuple[List[Tuple[Source, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    并发拉取，每个源有各自的超时，整个阶段不超过 INGEST_DEADLINE。
+    返回 (成功的 (source, feed)，失败列表，straggler 列表)；超时与失败计入健康记录。
+    因总时限未等到的源记为软失败：不累计连续失败次数，但推迟到下一个退避周期再拉取，
+    让总在队尾的源不会每次都占满时限。
+    """
+    if not sources:
+        return [], [], []
+    deadline = time.monotonic() + feedhealth.INGEST_DEADLINE
+    executor = ThreadPoolExecutor(max_workers=min(feedhealth.FETCH_CONCURRENCY, len(sources)))
+    futures: Dict[Future, _FetchTask] = {}
+    for source in sources:
+        task = _FetchTask(source, feedhealth.fetch_timeout(health.get(source.id)))
+        futures[executor.submit(task.run)] = task
+
+    fetched: List[Tuple[Source, Any]] = []
+    failed: List[Dict[str, Any]] = []
+
+    def fail(task: _FetchTask, error: str) -> None:
+        next_attempt = feedhealth.next_attempt_after_failure(health.get(task.source.id))
+        record_fetch_failure(task.source.id, error, next_attempt)
+        failed.append({"source_id": task.source.id, "title": task.source.title, "error": error})
+
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            for future in list(pending):
+                task = futures[future]
+                if task.started is not None and now - task.started > task.timeout and not future.done():
+                    # 后台线程仍在运行，结果直接丢弃
+                    pending.discard(future)
+                    fail(task, f"timeout after {task.timeout:.0f}s")
+            done, _ = wait(pending, timeout=min(0.1, deadline - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                task = futures[future]
+                try:
+                    feed = future.result()
+                except Exception as e:
+                    fail(task, str(e) or type(e).__name__)
+                    continue
+                record_fetch_success(task.source.id, task.elapsed_ms())
+                fetched.append((task.source, feed))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    stragglers = []
+    for future in pending:
+        task = futures[future]
+        record_fetch_deferred(task.source.id, "not fetched before ingest deadline", feedhealth.next_attempt_after_deferral())
+        stragglers.append({
+            "source_id": task.source.id,
+            "title": task.source.title,
+            "elapsed_ms": round(task.elapsed_ms()),
+        })
+    # 保持订阅源列表的顺序
+    order = {source.id: index for index, source in enumerate(sources)}
+    fetched.sort(key=lambda pair: order[pair[0].id])
+    return fetched, failed, stragglers
+
+
 @app.post("/ingest")
-async def ingest_feeds() -> Dict[str, Any]:
-    """拉取 RSS 并生成摘要 - 调用外部 Summary Service"""
+async def ingest_feeds(force: bool = False) -> Dict[str, Any]:
+    """
+    拉取 RSS 并生成摘要 - 调用外部 Summary Service。
+    处于失败退避或隔离期的源会被跳过，force=true 时忽略退避。
+    """
+    # 拉取、摘要与写库都是阻塞调用，放到线程池执行，不占用事件循环
+    return await run_in_threadpool(_ingest, force)
+
+
+def _ingest(force: bool) -> Dict[str, Any]:
     sources = list_sources()
     if not sources:
         raise HTTPException(status_code=400, detail="请先添加 RSS 订阅源。")
 
-    inserted_total = 0
+    health = get_source_health()
+    now = time.time()
+    due: List[Source] = []
+    skipped: List[Dict[str, Any]] = []
     for source in sources:
-        feed = feedparser.parse(source.url)
+        if force or feedhealth.is_due(health.get(source.id), now):
+            due.append(source)
+            continue
+        info = feedhealth.describe(health.get(source.id))
+        skipped.append({
+            "source_id": source.id,
+            "title": source.title,
+            "status": info["status"],
+            "next_attempt_at": info["next_attempt_at"],
+        })
+    fetched, failed, stragglers = _fetch_feeds(due, health)
+
+    inserted_total = 0
+    duplicates_total = 0
+    changed_entries: List[Entry] = []
+    per_source: List[Dict[str, Any]] = []
+    for source, feed in fetched:
+        # 整个 feed 的规范链接一次查库；已收录且内容未变的条目不再指纹或摘要
+        hashes = [link_hash(item_link(item)) for item in feed.entries]
+        known = find_by_link_hashes(hashes)
+        seen: set[int] = set()
         new_entries: List[Entry] = []
-        for item in feed.entries:
-            published = item.get("published") or item.get("updated")
-            if published:
-                published_at = date_parser.parse(published)
-            else:
-                published_at = datetime.utcnow()
+        changed = 0
+        unchanged = 0
+        for item, url_hash in zip(feed.entries, hashes):
+            matches = known.get(url_hash, []) if url_hash is not None else []
+            title = item.get("title", "无标题")
             content = item.get("summary") or item.get("description") or ""
-            summary = await summarize_text(content)  # 调用外部服务
+            existing = next((match for match in matches if match.source_id == source.id), None)
+            if url_hash in seen:
+                unchanged += 1
+                continue
+            if url_hash is not None:
+                seen.add(url_hash)
+            if existing:
+                digest = content_hash(title, content)
+                if digest == existing.content_hash:
+                    unchanged += 1
+                    continue
+                # feed 修改了已有条目 (更正、补充)：只对这些条目重新摘要
+                existing.title = title
+                existing.content = content
+                existing.summary = summarize_text(content)
+                existing.simhash = text_simhash(title, content)
+                existing.content_hash = digest
+                update_entry_content(existing)
+                changed_entries.append(existing)
+                changed += 1
+                continue
+            # 缺失或无法识别的日期按收录时间处理
+            published_at = parse_timestamp(item.get("published") or item.get("updated")) or datetime.utcnow()
+            if matches:
+                # 镜像 feed：其他来源已收录同一链接，直接挂到其规范条目
+                fingerprint = matches[0].simhash
+                canonical = matches[0]
+                if canonical.canonical_id:
+                    canonical = get_entries([canonical.canonical_id]).get(canonical.canonical_id, canonical)
+            else:
+                fingerprint = text_simhash(title, content)
+                canonical = find_near_duplicate(fingerprint) if fingerprint is not None else None
+            if canonical:
+                # 其他来源已收录过同一故事，复用摘要，不再调用 LLM
+                summary = canonical.summary
+                duplicates_total += 1
+            else:
+                summary = summarize_text(content)  # 调用外部服务
             new_entries.append(
                 Entry(
                     id=0,
                     source_id=source.id,
-                    title=item.get("title", "无标题"),
+                    title=title,
                     link=item.get("link", ""),
                     published_at=published_at,
                     summary=summary,
                     content=content,
                     unread=True,
+                    simhash=fingerprint,
+                    canonical_id=canonical.id if canonical else None,
+                    link_hash=url_hash,
+                    content_hash=content_hash(title, content),
                 )
             )
-        inserted_total += add_entries(new_entries)
+        inserted = add_entries(new_entries)
+        inserted_total += inserted
+        per_source.append(
+            {
+                "source_id": source.id,
+                "title": source.title,
+                "new": inserted,
+                "changed": changed,
+                "unchanged": unchanged,
+            }
+        )
 
-    return {"inserted": inserted_total}
+    sync_vector_index()
+    if changed_entries:
+        get_index(storage.DB_PATH).update_many(
+            (entry.id, embed(f"{entry.title} {entry.summary}")) for entry in changed_entries
+        )
+    return {
+        "inserted": inserted_total,
+        "duplicates": duplicates_total,
+        "changed": sum(row["changed"] for row in per_source),
+        "unchanged": sum(row["unchanged"] for row in per_source),
+        "sources": per_source,
+        "failed": failed,
+        "skipped": skipped,
+        "stragglers": stragglers,
+    }
 
 
-@app.get("/digest", response_model=DailyDigest)
-def daily_digest(date: Optional[str] = None) -> DailyDigest:
-    target_date = date or datetime.utcnow().strftime("%Y-%m-%d")
-    entries = list_entries_by_date(target_date)
-    sources = get_source_map()
-    categories: Dict[str, List[DigestEntry]] = {}
+def _collapse_duplicates(entries: List[Entry], sources: Dict[int, Any]) -> Dict[int, DigestEntry]:
+    """按规范条目归并近似重复，返回 规范条目 id -> 条目，保持按发布时间倒序"""
+    groups: Dict[int, List[Entry]] = {}
     for entry in entries:
-        source = sources.get(entry.source_id)
-        if not source:
+        if entry.source_id not in sources:
             continue
-        digest_entry = DigestEntry(
-            id=entry.id,
-            title=entry.title,
-            link=entry.link,
-            published_at=entry.published_at.isoformat(),
+        groups.setdefault(entry.canonical_id or entry.id, []).append(entry)
+
+    items: Dict[int, DigestEntry] = {}
+    for root_id, members in groups.items():
+        primary = next((item for item in members if item.id == root_id), members[-1])
+        source = sources[primary.source_id]
+        source_titles: List[str] = []
+        for member in [primary] + [item for item in members if item is not primary]:
+            title = sources[member.source_id].title
+            if title not in source_titles:
+                source_titles.append(title)
+        items[root_id] = DigestEntry(
+            id=primary.id,
+            title=primary.title,
+            link=primary.link,
+            published_at=primary.published_at.isoformat(),
             source_title=source.title,
             category=source.category,
-            summary=entry.summary,
-            content=entry.content,
-            unread=entry.unread,
+            summary=primary.summary,
+            content=primary.content,
+            unread=any(item.unread for item in members),
+            sources=source_titles,
+            duplicate_count=len(members) - 1,
         )
-        categories.setdefault(source.category, []).append(digest_entry)
-    return DailyDigest(date=target_date, total=len(entries), categories=categories)
+    return items
+
+
+class _DaySnapshot:
+    """某一天归并近似重复后的条目；缓存后由日报、区间日报与周报共用，调用方不得修改其中的条目"""
+
+    def __init__(self, entries: List[Entry], sources: Dict[int, Source]):
+        self.items = _collapse_duplicates(entries, sources)
+        self.source_ids = {entry.id: entry.source_id for entry in entries}
+        self.published_ts = {entry.id: to_epoch(entry.published_at) for entry in entries}
+
+
+_snapshots: "SnapshotCache[_DaySnapshot]" = SnapshotCache(DIGEST_SNAPSHOT_DAYS)
+
+
+def _parse_zone(tz: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz or DIGEST_TZ)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"未知时区: {tz}")
+
+
+def _parse_day(value: Optional[str], zone: ZoneInfo) -> datetime:
+    """本地日期 (不带时区的当天零点)；缺省为该时区的今天"""
+    if not value:
+        return datetime.now(zone).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"日期格式应为 YYYY-MM-DD: {value}")
+
+
+def _day_start(day: datetime, zone: ZoneInfo) -> int:
+    """本地日期零点对应的 UTC 时间戳；夏令时切换日的长度不是 24 小时，由时区规则决定"""
+    return int(day.replace(tzinfo=zone).timestamp())
+
+
+def _day_snapshots(days: List[datetime], sources: Dict[int, Source], zone: ZoneInfo) -> List[_DaySnapshot]:
+    """
+    连续若干个本地日的快照，按 (本地日期, 时区) 缓存。本地日换算为 published_ts 的 UTC 区间：
+    先用一次范围扫描取各天的数据签名校验缓存，失效的天再用一次范围查询取回条目重建；
+    缓存全部命中时不读取任何条目。
+    """
+    edges = [_day_start(day, zone) for day in days] + [_day_start(days[-1] + timedelta(days=1), zone)]
+    signatures = entry_signatures(edges)
+    source_signature = tuple(
+        (source.id, source.title, source.category, source.weight)
+        for source in sorted(sources.values(), key=lambda source: source.id)
+    )
+    snapshots: Dict[int, _DaySnapshot] = {}
+    stale: List[Tuple[int, Any, Any]] = []
+    for index, day in enumerate(days):
+        key = (storage.DB_PATH, day.strftime("%Y-%m-%d"), zone.key)
+        signature = (source_signature, signatures.get(index))
+        cached = _snapshots.get(key, signature)
+        if cached is None:
+            stale.append((index, key, signature))
+        else:
+            snapshots[index] = cached
+
+    if stale:
+        first, last = stale[0][0], stale[-1][0]
+        by_day: Dict[int, List[Entry]] = {}
+        for entry in list_entries_between(edges[first], edges[last + 1]):
+            by_day.setdefault(bisect_right(edges, to_epoch(entry.published_at)) - 1, []).append(entry)
+        for index, key, signature in stale:
+            snapshot = _DaySnapshot(by_day.get(index, []), sources)
+            _snapshots.put(key, signature, snapshot)
+            snapshots[index] = snapshot
+    return [snapshots[index] for index in range(len(days))]
+
+
+def _select(
+    items: List[DigestEntry],
+    group: Callable[[DigestEntry], str],
+    top: Optional[int],
+    rank: str,
+    reference_ts: float,
+    source_weight: Callable[[DigestEntry], float],
+    published_ts: Dict[int, int],
+    cluster_sizes: Optional[Dict[str, int]] = None,
+) -> Dict[str, List[DigestEntry]]:
+    """按 group 分组并排序；items 须已按发布时间倒序，且不会被修改 (打分的条目返回副本)"""
+    if rank == "score":
+        scores: Dict[int, float] = {}
+        for item in items:
+            coverage = item.duplicate_count + 1
+            if cluster_sizes and item.topic:
+                coverage = max(coverage, cluster_sizes.get(item.topic, 1))
+            scores[item.id] = ranking.score(
+                reference_ts - published_ts[item.id],
+                source_weight=source_weight(item),
+                coverage=coverage,
+                unread=item.unread,
+            )
+        selected = ranking.top_per_group(items, group, key=lambda item: scores[item.id], k=top)
+        return {
+            name: [item.model_copy(update={"score": round(scores[item.id], 4)}) for item in members]
+            for name, members in selected.items()
+        }
+
+    categories: Dict[str, List[DigestEntry]] = {}
+    for item in items:
+        bucket = categories.setdefault(group(item), [])
+        if top is None or len(bucket) < top:
+            bucket.append(item)
+    return categories
+
+
+def _reference_ts(last_day: datetime, zone: ZoneInfo) -> float:
+    """新近度的基准：历史日期取最后一天结束，而不是现在"""
+    return min(time.time(), _day_start(last_day + timedelta(days=1), zone))
+
+
+@app.get("/digest", response_model=DailyDigest)
+def daily_digest(
+    date: Optional[str] = None,
+    group_by: Literal["category", "topic"] = "category",
+    top: Optional[int] = Query(default=None, ge=1),
+    rank: Literal["time", "score"] = "time",
+    tz: Optional[str] = None,
+) -> DailyDigest:
+    """
+    top: 每组只返回排名前 N 的条目 (total 仍为当天全部条目数)
+    rank: time 按发布时间倒序；score 按新近度、来源权重、转载/聚类规模与未读状态的综合分
+    tz: 按该时区的自然日取条目 (如 Asia/Shanghai)，默认 DIGEST_TZ
+    """
+    zone = _parse_zone(tz)
+    day = _parse_day(date, zone)
+    target_date = day.strftime("%Y-%m-%d")
+    sources = get_source_map()
+    snapshot = _day_snapshots([day], sources, zone)[0]
+    items = list(snapshot.items.values())
+
+    cluster_sizes: Dict[str, int] = {}
+    if group_by == "topic":
+        # 对当天条目的标题+摘要做 TF-IDF 聚类，结果按 (日期, 时区) 缓存
+        topics = topics_for_date(
+            f"{target_date}@{zone.key}", [(item.id, f"{item.title} {item.summary}") for item in items]
+        )
+        items = [item.model_copy(update={"topic": topics[item.id].label}) for item in items]
+        for item in items:
+            cluster_sizes[item.topic] = cluster_sizes.get(item.topic, 0) + 1
+
+    categories = _select(
+        items,
+        group=lambda item: item.topic if group_by == "topic" else item.category,
+        top=top,
+        rank=rank,
+        reference_ts=_reference_ts(day, zone),
+        source_weight=lambda item: sources[snapshot.source_ids[item.id]].weight,
+        published_ts=snapshot.published_ts,
+        cluster_sizes=cluster_sizes,
+    )
+    return DailyDigest(date=target_date, tz=zone.key, total=len(items), categories=categories)
+
+
+def _range_digest(start_day: datetime, end_day: datetime, top: int, rank: str, zone: ZoneInfo) -> RangeDigest:
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="end 不能早于 start")
+    span = (end_day - start_day).days + 1
+    if span > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"区间最长 {MAX_RANGE_DAYS} 天")
+    days = [start_day + timedelta(days=offset) for offset in range(span)]
+    sources = get_source_map()
+    snapshots = _day_snapshots(days, sources, zone)
+
+    # 由新到旧合并各天快照；跨天转载的同一故事只保留最新一天的条目，计入其余天的转载
+    merged: Dict[int, DigestEntry] = {}
+    source_ids: Dict[int, int] = {}
+    published_ts: Dict[int, int] = {}
+    daily_totals: Dict[str, int] = {}
+    for day, snapshot in zip(reversed(days), reversed(snapshots)):
+        daily_totals[day.strftime("%Y-%m-%d")] = len(snapshot.items)
+        source_ids.update(snapshot.source_ids)
+        published_ts.update(snapshot.published_ts)
+        for root_id, item in snapshot.items.items():
+            existing = merged.get(root_id)
+            if existing is None:
+                merged[root_id] = item
+                continue
+            merged[root_id] = existing.model_copy(update={
+                "duplicate_count": existing.duplicate_count + item.duplicate_count + 1,
+                "sources": existing.sources + [title for title in item.sources if title not in existing.sources],
+                "unread": existing.unread or item.unread,
+            })
+
+    items = list(merged.values())
+    counts: Dict[str, List[int]] = {}
+    for item in items:
+        total, unread = counts.setdefault(item.category, [0, 0])
+        counts[item.category] = [total + 1, unread + item.unread]
+    selected = _select(
+        items,
+        group=lambda item: item.category,
+        top=top,
+        rank=rank,
+        reference_ts=_reference_ts(end_day, zone),
+        source_weight=lambda item: sources[source_ids[item.id]].weight,
+        published_ts=published_ts,
+    )
+    return RangeDigest(
+        start=start_day.strftime("%Y-%m-%d"),
+        end=end_day.strftime("%Y-%m-%d"),
+        tz=zone.key,
+        total=len(items),
+        days=dict(reversed(list(daily_totals.items()))),
+        categories={
+            name: CategoryRollup(total=total, unread=unread, items=selected.get(name, []))
+            for name, (total, unread) in counts.items()
+        },
+    )
+
+
+@app.get("/digest/range", response_model=RangeDigest)
+def digest_range(
+    start: str,
+    end: Optional[str] = None,
+    top: int = Query(default=10, ge=1),
+    rank: Literal["time", "score"] = "score",
+    tz: Optional[str] = None,
+) -> RangeDigest:
+    """多日日报：start ~ end (含两端，默认到今天)，每个分类给出条目数、未读数与排名前 top 的条目"""
+    zone = _parse_zone(tz)
+    return _range_digest(_parse_day(start, zone), _parse_day(end, zone), top, rank, zone)
+
+
+@app.get("/digest/weekly", response_model=RangeDigest)
+def digest_weekly(
+    date: Optional[str] = None,
+    top: int = Query(default=10, ge=1),
+    rank: Literal["time", "score"] = "score",
+    tz: Optional[str] = None,
+) -> RangeDigest:
+    """周报：date 所在的自然周 (周一 ~ 周日)，默认本周"""
+    zone = _parse_zone(tz)
+    day = _parse_day(date, zone)
+    monday = day - timedelta(days=day.weekday())
+    return _range_digest(monday, monday + timedelta(days=6), top, rank, zone)
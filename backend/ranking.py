@@ -0,0 +1,59 @@
+import heapq
+import math
+import os
+from itertools import count
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 新近度按半衰期衰减：发布 RANK_HALF_LIFE_HOURS 小时后新近度分减半
+HALF_LIFE_HOURS = float(os.getenv("RANK_HALF_LIFE_HOURS", "12"))
+RECENCY_WEIGHT = 1.0
+SOURCE_WEIGHT = 0.5
+# 覆盖度 (转载来源数 / 主题聚类规模) 取 log2，避免大事件压过其余条目
+COVERAGE_WEIGHT = 0.3
+UNREAD_WEIGHT = 0.5
+
+
+def recency(age_seconds: float) -> float:
+    return 0.5 ** (max(age_seconds, 0) / 3600 / HALF_LIFE_HOURS)
+
+
+def score(age_seconds: float, source_weight: float = 1.0, coverage: int = 1, unread: bool = True) -> float:
+    """
+    综合分：新近度 + 来源权重 + 覆盖度 + 未读。
+    age_seconds 为相对基准时间的发布时长 (查询历史日期时基准取当天结束，而不是现在)。
+    """
+    return (
+        RECENCY_WEIGHT * recency(age_seconds)
+        + SOURCE_WEIGHT * source_weight
+        + COVERAGE_WEIGHT * math.log2(max(coverage, 1))
+        + UNREAD_WEIGHT * (1.0 if unread else 0.0)
+    )
+
+
+def top_per_group(
+    items: Iterable[T],
+    group: Callable[[T], Hashable],
+    key: Callable[[T], float],
+    k: Optional[int] = None,
+) -> Dict[Hashable, List[T]]:
+    """
+    按 group 分组，每组取 key 最大的 k 条 (降序)。
+    每组维护大小为 k 的最小堆，复杂度 O(n log k)；k 为 None 时退化为组内整体排序。
+    分组顺序与各组在 items 中首次出现的顺序一致；同分时先出现的条目在前。
+    """
+    heaps: Dict[Hashable, List[Tuple[float, int, T]]] = {}
+    order = count()
+    for item in items:
+        # 序号取负：同分时堆顶 (最先被挤出) 是后出现的条目
+        entry = (key(item), -next(order), item)
+        heap = heaps.setdefault(group(item), [])
+        if k is None or len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return {
+        name: [item for _, _, item in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
+        for name, heap in heaps.items()
+    }
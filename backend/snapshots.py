@@ -0,0 +1,40 @@
+import threading
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class SnapshotCache(Generic[V]):
+    """
+    按键缓存计算结果 (如某一天的日报快照)，连同生成时的数据签名一起保存。
+    读取时签名不一致视为过期；超过 max_entries 时淘汰最久未使用的键。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Hashable, tuple[Hashable, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, signature: Hashable) -> Optional[V]:
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is None or cached[0] != signature:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+    def put(self, key: Hashable, signature: Hashable, value: V) -> None:
+        with self._lock:
+            self._items[key] = (signature, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
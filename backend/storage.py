@@ -2,9 +2,13 @@ import sqlite3
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Optional, Sequence
 import os
 
+from fingerprint import NEAR_DUPLICATE_DISTANCE, band_keys, content_hash, hamming, to_signed, to_unsigned
+from timestamps import to_epoch, to_utc
+from urlnorm import link_hash
+
 # Railway 持久化存储
 if os.getenv("RAILWAY_VOLUME_MOUNT_PATH"):
     DB_PATH = os.path.join(os.getenv("RAILWAY_VOLUME_MOUNT_PATH"), "rss_app.db")
@@ -18,6 +22,8 @@ class Source:
     url: str
     title: str
     category: str
+    # 排序权重，rank=score 的日报中权重高的来源靠前
+    weight: float = 1.0
 
 
 @dataclass
@@ -30,6 +36,31 @@ class Entry:
     summary: str
     content: str
     unread: bool
+    simhash: Optional[int] = None
+    # 近似重复条目指向最早收录的规范条目，规范条目自身为 None
+    canonical_id: Optional[int] = None
+    # 规范化链接的哈希，跨来源判重用；为 None 时入库前按 link 计算
+    link_hash: Optional[int] = None
+    # 标题 + 正文指纹，feed 修改已有条目时据此判断是否需要重新摘要
+    content_hash: Optional[int] = None
+
+
+@dataclass
+class SourceHealth:
+    source_id: int
+    consecutive_failures: int
+    total_failures: int
+    # 成功拉取耗时的指数滑动平均
+    avg_latency_ms: Optional[float]
+    last_success_at: Optional[str]
+    last_failure_at: Optional[str]
+    last_error: Optional[str]
+    # 退避期内不再拉取 (epoch 秒)
+    next_attempt_ts: Optional[int]
+
+
+# 平均耗时中新样本的权重
+LATENCY_SMOOTHING = 0.3
 
 
 @contextmanager
@@ -66,19 +97,78 @@ def init_db() -> None:
                 UNIQUE(source_id, link),
                 FOREIGN KEY(source_id) REFERENCES sources(id)
             );
+
+            -- SimHash 分段索引 (LSH)：按段精确匹配找候选，避免全表比较
+            CREATE TABLE IF NOT EXISTS entry_simhash_bands (
+                band INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                entry_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_simhash_bands ON entry_simhash_bands(band, value);
+
+            CREATE TABLE IF NOT EXISTS source_health (
+                source_id INTEGER PRIMARY KEY,
+                consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                total_failures INTEGER NOT NULL DEFAULT 0,
+                avg_latency_ms REAL,
+                last_success_at TEXT,
+                last_failure_at TEXT,
+                last_error TEXT,
+                next_attempt_ts INTEGER,
+                FOREIGN KEY(source_id) REFERENCES sources(id)
+            );
             """
         )
-        try:
-            conn.execute("ALTER TABLE entries ADD COLUMN unread INTEGER NOT NULL DEFAULT 1")
-        except sqlite3.OperationalError:
-            pass
+        for ddl in (
+            "ALTER TABLE entries ADD COLUMN unread INTEGER NOT NULL DEFAULT 1",
+            "ALTER TABLE entries ADD COLUMN simhash INTEGER",
+            "ALTER TABLE entries ADD COLUMN canonical_id INTEGER",
+            "ALTER TABLE entries ADD COLUMN link_hash INTEGER",
+            "ALTER TABLE entries ADD COLUMN content_hash INTEGER",
+            "ALTER TABLE entries ADD COLUMN published_ts INTEGER",
+            "ALTER TABLE entries ADD COLUMN revision INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE sources ADD COLUMN weight REAL NOT NULL DEFAULT 1.0",
+        ):
+            try:
+                conn.execute(ddl)
+            except sqlite3.OperationalError:
+                pass
+        # 旧数据补算规范链接哈希
+        rows = conn.execute("SELECT id, link FROM entries WHERE link_hash IS NULL").fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE entries SET link_hash = ? WHERE id = ?",
+                [(link_hash(row["link"]), row["id"]) for row in rows],
+            )
+        rows = conn.execute("SELECT id, title, content FROM entries WHERE content_hash IS NULL").fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE entries SET content_hash = ? WHERE id = ?",
+                [(content_hash(row["title"], row["content"]), row["id"]) for row in rows],
+            )
+        # 旧数据的 published_at 可能带时区偏移：统一改写为 UTC 并补算时间戳
+        rows = conn.execute("SELECT id, published_at FROM entries WHERE published_ts IS NULL").fetchall()
+        if rows:
+            updates = []
+            for row in rows:
+                published_at = to_utc(datetime.fromisoformat(row["published_at"]))
+                updates.append((_published_text(published_at), to_epoch(published_at), row["id"]))
+            conn.executemany("UPDATE entries SET published_at = ?, published_ts = ? WHERE id = ?", updates)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_canonical ON entries(canonical_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_link_hash ON entries(link_hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_published_ts ON entries(published_ts)")
 
 
-def add_source(url: str, title: str, category: str) -> Source:
+def _published_text(published_at: datetime) -> str:
+    """published_at 统一以不带时区的 UTC 时间存储，date(published_at) 即 UTC 日期"""
+    return to_utc(published_at).replace(tzinfo=None).isoformat()
+
+
+def add_source(url: str, title: str, category: str, weight: float = 1.0) -> Source:
     with get_conn() as conn:
         cursor = conn.execute(
-            "INSERT OR IGNORE INTO sources (url, title, category) VALUES (?, ?, ?)",
-            (url, title, category),
+            "INSERT OR IGNORE INTO sources (url, title, category, weight) VALUES (?, ?, ?, ?)",
+            (url, title, category, weight),
         )
         if cursor.lastrowid:
             source_id = cursor.lastrowid
@@ -87,7 +177,7 @@ def add_source(url: str, title: str, category: str) -> Source:
                 "SELECT id FROM sources WHERE url = ?", (url,)
             ).fetchone()["id"]
         row = conn.execute(
-            "SELECT id, url, title, category FROM sources WHERE id = ?",
+            "SELECT id, url, title, category, weight FROM sources WHERE id = ?",
             (source_id,),
         ).fetchone()
         return Source(**row)
@@ -96,14 +186,84 @@ def add_source(url: str, title: str, category: str) -> Source:
 def list_sources() -> List[Source]:
     with get_conn() as conn:
         rows = conn.execute(
-            "SELECT id, url, title, category FROM sources ORDER BY id DESC"
+            "SELECT id, url, title, category, weight FROM sources ORDER BY id DESC"
         ).fetchall()
         return [Source(**row) for row in rows]
 
 
+def set_source_weight(source_id: int, weight: float) -> Optional[Source]:
+    with get_conn() as conn:
+        conn.execute("UPDATE sources SET weight = ? WHERE id = ?", (weight, source_id))
+        row = conn.execute(
+            "SELECT id, url, title, category, weight FROM sources WHERE id = ?",
+            (source_id,),
+        ).fetchone()
+        return Source(**row) if row else None
+
+
 def delete_source(source_id: int) -> None:
     with get_conn() as conn:
         conn.execute("DELETE FROM sources WHERE id = ?", (source_id,))
+        conn.execute("DELETE FROM source_health WHERE source_id = ?", (source_id,))
+
+
+def get_source_health() -> Dict[int, SourceHealth]:
+    with get_conn() as conn:
+        rows = conn.execute("SELECT * FROM source_health").fetchall()
+    return {row["source_id"]: SourceHealth(**row) for row in rows}
+
+
+def record_fetch_success(source_id: int, latency_ms: float) -> None:
+    with get_conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO source_health (source_id, avg_latency_ms, last_success_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(source_id) DO UPDATE SET
+                consecutive_failures = 0,
+                avg_latency_ms = CASE
+                    WHEN avg_latency_ms IS NULL THEN excluded.avg_latency_ms
+                    ELSE avg_latency_ms * (1 - ?) + excluded.avg_latency_ms * ?
+                END,
+                last_success_at = excluded.last_success_at,
+                next_attempt_ts = NULL
+            """,
+            (source_id, latency_ms, datetime.utcnow().isoformat(), LATENCY_SMOOTHING, LATENCY_SMOOTHING),
+        )
+
+
+def record_fetch_failure(source_id: int, error: str, next_attempt_ts: int) -> None:
+    with get_conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO source_health (
+                source_id, consecutive_failures, total_failures, last_failure_at, last_error, next_attempt_ts
+            ) VALUES (?, 1, 1, ?, ?, ?)
+            ON CONFLICT(source_id) DO UPDATE SET
+                consecutive_failures = consecutive_failures + 1,
+                total_failures = total_failures + 1,
+                last_failure_at = excluded.last_failure_at,
+                last_error = excluded.last_error,
+                next_attempt_ts = excluded.next_attempt_ts
+            """,
+            (source_id, datetime.utcnow().isoformat(), error[:500], next_attempt_ts),
+        )
+
+
+def record_fetch_deferred(source_id: int, error: str, next_attempt_ts: int) -> None:
+    """软失败 (如拉取阶段总时限内没轮到)：推迟下次拉取，但不累计连续失败，不会因此进入隔离"""
+    with get_conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO source_health (source_id, last_failure_at, last_error, next_attempt_ts)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(source_id) DO UPDATE SET
+                last_failure_at = excluded.last_failure_at,
+                last_error = excluded.last_error,
+                next_attempt_ts = excluded.next_attempt_ts
+            """,
+            (source_id, datetime.utcnow().isoformat(), error[:500], next_attempt_ts),
+        )
 
 
 def add_entries(entries: Iterable[Entry]) -> int:
@@ -113,55 +273,244 @@ def add_entries(entries: Iterable[Entry]) -> int:
             cursor = conn.execute(
                 """
                 INSERT OR IGNORE INTO entries (
-                    source_id, title, link, published_at, summary, content, unread
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    source_id, title, link, published_at, summary, content, unread,
+                    simhash, canonical_id, link_hash, content_hash, published_ts
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     entry.source_id,
                     entry.title,
                     entry.link,
-                    entry.published_at.isoformat(),
+                    _published_text(entry.published_at),
                     entry.summary,
                     entry.content,
                     1 if entry.unread else 0,
+                    to_signed(entry.simhash) if entry.simhash is not None else None,
+                    entry.canonical_id,
+                    entry.link_hash if entry.link_hash is not None else link_hash(entry.link),
+                    entry.content_hash
+                    if entry.content_hash is not None
+                    else content_hash(entry.title, entry.content),
+                    to_epoch(entry.published_at),
                 ),
             )
             if cursor.rowcount:
                 inserted += 1
+                _write_bands(conn, cursor.lastrowid, entry.simhash)
     return inserted
 
 
+def _write_bands(conn: sqlite3.Connection, entry_id: int, simhash: Optional[int]) -> None:
+    if simhash is None:
+        return
+    conn.executemany(
+        "INSERT INTO entry_simhash_bands (band, value, entry_id) VALUES (?, ?, ?)",
+        [(band, value, entry_id) for band, value in enumerate(band_keys(simhash))],
+    )
+
+
+def update_entry_content(entry: Entry) -> None:
+    """
+    用 feed 中修改后的内容覆盖已有条目 (标题、正文、摘要、指纹)。
+    规范条目的新摘要同步给挂在它下面的重复条目；被改写的行都递增 revision，
+    重复条目可能在其他日期，那些天的日报快照同样失效。
+    """
+    with get_conn() as conn:
+        conn.execute(
+            """
+            UPDATE entries
+            SET title = ?, content = ?, summary = ?, simhash = ?, content_hash = ?, revision = revision + 1
+            WHERE id = ?
+            """,
+            (
+                entry.title,
+                entry.content,
+                entry.summary,
+                to_signed(entry.simhash) if entry.simhash is not None else None,
+                entry.content_hash
+                if entry.content_hash is not None
+                else content_hash(entry.title, entry.content),
+                entry.id,
+            ),
+        )
+        conn.execute("DELETE FROM entry_simhash_bands WHERE entry_id = ?", (entry.id,))
+        _write_bands(conn, entry.id, entry.simhash)
+        conn.execute(
+            "UPDATE entries SET summary = ?, revision = revision + 1 WHERE canonical_id = ?",
+            (entry.summary, entry.id),
+        )
+
+
+def find_near_duplicate(simhash: int, max_distance: int = NEAR_DUPLICATE_DISTANCE) -> Optional[Entry]:
+    """通过 LSH 分段索引查找最接近的已收录条目，返回其规范条目"""
+    keys = band_keys(simhash)
+    clause = " OR ".join("(b.band = ? AND b.value = ?)" for _ in keys)
+    params = [item for band, value in enumerate(keys) for item in (band, value)]
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT DISTINCT e.id, e.simhash, e.canonical_id
+            FROM entry_simhash_bands b
+            JOIN entries e ON e.id = b.entry_id
+            WHERE {clause}
+            """,
+            params,
+        ).fetchall()
+        best = None
+        for row in rows:
+            distance = hamming(simhash, to_unsigned(row["simhash"]))
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, row["canonical_id"] or row["id"])
+        if best is None:
+            return None
+        row = conn.execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM entries WHERE id = ?", (best[1],)
+        ).fetchone()
+        return _row_to_entry(row) if row else None
+
+
+def find_by_link_hashes(hashes: Iterable[int]) -> Dict[int, List[Entry]]:
+    """按规范链接哈希批量查已收录条目，一次查询覆盖整个 feed"""
+    hashes = list({value for value in hashes if value is not None})
+    if not hashes:
+        return {}
+    placeholders = ", ".join("?" for _ in hashes)
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM entries WHERE link_hash IN ({placeholders}) ORDER BY id",
+            hashes,
+        ).fetchall()
+    found: Dict[int, List[Entry]] = {}
+    for row in rows:
+        found.setdefault(row["link_hash"], []).append(_row_to_entry(row))
+    return found
+
+
+_ENTRY_COLUMNS = (
+    "id, source_id, title, link, published_at, summary, content, unread, simhash, canonical_id, "
+    "link_hash, content_hash"
+)
+
+
+def _row_to_entry(row: sqlite3.Row) -> Entry:
+    return Entry(
+        id=row["id"],
+        source_id=row["source_id"],
+        title=row["title"],
+        link=row["link"],
+        published_at=datetime.fromisoformat(row["published_at"]),
+        summary=row["summary"],
+        content=row["content"],
+        unread=bool(row["unread"]),
+        simhash=to_unsigned(row["simhash"]) if row["simhash"] is not None else None,
+        canonical_id=row["canonical_id"],
+        link_hash=row["link_hash"],
+        content_hash=row["content_hash"],
+    )
+
+
 def list_entries_by_date(date_str: str) -> List[Entry]:
     with get_conn() as conn:
         rows = conn.execute(
-            """
-            SELECT id, source_id, title, link, published_at, summary, content, unread
+            f"""
+            SELECT {_ENTRY_COLUMNS}
             FROM entries
             WHERE date(published_at) = date(?)
             ORDER BY published_at DESC
             """,
             (date_str,),
         ).fetchall()
-        entries: List[Entry] = []
-        for row in rows:
-            entries.append(
-                Entry(
-                    id=row["id"],
-                    source_id=row["source_id"],
-                    title=row["title"],
-                    link=row["link"],
-                    published_at=datetime.fromisoformat(row["published_at"]),
-                    summary=row["summary"],
-                    content=row["content"],
-                    unread=bool(row["unread"]),
-                )
-            )
-        return entries
+        return [_row_to_entry(row) for row in rows]
+
+
+def list_entries_between(start_ts: int, end_ts: int) -> List[Entry]:
+    """published_ts 落在 [start_ts, end_ts) 的条目，按发布时间倒序"""
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {_ENTRY_COLUMNS}
+            FROM entries
+            WHERE published_ts >= ? AND published_ts < ?
+            ORDER BY published_ts DESC
+            """,
+            (start_ts, end_ts),
+        ).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+
+def entry_signatures(edges: Sequence[int]) -> Dict[int, tuple]:
+    """
+    edges 为递增的时间边界，第 i 段为 [edges[i], edges[i+1])。
+    一次范围扫描返回各段的 (条数, 最大 id, 未读数, 修订号和)：新增、标记已读、内容更新都会改变它，
+    用来判断缓存的日报快照是否仍然有效。条目不会删除，revision 只增不减，整数求和精确且不会相互抵消。
+    没有条目的段不出现在结果中。
+    """
+    if len(edges) < 2:
+        return {}
+    branches = " ".join(f"WHEN published_ts < {int(edge)} THEN {index}" for index, edge in enumerate(edges[1:]))
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT CASE {branches} END AS bucket,
+                   COUNT(*), MAX(id), SUM(unread), SUM(revision)
+            FROM entries
+            WHERE published_ts >= ? AND published_ts < ?
+            GROUP BY bucket
+            """,
+            (edges[0], edges[-1]),
+        ).fetchall()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def get_entries(entry_ids: List[int]) -> dict[int, Entry]:
+    if not entry_ids:
+        return {}
+    placeholders = ", ".join("?" for _ in entry_ids)
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM entries WHERE id IN ({placeholders})",
+            list(entry_ids),
+        ).fetchall()
+        return {row["id"]: _row_to_entry(row) for row in rows}
+
+
+def list_entry_texts_after(entry_id: int, limit: int = 1000) -> List[tuple[int, str]]:
+    """按 id 顺序返回 (id, 标题+摘要)，用于增量更新向量索引"""
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT id, title, summary FROM entries WHERE id > ? ORDER BY id LIMIT ?",
+            (entry_id, limit),
+        ).fetchall()
+        return [(row["id"], f"{row['title']} {row['summary']}") for row in rows]
+
+
+def search_entries(query: str, limit: int = 20) -> List[Entry]:
+    pattern = f"%{query}%"
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {_ENTRY_COLUMNS}
+            FROM entries
+            WHERE title LIKE ? OR summary LIKE ?
+            ORDER BY published_at DESC
+            LIMIT ?
+            """,
+            (pattern, pattern, limit),
+        ).fetchall()
+        return [_row_to_entry(row) for row in rows]
 
 
 def mark_entry_read(entry_id: int) -> None:
+    # 同一故事的其他来源副本一并标记已读
     with get_conn() as conn:
-        conn.execute("UPDATE entries SET unread = 0 WHERE id = ?", (entry_id,))
+        row = conn.execute(
+            "SELECT COALESCE(canonical_id, id) AS root FROM entries WHERE id = ?", (entry_id,)
+        ).fetchone()
+        root = row["root"] if row else entry_id
+        conn.execute(
+            "UPDATE entries SET unread = 0 WHERE id = ? OR id = ? OR canonical_id = ?",
+            (entry_id, root, root),
+        )
 
 
 def list_sources_with_meta() -> List[dict]:
@@ -173,6 +522,7 @@ def list_sources_with_meta() -> List[dict]:
                 sources.url,
                 sources.title,
                 sources.category,
+                sources.weight,
                 SUM(CASE WHEN entries.unread = 1 THEN 1 ELSE 0 END) AS unread_count,
                 MAX(entries.published_at) AS latest_entry_at
             FROM sources
@@ -190,6 +540,7 @@ def list_sources_with_meta() -> List[dict]:
                     "url": row["url"],
                     "title": row["title"],
                     "category": row["category"],
+                    "weight": row["weight"],
                     "unread_count": unread_count,
                     "has_unread": unread_count > 0,
                     "latest_entry_at": row["latest_entry_at"],
@@ -201,6 +552,6 @@ def list_sources_with_meta() -> List[dict]:
 def get_source_map() -> dict[int, Source]:
     with get_conn() as conn:
         rows = conn.execute(
-            "SELECT id, url, title, category FROM sources"
+            "SELECT id, url, title, category, weight FROM sources"
         ).fetchall()
         return {row["id"]: Source(**row) for row in rows}
@@ -14,6 +14,12 @@ def _create_source(client, suffix='1'):
     return response.json()
 
 
+def _serve_feeds(monkeypatch, app_module, parse):
+    """不走网络：下载直接返回 URL，再交给 parse(url) 生成假的 feed"""
+    monkeypatch.setattr(app_module, 'download_feed', lambda url, timeout: (url, {}))
+    monkeypatch.setattr(app_module.feedparser, 'parse', lambda url, **_: parse(url))
+
+
 class TestHealth:
     def test_health_check(self, client):
         response = client.get('/health')
@@ -169,7 +175,7 @@ class TestIngest:
                 }
             ]
 
-        monkeypatch.setattr(app_module.feedparser, 'parse', lambda _url: FakeFeed())
+        _serve_feeds(monkeypatch, app_module, lambda _url: FakeFeed())
         monkeypatch.setattr(app_module, 'summarize_text', lambda text: f'SUMMARY::{text[:20]}')
 
         first_ingest = client.post('/ingest')
@@ -189,7 +195,7 @@ class TestIngest:
 
 
 class TestStorageDatabaseOperations:
-    def test_storage_add_list_and_map(self):
+    def test_storage_add_list_and_map(self, app_module):
         source = storage.add_source(
             'https://storage.example.com/feed.xml',
             'Storage Source',
@@ -203,7 +209,7 @@ class TestStorageDatabaseOperations:
         assert source.id in source_map
         assert source_map[source.id].title == 'Storage Source'
 
-    def test_storage_entry_deduplication(self):
+    def test_storage_entry_deduplication(self, app_module):
         source = storage.add_source(
             'https://storage-dedup.example.com/feed.xml',
             'Storage Dedup',
@@ -230,3 +236,917 @@ class TestStorageDatabaseOperations:
         rows = storage.list_entries_by_date('2026-02-12')
         assert len(rows) == 1
         assert rows[0].title == 'Same Link'
+
+
+    def test_legacy_rows_are_backfilled_on_startup(self, app_module):
+        source = storage.add_source('https://storage-legacy.example.com/feed.xml', 'Legacy', 'Ops')
+        storage.add_entries([
+            storage.Entry(
+                id=0,
+                source_id=source.id,
+                title='Legacy',
+                link='https://storage.example.com/legacy',
+                published_at=datetime.fromisoformat('2026-02-12T14:00:00'),
+                summary='summary',
+                content='content',
+                unread=True
+            )
+        ])
+        # 旧版本写入的行：没有内容指纹与时间戳，published_at 带时区偏移
+        with storage.get_conn() as conn:
+            conn.execute(
+                "UPDATE entries SET content_hash = NULL, published_ts = NULL, "
+                "published_at = '2026-02-13T01:00:00+08:00'"
+            )
+        storage.init_db()
+
+        [entry] = storage.list_entries_by_date('2026-02-12')
+        assert entry.published_at == datetime.fromisoformat('2026-02-12T17:00:00')
+        assert entry.content_hash is not None
+        assert storage.get_entries([]) == {}
+        assert storage.find_by_link_hashes([None]) == {}
+        assert storage.entry_signatures([0]) == {}
+
+class TestSummarizerClient:
+    def test_summarizer_uses_summary_service(self, monkeypatch):
+        import summarizer
+
+        calls = []
+
+        class FakeResponse:
+            def raise_for_status(self):
+                return None
+
+            def json(self):
+                return {'summary': 'remote summary'}
+
+        def fake_post(url, json, timeout):
+            calls.append((url, json))
+            return FakeResponse()
+
+        monkeypatch.setattr(summarizer.httpx, 'post', fake_post)
+
+        assert summarizer.summarize_text('  some   text ') == 'remote summary'
+        assert calls[0][0].endswith('/summarize')
+        assert calls[0][1]['text'] == 'some text'
+        assert calls[0][1]['priority'] == 'ingest'
+
+    def test_summarizer_falls_back_to_truncation(self, monkeypatch):
+        import summarizer
+
+        def failing_post(*_args, **_kwargs):
+            raise summarizer.httpx.ConnectError('down')
+
+        monkeypatch.setattr(summarizer.httpx, 'post', failing_post)
+
+        assert summarizer.summarize_text('') == '暂无可用内容。'
+        fallback = summarizer.summarize_text('word ' * 200)
+        assert fallback.endswith('...')
+        assert len(fallback) <= 240
+
+
+class TestNearDuplicates:
+    STORY = (
+        'OpenAI released a new open weight model today with strong reasoning scores, '
+        'a permissive license and support for long context windows up to one million tokens.'
+    )
+
+    def test_simhash_is_close_for_syndicated_copies(self):
+        import fingerprint
+
+        original = fingerprint.text_simhash('New model', self.STORY)
+        syndicated = fingerprint.text_simhash('New model', self.STORY + ' Via Example News.')
+        unrelated = fingerprint.text_simhash(
+            'Weather', 'Heavy rain is expected across the southern provinces for the rest of the week.'
+        )
+
+        assert fingerprint.hamming(original, syndicated) <= fingerprint.NEAR_DUPLICATE_DISTANCE
+        assert fingerprint.hamming(original, unrelated) > fingerprint.NEAR_DUPLICATE_DISTANCE
+        assert fingerprint.text_simhash('Short', 'too short') is None
+        assert len(fingerprint.tokenize('人工智能')) == 3
+
+    def test_ingest_reuses_summary_and_collapses_digest(self, client, app_module, monkeypatch):
+        first = _create_source(client, suffix='dup-a')
+        second = _create_source(client, suffix='dup-b')
+
+        feeds = {
+            first['url']: [{
+                'title': 'New model',
+                'link': 'https://a.example.com/new-model',
+                'published': 'Thu, 12 Feb 2026 08:00:00 GMT',
+                'summary': self.STORY,
+            }],
+            second['url']: [{
+                'title': 'New model',
+                'link': 'https://b.example.com/2026/new-model',
+                'published': 'Thu, 12 Feb 2026 09:30:00 GMT',
+                'summary': self.STORY + ' Via Example News.',
+            }],
+        }
+
+        class FakeFeed:
+            def __init__(self, entries):
+                self.entries = entries
+
+        calls = []
+
+        def fake_summarize(text):
+            calls.append(text)
+            return 'SUMMARY::canonical'
+
+        _serve_feeds(monkeypatch, app_module, lambda url: FakeFeed(feeds[url]))
+        monkeypatch.setattr(app_module, 'summarize_text', fake_summarize)
+
+        result = client.post('/ingest').json()
+        assert result['inserted'] == 2
+        assert result['duplicates'] == 1
+        assert len(calls) == 1
+
+        payload = client.get('/digest?date=2026-02-12').json()
+        assert payload['total'] == 1
+        item = payload['categories']['Tech'][0]
+        assert item['duplicate_count'] == 1
+        assert sorted(item['sources']) == ['Example dup-a', 'Example dup-b']
+        assert item['summary'] == 'SUMMARY::canonical'
+
+        client.post(f"/entries/{item['id']}/read")
+        meta = client.get('/sources/meta').json()
+        assert all(row['unread_count'] == 0 for row in meta)
+
+
+class TestTopicClustering:
+    def test_cluster_documents_groups_related_entries(self):
+        import clustering
+
+        topics = clustering.cluster_documents([
+            'OpenAI 发布新模型 GPT-5 推理能力大幅提升',
+            'OpenAI 新模型 GPT-5 发布，推理提升',
+            'Rust 1.80 released with new borrow checker',
+            'Rust compiler borrow checker improvements released',
+            '天气预报 明天下雨',
+        ])
+
+        assert topics[0].cluster_id == topics[1].cluster_id
+        assert topics[2].cluster_id == topics[3].cluster_id
+        assert topics[0].cluster_id != topics[2].cluster_id
+        assert topics[4].label == clustering.OTHER_TOPIC
+        assert 'rust' in topics[2].label
+
+    def test_digest_group_by_topic(self, client):
+        source = _create_source(client, suffix='topic')
+        titles = [
+            ('Rust 1.80 released with new borrow checker', 'rust-1'),
+            ('Rust compiler borrow checker improvements released', 'rust-2'),
+            ('Postgres 17 query planner gets faster joins', 'pg-1'),
+        ]
+        storage.add_entries([
+            storage.Entry(
+                id=0,
+                source_id=source['id'],
+                title=title,
+                link=f'https://example.com/{slug}',
+                published_at=datetime.fromisoformat('2026-02-12T10:00:00'),
+                summary=title,
+                content=title,
+                unread=True
+            )
+            for title, slug in titles
+        ])
+
+        by_category = client.get('/digest?date=2026-02-12').json()
+        assert list(by_category['categories']) == ['Tech']
+
+        by_topic = client.get('/digest?date=2026-02-12&group_by=topic').json()
+        assert by_topic['total'] == 3
+        groups = {
+            label: sorted(item['link'].rsplit('/', 1)[-1] for item in items)
+            for label, items in by_topic['categories'].items()
+        }
+        assert ['rust-1', 'rust-2'] in groups.values()
+        assert groups['其他'] == ['pg-1']
+        assert all(item['topic'] for items in by_topic['categories'].values() for item in items)
+
+    def test_topic_cache_is_bounded(self, monkeypatch):
+        import clustering
+        from snapshots import SnapshotCache
+
+        monkeypatch.setattr(clustering, '_cache', SnapshotCache(3))
+        items = [(1, 'Rust borrow checker'), (2, 'Rust borrow checker released')]
+        for day in range(1, 8):
+            clustering.topics_for_date(f'2026-02-{day:02d}@UTC', items)
+
+        assert len(clustering._cache._items) == 3
+        clustering.topics_for_date('2026-02-07@UTC', items)
+        assert clustering._cache.hits == 1
+
+
+class TestVectorSearch:
+    def test_vector_index_persists_and_ranks_neighbors(self, tmp_path):
+        import vector_index
+
+        prefix = str(tmp_path / 'vectors')
+        index = vector_index.VectorIndex(prefix)
+        index.add_many([
+            (1, vector_index.embed('Rust compiler borrow checker improvements')),
+            (2, vector_index.embed('Rust borrow checker released in new compiler')),
+            (3, vector_index.embed('天气预报 明天下雨')),
+        ])
+
+        reopened = vector_index.VectorIndex(prefix)
+        assert reopened.count == 3
+        assert reopened.max_id == 3
+        results = reopened.search(reopened.vector_of(1), k=2, exclude=1)
+        assert results[0][0] == 2
+
+    def test_lsh_search_probes_sorted_buckets_and_delta_segment(self, tmp_path, monkeypatch):
+        import numpy as np
+        import pytest
+
+        import vector_index
+
+        # 强制走 LSH：小容量触发扩容，每 4 行并入一次有序桶，其余留在未排序的尾部
+        monkeypatch.setattr(vector_index, 'EXACT_SEARCH_LIMIT', 0)
+        monkeypatch.setattr(vector_index, 'DELTA_REBUILD', 4)
+        monkeypatch.setattr(vector_index, 'INITIAL_CAPACITY', 2)
+        texts = [f'topic {n} shared words about item number {n}' for n in range(1, 7)]
+        index = vector_index.VectorIndex(str(tmp_path / 'vectors'))
+        assert index.add_many([]) == 0
+        assert index.search(vector_index.embed('anything')) == []
+
+        index.add_many([(n, vector_index.embed(text)) for n, text in enumerate(texts[:4], start=1)])
+        assert index._delta_start == 4
+        index.add_many([(n, vector_index.embed(text)) for n, text in enumerate(texts[4:], start=5)])
+        assert (index.count, index._delta_start) == (6, 4)
+        assert index.capacity == 8
+
+        # 有序桶里的行与尾部的行都能被探到
+        assert index.search(vector_index.embed(texts[1]), k=1) == [(2, pytest.approx(1.0))]
+        assert index.search(vector_index.embed(texts[5]), k=1) == [(6, pytest.approx(1.0))]
+        assert index.search(np.zeros(vector_index.DIM, dtype=np.float32)) == []
+
+        # 覆盖有序桶里的行：哈希码变化后重建，按新内容能找到，旧内容找不到
+        assert index.update_many([(1, vector_index.embed('完全不同的内容')), (99, vector_index.embed('x'))]) == 1
+        assert index._delta_start == 6
+        assert index.search(vector_index.embed('完全不同的内容'), k=1)[0][0] == 1
+        assert 1 not in [entry_id for entry_id, _ in index.search(vector_index.embed(texts[0]), k=6)]
+
+    def test_reopen_after_partial_flush_keeps_the_recorded_rows(self, tmp_path):
+        import json
+
+        import vector_index
+
+        prefix = str(tmp_path / 'vectors')
+        index = vector_index.VectorIndex(prefix)
+        index.add_many([(n, vector_index.embed(f'entry {n} text')) for n in (1, 2, 3)])
+        # 向量已写入但元数据停在上一次落盘：重开后以元数据为准，未记录的行再次追加时被覆盖
+        with open(f'{prefix}.meta.json', 'w', encoding='utf-8') as handle:
+            json.dump({'count': 2, 'capacity': index.capacity, 'dim': vector_index.DIM}, handle)
+
+        reopened = vector_index.VectorIndex(prefix)
+        assert (reopened.count, reopened.max_id) == (2, 2)
+        assert reopened.vector_of(3) is None
+        assert 3 not in [entry_id for entry_id, _ in reopened.search(vector_index.embed('entry 3 text'), k=3)]
+
+        reopened.add_many([(3, vector_index.embed('entry 3 rewritten')), (4, vector_index.embed('entry 4 text'))])
+        again = vector_index.VectorIndex(prefix)
+        assert list(again._ids[: again.count]) == [1, 2, 3, 4]
+        assert again.search(vector_index.embed('entry 3 rewritten'), k=1)[0][0] == 3
+
+    def test_related_and_semantic_search(self, client):
+        source = _create_source(client, suffix='vector')
+        titles = [
+            ('Rust 1.80 released with new borrow checker', 'rust-1'),
+            ('Rust compiler borrow checker improvements released', 'rust-2'),
+            ('Postgres 17 query planner gets faster joins', 'pg-1'),
+        ]
+        storage.add_entries([
+            storage.Entry(
+                id=0,
+                source_id=source['id'],
+                title=title,
+                link=f'https://example.com/{slug}',
+                published_at=datetime.fromisoformat('2026-02-12T10:00:00'),
+                summary=title,
+                content=title,
+                unread=True
+            )
+            for title, slug in titles
+        ])
+        rust_id = next(
+            entry.id for entry in storage.list_entries_by_date('2026-02-12') if entry.link.endswith('rust-1')
+        )
+
+        related = client.get(f'/entries/{rust_id}/related?limit=1').json()
+        assert [item['link'] for item in related] == ['https://example.com/rust-2']
+        # 非正数的 limit 按 1 处理
+        assert client.get(f'/entries/{rust_id}/related?limit=-3').json() == related
+        assert client.get('/entries/999999/related').status_code == 404
+
+        semantic = client.get('/search', params={'q': 'postgres planner joins', 'mode': 'semantic'}).json()
+        assert semantic[0]['link'] == 'https://example.com/pg-1'
+
+        for limit in (0, -5):
+            clamped = client.get('/search', params={'q': 'planner', 'mode': 'semantic', 'limit': limit}).json()
+            assert [item['link'] for item in clamped] == ['https://example.com/pg-1']
+            assert len(client.get('/search', params={'q': 'borrow', 'limit': limit}).json()) == 1
+
+        keyword = client.get('/search', params={'q': 'borrow'}).json()
+        assert sorted(item['link'] for item in keyword) == [
+            'https://example.com/rust-1',
+            'https://example.com/rust-2',
+        ]
+
+    def test_concurrent_sync_appends_each_entry_once(self, client, app_module, monkeypatch):
+        import threading
+        import time as time_module
+
+        import vector_index
+
+        source = _create_source(client, suffix='vector-sync')
+        storage.add_entries([
+            storage.Entry(
+                id=0,
+                source_id=source['id'],
+                title=f'Entry {n}',
+                link=f'https://example.com/sync-{n}',
+                published_at=datetime.fromisoformat('2026-02-12T10:00:00'),
+                summary=f'summary {n}',
+                content=f'content {n}',
+                unread=True
+            )
+            for n in range(20)
+        ])
+        original = app_module.list_entry_texts_after
+
+        def slow_list(after_id, limit):
+            # 拉长 "读 max_id" 与 "追加" 之间的窗口
+            rows = original(after_id, limit=limit)
+            time_module.sleep(0.02)
+            return rows
+
+        monkeypatch.setattr(app_module, 'list_entry_texts_after', slow_list)
+        threads = [threading.Thread(target=app_module.sync_vector_index) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        index = vector_index.get_index(storage.DB_PATH)
+        ids = list(index._ids[: index.count])
+        assert index.count == 20
+        assert ids == sorted(set(ids))
+
+
+class TestUrlCanonicalization:
+    def test_canonicalize_url_strips_tracking_and_variants(self):
+        import urlnorm
+
+        canonical = 'https://example.com/posts/1?id=2&page=3'
+        variants = [
+            'http://www.Example.com/posts/1/?page=3&id=2&utm_source=rss&utm_medium=feed',
+            'https://example.com:443/posts/1?id=2&page=3#comments',
+            'https://example.com/posts/1?fbclid=abc&id=2&page=3',
+        ]
+        assert all(urlnorm.canonicalize_url(url) == canonical for url in variants)
+        assert urlnorm.link_hash(variants[0]) == urlnorm.link_hash(canonical)
+        assert urlnorm.link_hash('https://example.com/posts/2') != urlnorm.link_hash(canonical)
+        assert urlnorm.item_link({
+            'link': 'https://feeds.feedburner.com/~r/example/~3/abc',
+            'feedburner_origlink': canonical,
+        }) == canonical
+
+    def test_ambiguous_params_are_only_stripped_on_known_hosts(self):
+        import urlnorm
+
+        # ref 在 GitHub 上指定分支，不同 ref 是不同的内容
+        main = 'https://github.com/example/repo/blob/README.md?ref=main'
+        release = 'https://github.com/example/repo/blob/README.md?ref=v2'
+        assert urlnorm.canonicalize_url(main) == main
+        assert urlnorm.link_hash(main) != urlnorm.link_hash(release)
+        assert urlnorm.canonicalize_url('https://example.com/list?spm=2&page=1') == 'https://example.com/list?page=1&spm=2'
+
+        # 已知站点 (含子域名) 上仍视为跟踪参数
+        assert urlnorm.canonicalize_url(
+            'https://developer.aliyun.com/article/1?spm=a2c6h.12873639'
+        ) == 'https://developer.aliyun.com/article/1'
+        assert urlnorm.canonicalize_url(
+            'https://www.producthunt.com/posts/tool?ref=home'
+        ) == 'https://producthunt.com/posts/tool'
+
+    def test_malformed_and_non_http_links_are_kept_raw(self, client, app_module, monkeypatch):
+        import urlnorm
+
+        assert urlnorm.canonicalize_url(' http://example.com:abc/x ') == 'http://example.com:abc/x'
+        assert urlnorm.canonicalize_url('http://[::1/x') == 'http://[::1/x'
+        assert urlnorm.canonicalize_url('mailto:x@y') == 'mailto:x@y'
+        assert urlnorm.canonicalize_url('//www.example.com/a/') == 'https://example.com/a'
+        assert urlnorm.link_hash('mailto:x@y') != urlnorm.link_hash('https://y/')
+
+        source = _create_source(client, suffix='bad-links')
+        entries = [
+            {'title': 'Bad port', 'link': 'http://example.com:abc/x', 'published': 'Thu, 12 Feb 2026 08:00:00 GMT'},
+            {'title': 'Bad host', 'link': 'http://[::1/x', 'published': 'Thu, 12 Feb 2026 09:00:00 GMT'},
+        ]
+
+        class FakeFeed:
+            def __init__(self, entries):
+                self.entries = entries
+
+        _serve_feeds(monkeypatch, app_module, lambda url: FakeFeed(entries if url == source['url'] else []))
+        monkeypatch.setattr(app_module, 'summarize_text', lambda text: 'summary')
+
+        response = client.post('/ingest')
+        assert response.status_code == 200
+        assert response.json()['inserted'] == 2
+
+        # 启动时的回填遇到坏链接也不能失败
+        with storage.get_conn() as conn:
+            conn.execute("UPDATE entries SET link_hash = NULL")
+        storage.init_db()
+        with storage.get_conn() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM entries WHERE link_hash IS NULL").fetchone()[0] == 0
+
+    def test_mirrored_feeds_skip_summarization(self, client, app_module, monkeypatch):
+        first = _create_source(client, suffix='mirror-a')
+        second = _create_source(client, suffix='mirror-b')
+        item = {
+            'title': 'Release notes',
+            'published': 'Thu, 12 Feb 2026 08:00:00 GMT',
+            'summary': 'Short body',
+        }
+        feeds = {
+            first['url']: [dict(item, link='https://example.com/release?utm_source=a')],
+            second['url']: [dict(item, link='http://www.example.com/release/?utm_source=b')],
+        }
+
+        class FakeFeed:
+            def __init__(self, entries):
+                self.entries = entries
+
+        calls = []
+
+        def fake_summarize(text):
+            calls.append(text)
+            return 'SUMMARY::release'
+
+        _serve_feeds(monkeypatch, app_module, lambda url: FakeFeed(feeds[url]))
+        monkeypatch.setattr(app_module, 'summarize_text', fake_summarize)
+
+        result = client.post('/ingest').json()
+        assert result['inserted'] == 2
+        assert result['duplicates'] == 1
+        assert len(calls) == 1
+
+        feeds[first['url']][0]['link'] = 'https://example.com/release?utm_source=c'
+        again = client.post('/ingest').json()
+        assert (again['inserted'], again['changed'], again['unchanged']) == (0, 0, 2)
+        assert len(calls) == 1
+
+        payload = client.get('/digest?date=2026-02-12').json()
+        assert payload['total'] == 1
+        assert payload['categories']['Tech'][0]['duplicate_count'] == 1
+
+
+class TestContentChanges:
+    def test_only_changed_items_are_resummarized(self, client, app_module, monkeypatch):
+        source = _create_source(client, suffix='changes')
+        items = [
+            {
+                'title': 'Outage report',
+                'link': 'https://example.com/outage',
+                'published': 'Thu, 12 Feb 2026 08:00:00 GMT',
+                'summary': 'The service was down for an hour.',
+            },
+            {
+                'title': 'Release notes',
+                'link': 'https://example.com/release',
+                'published': 'Thu, 12 Feb 2026 09:00:00 GMT',
+                'summary': 'Version 2 is out.',
+            },
+        ]
+
+        class FakeFeed:
+            def __init__(self, entries):
+                self.entries = entries
+
+        calls = []
+
+        def fake_summarize(text):
+            calls.append(text)
+            return f'SUMMARY::{text}'
+
+        _serve_feeds(monkeypatch, app_module, lambda url: FakeFeed(items))
+        monkeypatch.setattr(app_module, 'summarize_text', fake_summarize)
+
+        first = client.post('/ingest').json()
+        assert first['sources'] == [{
+            'source_id': source['id'], 'title': source['title'], 'new': 2, 'changed': 0, 'unchanged': 0,
+        }]
+        assert len(calls) == 2
+
+        items[0]['summary'] = 'Correction: the service was down for three hours.'
+        second = client.post('/ingest').json()
+        assert (second['inserted'], second['changed'], second['unchanged']) == (0, 1, 1)
+        assert calls[2:] == ['Correction: the service was down for three hours.']
+
+        third = client.post('/ingest').json()
+        assert (third['changed'], third['unchanged']) == (0, 2)
+        assert len(calls) == 3
+
+        digest = client.get('/digest?date=2026-02-12').json()
+        summaries = {item['link']: item['summary'] for item in digest['categories']['Tech']}
+        assert summaries['https://example.com/outage'] == (
+            'SUMMARY::Correction: the service was down for three hours.'
+        )
+
+
+class TestTimestamps:
+    def test_parse_timestamp_normalizes_to_utc(self):
+        from datetime import datetime, timezone
+
+        from timestamps import parse_timestamp, to_epoch
+
+        expected = datetime(2026, 2, 12, 8, 0, tzinfo=timezone.utc)
+        for value in [
+            'Thu, 12 Feb 2026 08:00:00 GMT',
+            'Thu, 12 Feb 2026 03:00:00 EST',
+            '12 Feb 26 16:00 +0800',
+            '2026-02-12T08:00:00Z',
+            '2026-02-12T09:00:00.000+01:00',
+            'February 12, 2026 8:00 AM',
+        ]:
+            assert parse_timestamp(value) == expected, value
+        assert parse_timestamp('2026-02-12') == datetime(2026, 2, 12, tzinfo=timezone.utc)
+        assert parse_timestamp('Mon, 30 Feb 2026 08:00:00 GMT') is None
+        assert parse_timestamp('not a date') is None
+        assert parse_timestamp(None) is None
+        assert to_epoch(expected) == to_epoch(expected.replace(tzinfo=None)) == 1770883200
+
+    def test_ingest_groups_entries_by_utc_date(self, client, app_module, monkeypatch):
+        _create_source(client, suffix='timestamps')
+        items = [
+            {
+                'title': 'Late night post',
+                'link': 'https://example.com/late',
+                'published': '2026-02-12T22:30:00-05:00',
+                'summary': 'Published in New York on the evening of the 12th.',
+            },
+            {
+                'title': 'Undated post',
+                'link': 'https://example.com/undated',
+                'published': 'sometime last week',
+                'summary': 'No usable date.',
+            },
+        ]
+
+        class FakeFeed:
+            def __init__(self, entries):
+                self.entries = entries
+
+        _serve_feeds(monkeypatch, app_module, lambda url: FakeFeed(items))
+        monkeypatch.setattr(app_module, 'summarize_text', lambda text: 'summary')
+
+        assert client.post('/ingest').json()['inserted'] == 2
+        assert client.get('/digest?date=2026-02-12').json()['total'] == 0
+        digest = client.get('/digest?date=2026-02-13').json()
+        assert [item['title'] for item in digest['categories']['Tech']] == ['Late night post']
+
+        with app_module.storage.get_conn() as conn:
+            row = conn.execute(
+                "SELECT published_at, published_ts FROM entries WHERE link = 'https://example.com/late'"
+            ).fetchone()
+        assert row['published_at'] == '2026-02-13T03:30:00'
+        assert row['published_ts'] == 1770953400
+
+
+class TestSourceHealth:
+    def _feeds(self, app_module, monkeypatch, behaviours):
+        class FakeFeed:
+            def __init__(self, entries):
+                self.entries = entries
+
+        def fake_parse(url):
+            behaviour = behaviours[url]
+            if isinstance(behaviour, Exception):
+                raise behaviour
+            if callable(behaviour):
+                return FakeFeed(behaviour())
+            return FakeFeed(behaviour)
+
+        _serve_feeds(monkeypatch, app_module, fake_parse)
+        monkeypatch.setattr(app_module, 'summarize_text', lambda text: 'summary')
+
+    def test_failing_source_backs_off_until_forced(self, client, app_module, monkeypatch):
+        healthy = _create_source(client, suffix='healthy')
+        broken = _create_source(client, suffix='broken')
+        item = {'title': 'Post', 'link': 'https://example.com/post', 'summary': 'Body'}
+        behaviours = {healthy['url']: [item], broken['url']: ConnectionError('connection refused')}
+        self._feeds(app_module, monkeypatch, behaviours)
+
+        first = client.post('/ingest').json()
+        assert first['inserted'] == 1
+        assert first['failed'] == [
+            {'source_id': broken['id'], 'title': broken['title'], 'error': 'connection refused'}
+        ]
+
+        second = client.post('/ingest').json()
+        assert [row['source_id'] for row in second['sources']] == [healthy['id']]
+        assert [(row['source_id'], row['status']) for row in second['skipped']] == [(broken['id'], 'backoff')]
+
+        meta = {row['id']: row['health'] for row in client.get('/sources/meta').json()}
+        assert meta[healthy['id']]['status'] == 'ok'
+        assert meta[healthy['id']]['avg_latency_ms'] is not None
+        assert meta[broken['id']]['status'] == 'backoff'
+        assert meta[broken['id']]['consecutive_failures'] == 1
+        assert meta[broken['id']]['last_error'] == 'connection refused'
+        assert meta[broken['id']]['next_attempt_at'] is not None
+
+        behaviours[broken['url']] = [dict(item, link='https://example.com/recovered')]
+        forced = client.post('/ingest?force=true').json()
+        assert forced['skipped'] == [] and forced['failed'] == []
+        meta = {row['id']: row['health'] for row in client.get('/sources/meta').json()}
+        assert meta[broken['id']]['status'] == 'ok'
+        assert meta[broken['id']]['next_attempt_at'] is None
+
+    def test_backoff_grows_until_quarantine(self, app_module):
+        feedhealth = app_module.feedhealth
+        delays = [feedhealth.backoff_seconds(n) for n in range(1, feedhealth.QUARANTINE_AFTER + 1)]
+        assert delays == sorted(delays)
+        assert delays[0] == feedhealth.BACKOFF_BASE
+        assert delays[-1] == feedhealth.BACKOFF_MAX
+
+    def test_slow_sources_time_out_and_deadline_reports_stragglers(self, client, app_module, monkeypatch):
+        import threading
+        import time
+
+        fast = _create_source(client, suffix='fast')
+        slow = _create_source(client, suffix='slow')
+        hanging = _create_source(client, suffix='hanging')
+        release = threading.Event()
+
+        def slow_feed():
+            time.sleep(0.5)
+            return []
+
+        def hanging_feed():
+            release.wait(5)
+            return []
+
+        self._feeds(app_module, monkeypatch, {
+            fast['url']: [{'title': 'Fast', 'link': 'https://example.com/fast', 'summary': 'Body'}],
+            slow['url']: slow_feed,
+            hanging['url']: hanging_feed,
+        })
+        # 超时按历史耗时估算：慢源超出自身超时计为失败，卡住的源在总时限到达时只报告为 straggler
+        app_module.storage.record_fetch_success(slow['id'], 20)
+        app_module.storage.record_fetch_success(hanging['id'], 10_000)
+        monkeypatch.setattr(app_module.feedhealth, 'FETCH_TIMEOUT_MIN', 0.1)
+        monkeypatch.setattr(app_module.feedhealth, 'INGEST_DEADLINE', 1.0)
+        try:
+            started = time.monotonic()
+            result = client.post('/ingest').json()
+            elapsed = time.monotonic() - started
+        finally:
+            release.set()
+
+        assert elapsed < 3
+        assert result['inserted'] == 1
+        assert [row['source_id'] for row in result['failed']] == [slow['id']]
+        assert result['failed'][0]['error'].startswith('timeout')
+        assert [row['source_id'] for row in result['stragglers']] == [hanging['id']]
+        meta = {row['id']: row['health'] for row in client.get('/sources/meta').json()}
+        assert meta[slow['id']]['consecutive_failures'] == 1
+        # straggler 记为软失败：不累计连续失败，但推迟到下一个退避周期
+        assert meta[hanging['id']]['consecutive_failures'] == 0
+        assert meta[hanging['id']]['status'] == 'deferred'
+        assert meta[hanging['id']]['next_attempt_at'] is not None
+
+        again = client.post('/ingest').json()
+        assert [row['source_id'] for row in again['sources']] == [fast['id']]
+        assert (hanging['id'], 'deferred') in [(row['source_id'], row['status']) for row in again['skipped']]
+
+    def test_download_and_source_service_over_http(self, app_module, monkeypatch, request):
+        import asyncio
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        import pytest
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                routes = {
+                    '/feed.xml': ('application/rss+xml', b'<rss version="2.0"><channel></channel></rss>'),
+                    '/sources': ('application/json', b'[{"id": 1, "url": "https://example.com/feed.xml"}]'),
+                }
+                if self.path not in routes:
+                    self.send_error(404)
+                    return
+                content_type, body = routes[self.path]
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        request.addfinalizer(server.server_close)
+        request.addfinalizer(server.shutdown)
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+
+        body, headers = app_module.download_feed(f'{base}/feed.xml', 5)
+        assert body.startswith(b'<rss')
+        assert headers == {'content-location': f'{base}/feed.xml', 'content-type': 'application/rss+xml'}
+        with pytest.raises(RuntimeError, match='HTTP 404'):
+            app_module.download_feed(f'{base}/missing.xml', 5)
+
+        monkeypatch.setattr(app_module, 'SOURCE_SERVICE_URL', base)
+        assert asyncio.run(app_module.fetch_sources()) == [{'id': 1, 'url': 'https://example.com/feed.xml'}]
+        # Source Service 不可用时返回空列表
+        monkeypatch.setattr(app_module, 'SOURCE_SERVICE_URL', f'{base}/down')
+        assert asyncio.run(app_module.fetch_sources()) == []
+
+    def test_download_times_out_on_a_stalled_server(self, app_module):
+        import socket
+        import threading
+        import time
+
+        import pytest
+
+        # 接受连接后一直不响应的服务器
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        accepted = []
+        threading.Thread(target=lambda: accepted.append(server.accept()), daemon=True).start()
+        try:
+            started = time.monotonic()
+            with pytest.raises(Exception):
+                app_module.download_feed(f'http://127.0.0.1:{server.getsockname()[1]}/feed.xml', 0.3)
+            assert time.monotonic() - started < 2
+        finally:
+            for conn, _ in accepted:
+                conn.close()
+            server.close()
+
+
+class TestDigestRanking:
+    def _entry(self, source_id, title, published, unread=True):
+        return storage.Entry(
+            id=0,
+            source_id=source_id,
+            title=title,
+            link=f'https://example.com/rank/{title}',
+            published_at=datetime.fromisoformat(published),
+            summary=f'{title} summary',
+            content=f'{title} content',
+            unread=unread,
+        )
+
+    def test_top_per_group_keeps_highest_scores_in_order(self):
+        import ranking
+
+        items = [('a', 1), ('b', 5), ('a', 3), ('a', 2), ('b', 4), ('a', 3)]
+        groups = ranking.top_per_group(items, group=lambda item: item[0], key=lambda item: item[1], k=2)
+
+        assert list(groups) == ['a', 'b']
+        assert groups['a'] == [('a', 3), ('a', 3)]
+        assert groups['b'] == [('b', 5), ('b', 4)]
+        assert ranking.top_per_group(items, lambda item: item[0], lambda item: item[1])['a'] == [
+            ('a', 3), ('a', 3), ('a', 2), ('a', 1)
+        ]
+
+    def test_digest_top_and_score_rank(self, client):
+        trusted = _create_source(client, suffix='rank-trusted')
+        other = _create_source(client, suffix='rank-other')
+        response = client.put(f"/sources/{trusted['id']}/weight", json={'weight': 3})
+        assert response.json()['weight'] == 3
+        assert client.put('/sources/999999/weight', json={'weight': 3}).status_code == 404
+        storage.add_entries([
+            self._entry(other['id'], 'Newest', '2026-02-12T12:00:00'),
+            self._entry(trusted['id'], 'Trusted', '2026-02-12T09:00:00'),
+            self._entry(other['id'], 'Read', '2026-02-12T11:00:00', unread=False),
+        ])
+
+        by_time = client.get('/digest?date=2026-02-12&top=2').json()
+        assert by_time['total'] == 3
+        assert [item['title'] for item in by_time['categories']['Tech']] == ['Newest', 'Read']
+
+        by_score = client.get('/digest?date=2026-02-12&top=2&rank=score').json()
+        ranked = by_score['categories']['Tech']
+        assert [item['title'] for item in ranked] == ['Trusted', 'Newest']
+        assert ranked[0]['score'] > ranked[1]['score']
+
+        assert client.get('/digest?date=2026-02-12&top=0').status_code == 422
+
+
+class TestDigestRange:
+    def _entry(self, source_id, title, published, canonical_id=None):
+        return storage.Entry(
+            id=0,
+            source_id=source_id,
+            title=title,
+            link=f'https://example.com/range/{title}',
+            published_at=datetime.fromisoformat(published),
+            summary=f'{title} summary',
+            content=f'{title} content',
+            unread=True,
+            canonical_id=canonical_id,
+        )
+
+    def test_range_merges_days_and_reuses_snapshots(self, client, app_module, monkeypatch):
+        source = _create_source(client, suffix='range')
+        storage.add_entries([
+            self._entry(source['id'], 'Monday', '2026-02-09T08:00:00'),
+            self._entry(source['id'], 'Wednesday', '2026-02-11T08:00:00'),
+            self._entry(source['id'], 'NextWeek', '2026-02-16T08:00:00'),
+        ])
+        monday = storage.list_entries_between(0, 2**40)[-1]
+        # 周二转载了周一的故事：区间内只保留一条，计为一次转载
+        storage.add_entries([self._entry(source['id'], 'Repost', '2026-02-10T08:00:00', canonical_id=monday.id)])
+
+        loads = []
+        original = app_module.list_entries_between
+        monkeypatch.setattr(
+            app_module, 'list_entries_between', lambda *args: loads.append(args) or original(*args)
+        )
+
+        weekly = client.get('/digest/weekly?date=2026-02-12&rank=time').json()
+        assert (weekly['start'], weekly['end']) == ('2026-02-09', '2026-02-15')
+        assert weekly['total'] == 2
+        assert weekly['days']['2026-02-10'] == 1
+        assert weekly['categories']['Tech']['total'] == 2
+        assert [item['title'] for item in weekly['categories']['Tech']['items']] == ['Wednesday', 'Repost']
+        assert weekly['categories']['Tech']['items'][1]['duplicate_count'] == 1
+        assert len(loads) == 1
+
+        # 已缓存的天不再读取条目；只有新增条目的那一天重建
+        daily = client.get('/digest?date=2026-02-11').json()
+        assert daily['total'] == 1
+        assert len(loads) == 1
+        storage.add_entries([self._entry(source['id'], 'Late', '2026-02-11T20:00:00')])
+        ranged = client.get('/digest/range?start=2026-02-09&end=2026-02-11&top=1').json()
+        assert ranged['total'] == 3
+        assert len(ranged['categories']['Tech']['items']) == 1
+        assert loads[-1] == (loads[-1][0], loads[-1][0] + 86400)
+
+        assert client.get('/digest/range?start=2026-02-11&end=2026-02-09').status_code == 400
+        assert client.get('/digest/range?start=2026-13-01').status_code == 400
+
+    def test_editing_a_story_invalidates_its_duplicates_on_other_days(self, client):
+        source = _create_source(client, suffix='range-edit')
+        storage.add_entries([self._entry(source['id'], 'Story', '2026-02-09T08:00:00')])
+        story = storage.list_entries_between(0, 2**40)[-1]
+        storage.add_entries([self._entry(source['id'], 'Repost', '2026-02-10T08:00:00', canonical_id=story.id)])
+
+        before = client.get('/digest/range?start=2026-02-09&end=2026-02-10&rank=time').json()
+        assert [item['summary'] for item in before['categories']['Tech']['items']] == ['Repost summary']
+
+        # 周一的规范条目被改写，新摘要同步给周二的转载：周二的快照也要重建
+        signatures = storage.entry_signatures([0, 2**40])
+        story.summary = 'Story rewritten'
+        storage.update_entry_content(story)
+        assert storage.entry_signatures([0, 2**40]) != signatures
+        assert all(isinstance(value, int) for value in storage.entry_signatures([0, 2**40])[0])
+
+        after = client.get('/digest/range?start=2026-02-09&end=2026-02-10&rank=time').json()
+        assert [item['summary'] for item in after['categories']['Tech']['items']] == ['Story rewritten']
+
+
+class TestDigestTimezone:
+    def test_local_day_boundaries(self, client):
+        source = _create_source(client, suffix='tz')
+        storage.add_entries([
+            storage.Entry(
+                id=0,
+                source_id=source['id'],
+                title=title,
+                link=f'https://example.com/tz/{title}',
+                published_at=datetime.fromisoformat(published),
+                summary='summary',
+                content='content',
+                unread=True,
+            )
+            for title, published in [
+                ('EarlyMorning', '2026-02-11T17:00:00+00:00'),
+                ('Evening', '2026-02-12T10:00:00+00:00'),
+                ('NextDay', '2026-02-12T17:00:00+00:00'),
+            ]
+        ])
+
+        utc = client.get('/digest?date=2026-02-12').json()
+        assert utc['tz'] == 'UTC'
+        assert {item['title'] for item in utc['categories']['Tech']} == {'Evening', 'NextDay'}
+
+        local = client.get('/digest?date=2026-02-12&tz=Asia/Shanghai').json()
+        assert local['tz'] == 'Asia/Shanghai'
+        assert [item['title'] for item in local['categories']['Tech']] == ['Evening', 'EarlyMorning']
+
+        weekly = client.get('/digest/weekly?date=2026-02-12&tz=Asia/Shanghai').json()
+        assert weekly['days']['2026-02-12'] == 2
+        assert weekly['days']['2026-02-13'] == 1
+
+        assert client.get('/digest?tz=Mars/Olympus').status_code == 400
@@ -0,0 +1,116 @@
+# Feed 时间戳规范化
+# RFC 822 (RSS) 与 ISO 8601 (Atom) 走正则快速路径，其余格式回退到 dateutil；
+# 结果统一转换为 UTC，并按原始字符串做 LRU 缓存 (同一 Feed 每次拉取都会带回相同的日期串)。
+# rss-service 也直接使用本模块 (见 services/rss-service/Dockerfile)，不要在别处复制。
+
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+try:
+    from dateutil import parser as _dateutil
+except ImportError:  # 只用快速路径
+    _dateutil = None
+
+_MONTHS = {
+    name: index
+    for index, name in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1
+    )
+}
+# RFC 822 / 常见时区缩写 (小时偏移)
+_ZONES = {
+    "ut": 0, "utc": 0, "gmt": 0, "z": 0, "wet": 0, "bst": 1, "cet": 1, "cest": 2, "eet": 2, "eest": 3, "msk": 3,
+    "ist": 5.5, "cst": -6, "cdt": -5, "est": -5, "edt": -4, "mst": -7, "mdt": -6, "pst": -8, "pdt": -7,
+    "akst": -9, "akdt": -8, "hst": -10, "jst": 9, "kst": 9, "hkt": 8, "sgt": 8, "aest": 10, "aedt": 11,
+}
+_RFC822 = re.compile(
+    r"^\s*(?:[a-z]{3,9},?\s+)?(\d{1,2})[\s-]+([a-z]{3})[a-z]*\.?[\s-]+(\d{2,4})\s+"
+    r"(\d{1,2}):(\d{2})(?::(\d{2}))?(?:\.\d+)?\s*([+-]\d{2}:?\d{2}|[a-z]{1,5})?\s*$",
+    re.IGNORECASE,
+)
+_ISO8601 = re.compile(
+    r"^\s*(\d{4})-?(\d{2})-?(\d{2})(?:[t\s](\d{2}):?(\d{2})(?::?(\d{2})(?:[.,](\d+))?)?)?"
+    r"\s*(z|[+-]\d{2}(?::?\d{2})?)?\s*$",
+    re.IGNORECASE,
+)
+_DATEUTIL_ZONES = {name.upper(): int(hours * 3600) for name, hours in _ZONES.items()}
+CACHE_SIZE = 8192
+
+
+def _offset(zone: Optional[str]) -> timezone:
+    if not zone:
+        return timezone.utc  # 没有时区的按 UTC 处理
+    zone = zone.lower()
+    if zone[0] in "+-":
+        digits = zone[1:].replace(":", "")
+        minutes = int(digits[:2]) * 60 + (int(digits[2:4]) if len(digits) > 2 else 0)
+        return timezone(timedelta(minutes=-minutes if zone[0] == "-" else minutes))
+    if zone in _ZONES:
+        return timezone(timedelta(hours=_ZONES[zone]))
+    raise ValueError(f"unknown timezone {zone}")
+
+
+def _rfc822(match: "re.Match[str]") -> datetime:
+    day, month, year, hour, minute, second, zone = match.groups()
+    year_number = int(year)
+    if len(year) == 2:
+        year_number += 2000 if year_number < 70 else 1900
+    return datetime(
+        year_number, _MONTHS[month.lower()], int(day), int(hour), int(minute), int(second or 0),
+        tzinfo=_offset(zone),
+    )
+
+
+def _iso8601(match: "re.Match[str]") -> datetime:
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    microsecond = int((fraction or "0")[:6].ljust(6, "0"))
+    return datetime(
+        int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0), microsecond,
+        tzinfo=_offset(zone),
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(value: str) -> Optional[datetime]:
+    try:
+        match = _RFC822.match(value)
+        if match and match.group(2).lower() in _MONTHS:
+            return _rfc822(match).astimezone(timezone.utc)
+        match = _ISO8601.match(value)
+        if match:
+            return _iso8601(match).astimezone(timezone.utc)
+    except (ValueError, OverflowError):
+        pass  # 形似但取值非法 (如 2 月 30 日)，交给 dateutil 判断
+    if _dateutil is None:
+        return None
+    try:
+        parsed = _dateutil.parse(value, tzinfos=_DATEUTIL_ZONES)
+    except (ValueError, OverflowError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """解析 Feed 中的日期字符串，返回带 UTC 时区的 datetime；无法解析时返回 None"""
+    if not value:
+        return None
+    return _parse(value.strip())
+
+
+def to_utc(value: datetime) -> datetime:
+    """不带时区的 datetime 视为 UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def to_epoch(value: datetime) -> int:
+    return int(to_utc(value).timestamp())
+
+
+def cache_info():
+    return _parse.cache_info()
@@ -0,0 +1,93 @@
+import hashlib
+import posixpath
+from typing import Optional
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+from fingerprint import to_signed
+
+# 只用于统计来源、不影响内容的查询参数
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "igshid",
+    "ref_src", "ref_url", "cmpid", "_ga", "_hsenc", "_hsmi", "mkt_tok",
+    "vero_id", "wt_mc",
+}
+_TRACKING_PREFIXES = ("utm_", "ga_", "pk_", "hmsr", "hmpl", "hmcu", "hmkw", "hmci")
+# 只在这些站点 (含子域名) 上是跟踪参数；其他站点上同名参数可能决定内容 (如 ?ref=main 指定分支)，保留
+_HOST_TRACKING_PARAMS = {
+    "aliyun.com": {"spm"},
+    "alibaba.com": {"spm"},
+    "taobao.com": {"spm"},
+    "tmall.com": {"spm"},
+    "producthunt.com": {"ref"},
+}
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_INDEX_PAGES = {"index.html", "index.htm", "index.php", "default.aspx"}
+
+
+def _host_tracking_params(host: str) -> set:
+    labels = host.split(".")
+    params: set = set()
+    for start in range(len(labels) - 1):
+        params |= _HOST_TRACKING_PARAMS.get(".".join(labels[start:]), set())
+    return params
+
+
+def _is_tracking(key: str, host_params: set) -> bool:
+    lowered = key.lower()
+    return lowered in _TRACKING_PARAMS or lowered.startswith(_TRACKING_PREFIXES) or lowered in host_params
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化链接：统一 https、小写主机、去掉 www/默认端口/片段/跟踪参数/末尾斜杠，
+    查询参数排序。只用于判重，入库仍保留原始链接。
+    只处理 http(s) 和协议相对 (//host/path) 的链接；其他 scheme 或解析失败的链接原样返回 (去掉首尾空白)，
+    任何一条坏链接都不能让拉取或启动时的回填失败。
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if url.startswith("//"):
+        url = f"https:{url}"
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        # 非法端口 (http://host:abc) 或不完整的 IPv6 地址 (http://[::1/x)
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        return url
+
+    host = (parts.hostname or "").lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host if port is None or str(port) in _DEFAULT_PORTS.values() else f"{host}:{port}"
+
+    path = quote(unquote(parts.path), safe="/%:@!$&'()*+,;=~-._")
+    path = posixpath.normpath(path) if path else "/"
+    if posixpath.basename(path) in _INDEX_PAGES:
+        path = posixpath.dirname(path)
+    path = path.rstrip("/") or "/"
+
+    host_params = _host_tracking_params(host)
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(key, host_params)
+    )
+    return urlunsplit(("https", netloc, path, urlencode(query), ""))
+
+
+def link_hash(url: str) -> Optional[int]:
+    """规范链接的 64 位哈希 (有符号，便于直接存入 SQLite INTEGER 并建索引)"""
+    canonical = canonicalize_url(url)
+    if not canonical:
+        return None
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).digest()
+    return to_signed(int.from_bytes(digest, "big"))
+
+
+def item_link(item: dict) -> str:
+    """FeedBurner 等代理会把原文地址放在 feedburner_origlink，优先使用"""
+    return item.get("feedburner_origlink") or item.get("link", "")
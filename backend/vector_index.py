@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from fingerprint import tokenize
+
+DIM = 256
+LSH_TABLES = 16
+LSH_BITS = 16
+LSH_SEED = 20260212
+# 条目较少时直接精确计算，超过后走 LSH 候选 + 精确重排
+EXACT_SEARCH_LIMIT = 50_000
+# 增量追加的行先放在未排序的尾部，积累到一定数量再并入有序桶
+DELTA_REBUILD = 10_000
+INITIAL_CAPACITY = 1024
+
+# 同步端点跑在线程池里：追加 / 覆盖 / 落盘与扩容重映射互斥，避免两个请求读到同一个 max_id 重复追加。
+# 可重入，调用方可以把 "读 max_id + 追加" 整体包在锁内
+lock = threading.RLock()
+
+
+def embed(text: str) -> np.ndarray:
+    """本地哈希嵌入：带符号的特征哈希 + 次线性词频，L2 归一化，不依赖网络或模型文件"""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for token, count in Counter(tokenize(text)).items():
+        value = zlib.crc32(token.encode("utf-8"))
+        vector[value % DIM] += (1.0 if value >> 31 else -1.0) * (1.0 + np.log(count))
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class VectorIndex:
+    """
+    基于内存映射 float32 矩阵的向量索引。
+    {prefix}.vec 存向量，{prefix}.ids 存条目 id，{prefix}.lsh 存各表的随机超平面哈希码；
+    查询时在每张 LSH 表的有序哈希码上二分定位桶，合并候选后做精确内积重排。
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        planes = np.random.default_rng(LSH_SEED).standard_normal((LSH_TABLES * LSH_BITS, DIM))
+        self._planes = planes.astype(np.float32)
+        self._powers = (1 << np.arange(LSH_BITS, dtype=np.uint16)).astype(np.uint16)
+        self.count = 0
+        self.capacity = 0
+        meta_path = f"{prefix}.meta.json"
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as handle:
+                meta = json.load(handle)
+            self.count = meta["count"]
+            self.capacity = meta["capacity"]
+        self._open(max(self.capacity, INITIAL_CAPACITY))
+        self._rebuild_buckets()
+
+    # ---------- 存储 ----------
+
+    def _open(self, capacity: int) -> None:
+        files = {
+            "vec": (np.float32, (capacity, DIM)),
+            "ids": (np.int64, (capacity,)),
+            "lsh": (np.uint16, (capacity, LSH_TABLES)),
+        }
+        mapped = {}
+        for suffix, (dtype, shape) in files.items():
+            path = f"{self.prefix}.{suffix}"
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            with open(path, "ab") as handle:
+                if handle.tell() < size:
+                    handle.truncate(size)
+            mapped[suffix] = np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+        self._vectors = mapped["vec"]
+        self._ids = mapped["ids"]
+        self._codes = mapped["lsh"]
+        self.capacity = capacity
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self.flush()
+        del self._vectors, self._ids, self._codes
+        self._open(capacity)
+
+    def flush(self) -> None:
+        with lock:
+            self._vectors.flush()
+            self._ids.flush()
+            self._codes.flush()
+            with open(f"{self.prefix}.meta.json", "w", encoding="utf-8") as handle:
+                json.dump({"count": self.count, "capacity": self.capacity, "dim": DIM}, handle)
+
+    @property
+    def max_id(self) -> int:
+        return int(self._ids[self.count - 1]) if self.count else 0
+
+    # ---------- LSH ----------
+
+    def _hash(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors @ self._planes.T > 0).reshape(len(vectors), LSH_TABLES, LSH_BITS)
+        return (bits * self._powers).sum(axis=2).astype(np.uint16)
+
+    def _rebuild_buckets(self) -> None:
+        codes = np.asarray(self._codes[: self.count])
+        self._order = [
+            np.argsort(codes[:, table], kind="stable").astype(np.int32) for table in range(LSH_TABLES)
+        ]
+        self._sorted = [codes[order, table] for table, order in enumerate(self._order)]
+        self._delta_start = self.count
+
+    def _probes(self, code: int) -> np.ndarray:
+        """多探针：除自身桶外再查汉明距离为 1 的相邻桶，用少量候选换召回率"""
+        return np.array([code] + [code ^ (1 << bit) for bit in range(LSH_BITS)], dtype=np.uint16)
+
+    def _candidates(self, query_codes: np.ndarray) -> np.ndarray:
+        found = []
+        delta = np.asarray(self._codes[self._delta_start: self.count])
+        for table in range(LSH_TABLES):
+            probes = self._probes(int(query_codes[table]))
+            lefts = np.searchsorted(self._sorted[table], probes, side="left")
+            rights = np.searchsorted(self._sorted[table], probes, side="right")
+            found.extend(self._order[table][left:right] for left, right in zip(lefts, rights) if right > left)
+            if len(delta):
+                found.append(np.flatnonzero(np.isin(delta[:, table], probes)) + self._delta_start)
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    # ---------- 读写 ----------
+
+    def add_many(self, items: Iterable[Tuple[int, np.ndarray]]) -> int:
+        items = list(items)
+        if not items:
+            return 0
+        vectors = np.stack([vector for _, vector in items]).astype(np.float32)
+        with lock:
+            if self.count + len(items) > self.capacity:
+                self._grow(self.count + len(items))
+            start, end = self.count, self.count + len(items)
+            self._vectors[start:end] = vectors
+            self._ids[start:end] = [entry_id for entry_id, _ in items]
+            self._codes[start:end] = self._hash(vectors)
+            self.count = end
+            if self.count - self._delta_start >= DELTA_REBUILD:
+                self._rebuild_buckets()
+            self.flush()
+        return len(items)
+
+    def update_many(self, items: Iterable[Tuple[int, np.ndarray]]) -> int:
+        """内容变化时原地覆盖向量；有序桶里的行改了哈希码，整批改完后只重建一次"""
+        updated = 0
+        rebuild = False
+        with lock:
+            for entry_id, vector in items:
+                row = self._row_of(entry_id)
+                if row is None:
+                    continue
+                self._vectors[row] = vector
+                self._codes[row] = self._hash(vector[np.newaxis, :])[0]
+                rebuild = rebuild or row < self._delta_start
+                updated += 1
+            if rebuild:
+                self._rebuild_buckets()
+            if updated:
+                self.flush()
+        return updated
+
+    def _row_of(self, entry_id: int) -> Optional[int]:
+        # 条目按自增 id 顺序写入，ids 有序
+        ids = self._ids[: self.count]
+        row = int(np.searchsorted(ids, entry_id))
+        if row < self.count and ids[row] == entry_id:
+            return row
+        return None
+
+    def vector_of(self, entry_id: int) -> Optional[np.ndarray]:
+        with lock:
+            row = self._row_of(entry_id)
+            return np.array(self._vectors[row]) if row is not None else None
+
+    def search(self, vector: np.ndarray, k: int = 10, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        # 扩容时会重新映射文件，读取也要避开写入中的状态
+        with lock:
+            if self.count == 0:
+                return []
+            if self.count <= EXACT_SEARCH_LIMIT:
+                rows = np.arange(self.count)
+            else:
+                rows = self._candidates(self._hash(vector[np.newaxis, :])[0])
+                if rows.size == 0:
+                    return []
+            scores = np.asarray(self._vectors[rows]) @ vector
+            ids = np.asarray(self._ids[rows])
+        if exclude is not None:
+            scores = np.where(ids == exclude, -np.inf, scores)
+        top = min(k, rows.size)
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [(int(ids[i]), float(scores[i])) for i in best if np.isfinite(scores[i]) and scores[i] > 0]
+
+
+_indexes: Dict[str, VectorIndex] = {}
+
+
+def index_prefix(db_path: str) -> str:
+    return os.getenv("VECTOR_INDEX_PATH") or os.path.join(os.path.dirname(os.path.abspath(db_path)), "vectors")
+
+
+def get_index(db_path: str) -> VectorIndex:
+    prefix = index_prefix(db_path)
+    with lock:
+        if prefix not in _indexes:
+            _indexes[prefix] = VectorIndex(prefix)
+        return _indexes[prefix]
@@ -4,6 +4,9 @@ import Sources from './pages/Sources.jsx';
 import Digest from './pages/Digest.jsx';
 
 const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000';
+// 日报按浏览器所在时区的自然日划分
+const TIME_ZONE = Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC';
+const localDate = () => new Date().toLocaleDateString('en-CA');
 
 const defaultSources = [
   { url: 'https://hnrss.org/frontpage', title: 'Hacker News', category: '科技' },
@@ -18,7 +21,7 @@ export default function App() {
   const [sourceMeta, setSourceMeta] = useState([]);
   const [digest, setDigest] = useState(null);
   const [loading, setLoading] = useState(false);
-  const [date, setDate] = useState(new Date().toISOString().slice(0, 10));
+  const [date, setDate] = useState(localDate());
   const [error, setError] = useState('');
   const [form, setForm] = useState({ url: '', title: '', category: '默认' });
 
@@ -45,7 +48,7 @@ export default function App() {
     setLoading(true);
     setError('');
     try {
-      const res = await fetch(`${API_BASE}/digest?date=${date}`);
+      const res = await fetch(`${API_BASE}/digest?date=${date}&tz=${encodeURIComponent(TIME_ZONE)}`);
       if (!res.ok) {
         throw new Error('无法获取日报。');
       }
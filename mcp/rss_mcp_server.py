@@ -64,10 +64,11 @@ async def mark_entry_read(entry_id: int) -> str:
 
 
 @mcp.tool()
-async def get_daily_digest(date: str | None = None) -> str:
-    """获取指定日期的日报，默认今日。"""
+async def get_daily_digest(date: str | None = None, top: int | None = None) -> str:
+    """获取指定日期的日报，默认今日。top 指定时每个分类只返回综合排名前 top 条。"""
     target = date or datetime.utcnow().strftime("%Y-%m-%d")
-    digest = _request("GET", f"/digest?date={target}")
+    query = f"&top={top}&rank=score" if top else ""
+    digest = _request("GET", f"/digest?date={target}{query}")
     return json.dumps(digest, ensure_ascii=False, indent=2)
 
 
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+
+@pytest.fixture()
+def make_redis():
+    """
+    返回一个协程函数，在测试自己的事件循环里创建 Redis 客户端。
+    设置 TEST_REDIS_URL 时连接真实 Redis (会清空该库)，否则使用 fakeredis；两者都没有则跳过。
+    """
+    url = os.getenv("TEST_REDIS_URL")
+    if not url:
+        fakeredis = pytest.importorskip("fakeredis")
+
+    async def make():
+        if not url:
+            return fakeredis.FakeAsyncRedis()
+        import redis.asyncio as redis
+
+        client = redis.from_url(url)
+        await client.flushdb()
+        return client
+
+    return make
@@ -0,0 +1,68 @@
+# 批量写入压测
+# 对运行中的 data-service 调用 POST /entries/bulk，统计每秒写入条数
+#
+#   python bench_bulk.py --url http://localhost:8005 --total 100000 --batch 1000 --concurrency 4
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark data-service bulk entry writes")
+    parser.add_argument("--url", default="http://localhost:8005")
+    parser.add_argument("--total", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    run = uuid.uuid4().hex[:8]
+    async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+        response = await client.post(
+            "/sources/resolve",
+            json=[{"url": f"https://bench-{run}.example.com/feed.xml", "title": f"bench {run}", "category": "bench"}],
+        )
+        response.raise_for_status()
+        source_id = response.json()[0]["id"]
+        published_at = datetime.now(timezone.utc).isoformat()
+
+        batches = asyncio.Queue()
+        for start in range(0, args.total, args.batch):
+            batches.put_nowait(range(start, min(start + args.batch, args.total)))
+
+        inserted = 0
+
+        async def worker() -> None:
+            nonlocal inserted
+            while not batches.empty():
+                numbers = batches.get_nowait()
+                payload = {
+                    "entries": [
+                        {
+                            "source_id": source_id,
+                            "title": f"Entry {n}",
+                            "link": f"https://bench-{run}.example.com/{n}",
+                            "published_at": published_at,
+                            "summary": "summary " * 20,
+                            "content": "content " * 100,
+                        }
+                        for n in numbers
+                    ]
+                }
+                response = await client.post("/entries/bulk", json=payload)
+                response.raise_for_status()
+                inserted += response.json()["inserted"]
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"inserted {inserted} entries in {elapsed:.2f}s -> {inserted / elapsed:,.0f} entries/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,26 +1,66 @@
 # Digest Service - 日报聚合服务
 # 独立的日报聚合微服务
+# 以消费组订阅事件流，每条 entry.summarized 事件增量写入当日日报 (Redis 哈希 + 有序集合)，
+# 消费位置由消费组记录，重启后从上次确认处继续。GET /digest 只需一次 pipeline 读取。
+# 压缩任务定期把早于保留期且已确认的事件折叠进按日快照，再按 MINID 裁剪事件流，Redis 内存有上限。
 
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Query
+from pydantic import BaseModel, ValidationError
+from collections import Counter
 from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Literal, Optional, Tuple
+import asyncio
 import os
+import socket
+import sys
+import time
+import msgpack
 import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+# 容器内 shared/ 与 main.py 同级；本地运行时它在上一级的 services/ 下
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.events import LEGACY_STREAM, decode as decode_event, stream_key  # noqa: E402
+
+# rank=score 与后端共用 backend/ranking.py：容器内复制到 main.py 同级，本地运行时从仓库的 backend/ 导入
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "backend"))
+import ranking  # noqa: E402
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
-STREAMS_KEY = "antiLLMade:events"
+SUMMARIZED_STREAM = stream_key("entry.summarized")
+CONSUMER_GROUP = os.getenv("DIGEST_CONSUMER_GROUP", "digest-service")
+CONSUMER_NAME = os.getenv("DIGEST_CONSUMER_NAME", socket.gethostname())
+# 日报键: {prefix}{date}:entries (id -> 条目 msgpack)，{prefix}{date}:order (id，按发布时间排序)，
+# {prefix}{date}:snapshot (压缩任务折叠的旧事件，结构同 entries，重新生成日报时作为起点)
+DIGEST_KEY_PREFIX = "antiLLMade:digest:"
+CACHE_TTL = int(os.getenv("CACHE_TTL", "604800"))  # 7天
+SNAPSHOT_TTL = int(os.getenv("DIGEST_SNAPSHOT_TTL", str(CACHE_TTL)))
+# 事件在流中至少保留的时长；更早且已被所有消费组确认的事件由压缩任务折叠进快照后裁剪
+EVENT_RETENTION = int(os.getenv("EVENT_RETENTION_SECONDS", "86400"))
+COMPACT_INTERVAL = int(os.getenv("COMPACT_INTERVAL_SECONDS", "3600"))
+COMPACT_LOCK_KEY = f"{DIGEST_KEY_PREFIX}compact:lock"
+READ_COUNT = int(os.getenv("DIGEST_READ_COUNT", "200"))
+READ_BLOCK_MS = int(os.getenv("DIGEST_READ_BLOCK_MS", "5000"))
+# 其他消费者 (已下线的旧实例) 领取后超过该时长仍未确认的事件，启动时转给本实例处理
+CLAIM_IDLE_MS = int(os.getenv("DIGEST_CLAIM_IDLE_MS", "60000"))
 
 redis_client: Optional[redis.Redis] = None
+background_tasks: List[asyncio.Task] = []
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global redis_client
     redis_client = redis.from_url(REDIS_URL)
-    print(f"Digest Service started, REDIS_URL={REDIS_URL}")
+    background_tasks.extend([
+        asyncio.create_task(subscribe_events()),
+        asyncio.create_task(compaction_loop()),
+    ])
+    print(f"Digest Service started, REDIS_URL={REDIS_URL}, consumer={CONSUMER_GROUP}/{CONSUMER_NAME}")
     yield
+    for task in background_tasks:
+        task.cancel()
     await redis_client.close()
 
 
@@ -37,6 +77,10 @@ class DigestEntry(BaseModel):
     summary: str
     content: str
     unread: bool
+    source_weight: float = 1.0
+    # rank=score 时的覆盖度 (当天同一链接或同一标题的条目数) 与综合分
+    coverage: Optional[int] = None
+    score: Optional[float] = None
 
 
 class DailyDigest(BaseModel):
@@ -57,76 +101,342 @@ class EntryInput(BaseModel):
     source_title: str
 
 
+def _title_key(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+def _entries_key(date: str) -> str:
+    return f"{DIGEST_KEY_PREFIX}{date}:entries"
+
+
+def _order_key(date: str) -> str:
+    return f"{DIGEST_KEY_PREFIX}{date}:order"
+
+
+def _snapshot_key(date: str) -> str:
+    return f"{DIGEST_KEY_PREFIX}{date}:snapshot"
+
+
+def _pack(entry: DigestEntry) -> bytes:
+    return msgpack.packb(entry.model_dump(exclude={"coverage", "score"}), use_bin_type=True)
+
+
+def _unpack(row: bytes) -> DigestEntry:
+    return DigestEntry(**msgpack.unpackb(row, raw=False))
+
+
 @app.get("/health")
 def health():
     return {"status": "ok", "service": "digest"}
 
 
 @app.get("/digest", response_model=DailyDigest)
-def get_digest(date: Optional[str] = None) -> DailyDigest:
-    """获取日报"""
+async def get_digest(
+    date: Optional[str] = None,
+    top: Optional[int] = Query(default=None, ge=1),
+    rank: Literal["time", "score"] = "time",
+) -> DailyDigest:
+    """获取日报；top 为每个分类返回的条目数，total 仍为当天全部条目数"""
     target_date = date or datetime.utcnow().strftime("%Y-%m-%d")
-    
-    # 从 Redis 获取当日条目
-    entries = _get_entries_from_cache(target_date)
-    
-    # 按分类分组
+
+    # 一次往返取回当日顺序与全部条目
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zrange(_order_key(target_date), 0, -1, desc=True, withscores=True)
+        pipe.hgetall(_entries_key(target_date))
+        order, rows = await pipe.execute()
+
+    # 按分类分组，分类内按发布时间倒序
+    grouped: Dict[str, List[Tuple[float, DigestEntry]]] = {}
+    total = 0
+    for entry_id, published_ts in order:
+        row = rows.get(entry_id)
+        if row is None:
+            continue
+        digest_entry = _unpack(row)
+        grouped.setdefault(digest_entry.category, []).append((published_ts, digest_entry))
+        total += 1
+
     categories: Dict[str, List[DigestEntry]] = {}
-    for entry in entries:
-        digest_entry = DigestEntry(**entry)
-        categories.setdefault(digest_entry.category, []).append(digest_entry)
-    
+    if rank == "score":
+        # 与后端 ranking.score 同一公式：新近度 + 来源权重 + 覆盖度 + 未读。
+        # 历史日期以当天结束为基准计算新近度；每个分类用堆取前 N，不做整体排序
+        day_end = datetime.fromisoformat(target_date).replace(tzinfo=timezone.utc) + timedelta(days=1)
+        reference = min(datetime.now(timezone.utc), day_end).timestamp()
+        members = [member for group in grouped.values() for member in group]
+        # 多个来源转载同一条目时链接或标题相同，按当天的条目数计覆盖度
+        links = Counter(entry.link for _, entry in members if entry.link)
+        titles = Counter(_title_key(entry.title) for _, entry in members)
+        for published_ts, entry in members:
+            entry.coverage = max(links[entry.link] if entry.link else 1, titles[_title_key(entry.title)])
+            entry.score = round(ranking.score(
+                reference - published_ts,
+                source_weight=entry.source_weight,
+                coverage=entry.coverage,
+                unread=entry.unread,
+            ), 4)
+        selected = ranking.top_per_group(
+            members, group=lambda member: member[1].category, key=lambda member: member[1].score, k=top,
+        )
+        categories = {category: [entry for _, entry in ranked] for category, ranked in selected.items()}
+    else:
+        for category, members in grouped.items():
+            categories[category] = [entry for _, entry in members[:top]]
+
     return DailyDigest(
         date=target_date,
-        total=len(entries),
+        total=total,
         categories=categories,
     )
 
 
-def _get_entries_from_cache(date: str) -> List[dict]:
-    """从缓存获取当日条目"""
-    if redis_client:
-        key = f"digest:{date}"
-        data = redis_client.lrange(key, 0, -1)
-        if data:
-            return [json.loads(item) for item in data]
-    return []
+@app.post("/digest/{date}/regenerate")
+async def regenerate_digest(date: str):
+    """重新生成日报：清空当日结构，从压缩快照开始，再重放事件流中属于该日的 entry.summarized 事件"""
+    await redis_client.delete(_entries_key(date), _order_key(date))
+    snapshot = [_unpack(row) for row in (await redis_client.hgetall(_snapshot_key(date))).values()]
+    if snapshot:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            _stage_entries(pipe, [
+                (date, datetime.fromisoformat(entry.published_at).timestamp(), entry) for entry in snapshot
+            ])
+            await pipe.execute()
+    total = len(snapshot)
+    start = "-"
+    while True:
+        messages = await redis_client.xrange(SUMMARIZED_STREAM, min=start, count=READ_COUNT)
+        if not messages:
+            break
+        entries = [
+            entry for entry in (_parse_event(fields) for _, fields in messages)
+            if entry is not None and entry[0] == date
+        ]
+        if entries:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                _stage_entries(pipe, entries)
+                await pipe.execute()
+            total += len(entries)
+        start = "(" + messages[-1][0].decode()
+    return {"date": date, "total": total}
+
+
+@app.post("/events/compact")
+async def compact():
+    """立即执行一次事件流压缩"""
+    return await compact_events()
+
+
+# 事件处理 (消费组订阅)
+def _parse_event(fields: Dict[bytes, bytes]) -> Optional[Tuple[str, float, DigestEntry]]:
+    """entry.summarized 事件 -> (日期, 发布时间戳, 条目)；已删除或格式错误的事件返回 None"""
+    try:
+        data = decode_event(fields)
+        if data is None:
+            return None
+        published = datetime.fromisoformat(data["published_at"])
+        entry = DigestEntry(
+            id=data["entry_id"],
+            title=data["title"],
+            link=data["link"],
+            published_at=data["published_at"],
+            source_title=data["source_title"],
+            category=data["category"],
+            summary=data["summary"],
+            content=data["content"],
+            unread=True,
+            source_weight=data.get("source_weight", 1.0),
+        )
+    except (KeyError, TypeError, ValueError, ValidationError, msgpack.UnpackException) as e:
+        print(f"Skipping malformed entry.summarized event: {e}")
+        return None
+    # rss-service 发布的时间已统一为 UTC，日期即 UTC 日期
+    return data["published_at"][:10], published.timestamp(), entry
+
+
+def _stage_entries(pipe, entries: List[Tuple[str, float, DigestEntry]]) -> None:
+    """把条目写入 pipeline；按 id 覆盖写，同一事件重复投递也不会重复计入"""
+    dates = set()
+    for date, score, entry in entries:
+        pipe.hset(_entries_key(date), str(entry.id), _pack(entry))
+        pipe.zadd(_order_key(date), {str(entry.id): score})
+        dates.add(date)
+    for date in dates:
+        pipe.expire(_entries_key(date), CACHE_TTL)
+        pipe.expire(_order_key(date), CACHE_TTL)
+
+
+async def apply_events(messages: List[Tuple[bytes, Dict[bytes, bytes]]]) -> int:
+    """在同一个事务里写入日报并确认事件，写入与消费位置不会不一致"""
+    if not messages:
+        return 0
+    entries = [entry for entry in (_parse_event(fields) for _, fields in messages) if entry is not None]
+    async with redis_client.pipeline(transaction=True) as pipe:
+        _stage_entries(pipe, entries)
+        pipe.xack(SUMMARIZED_STREAM, CONSUMER_GROUP, *[message_id for message_id, _ in messages])
+        await pipe.execute()
+    return len(entries)
+
+
+async def ensure_group() -> None:
+    """首次部署从流的开头消费，已有日报事件全部补建"""
+    try:
+        await redis_client.xgroup_create(SUMMARIZED_STREAM, CONSUMER_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def _read(stream_id: str) -> List[Tuple[bytes, Dict[bytes, bytes]]]:
+    response = await redis_client.xreadgroup(
+        CONSUMER_GROUP, CONSUMER_NAME, {SUMMARIZED_STREAM: stream_id},
+        count=READ_COUNT, block=READ_BLOCK_MS if stream_id == ">" else None,
+    )
+    return response[0][1] if response else []
+
+
+async def recover_pending() -> int:
+    """接手其他消费者长时间未确认的事件，再处理本消费者已领取未确认的事件 (上次退出前读到一半的批次)"""
+    start = "0-0"
+    while True:
+        start, *_ = await redis_client.xautoclaim(
+            SUMMARIZED_STREAM, CONSUMER_GROUP, CONSUMER_NAME, CLAIM_IDLE_MS, start_id=start, count=READ_COUNT,
+        )
+        if start in (b"0-0", "0-0"):
+            break
+    applied = 0
+    while True:
+        # 读取 pending 时已被删除的事件返回空字段，照样确认
+        messages = await _read("0")
+        if not messages:
+            return applied
+        applied += await apply_events(messages)
+
+
+async def _legacy_start() -> str:
+    """旧流中消费组尚未确认的第一条事件：未读到 (last-delivered-id 之后) 或已领取未确认 (pending)"""
+    for group in await redis_client.xinfo_groups(LEGACY_STREAM):
+        name = group["name"].decode() if isinstance(group["name"], bytes) else group["name"]
+        if name != CONSUMER_GROUP:
+            continue
+        ms, seq = _stream_id(group["last-delivered-id"])
+        start = (ms, seq + 1)
+        if group["pending"]:
+            summary = await redis_client.xpending(LEGACY_STREAM, CONSUMER_GROUP)
+            if summary["min"] is not None:
+                start = min(start, _stream_id(summary["min"]))
+        return f"{start[0]}-{start[1]}"
+    return "-"
+
+
+async def drain_legacy_stream() -> int:
+    """
+    升级前写入旧单一流、本服务尚未确认的 entry.summarized 事件补写进日报，然后删除旧流。
+    按 id 覆盖写，中途失败重试或多个实例同时执行都不会重复计入。
+    """
+    if not await redis_client.exists(LEGACY_STREAM):
+        return 0
+    start = await _legacy_start()
+    applied = 0
+    while True:
+        messages = await redis_client.xrange(LEGACY_STREAM, min=start, count=READ_COUNT)
+        if not messages:
+            break
+        entries = [
+            entry for entry in (
+                _parse_event(fields) for _, fields in messages if fields.get(b"type") == b"entry.summarized"
+            )
+            if entry is not None
+        ]
+        if entries:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                _stage_entries(pipe, entries)
+                await pipe.execute()
+            applied += len(entries)
+        start = "(" + messages[-1][0].decode()
+    await redis_client.delete(LEGACY_STREAM)
+    return applied
 
 
-@app.post("/digest/{date}/regenerate")
-def regenerate_digest(date: str):
-    """重新生成日报"""
-    # 触发事件
-    if redis_client:
-        import uuid
-        job_id = str(uuid.uuid4())[:8]
-        redis_client.xadd(STREAMS_KEY, {
-            "type": "digest.regenerate",
-            "data": json.dumps({"date": date, "job_id": job_id}),
-        })
-        return {"job_id": job_id, "status": "regenerating"}
-    return {"status": "error", "message": "Redis not available"}
-
-
-# 事件处理 (订阅模式)
 async def subscribe_events():
     """订阅事件流"""
-    if redis_client:
-        async for message in redis_client.xread({STREAMS_KEY: "0"}):
-            stream, messages = message
-            for msg in messages:
-                event_type = msg[b"type"].decode()
-                if event_type == "entry.summarized":
-                    # 新条目摘要完成，添加到日报
-                    data = json.loads(msg[b"data"])
-                    _add_to_digest(data)
-
-
-def _add_to_digest(entry_data: dict):
-    """添加条目到日报"""
-    if redis_client:
-        date = entry_data.get("published_at", "")[:10]
-        key = f"digest:{date}"
-        redis_client.lpush(key, json.dumps(entry_data))
-        # 设置过期时间 7 天
-        redis_client.expire(key, 604800)
+    while True:
+        try:
+            drained = await drain_legacy_stream()
+            if drained:
+                print(f"Applied {drained} events from {LEGACY_STREAM} and deleted it")
+            await ensure_group()
+            recovered = await recover_pending()
+            if recovered:
+                print(f"Recovered {recovered} pending digest events")
+            while True:
+                await apply_events(await _read(">"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Redis 断开或流被删除 (NOGROUP)：稍后重建消费组并继续
+            print(f"Digest subscriber error: {e}")
+            await asyncio.sleep(5)
+
+
+# 事件流压缩
+def _stream_id(value) -> Tuple[int, int]:
+    text = value.decode() if isinstance(value, bytes) else str(value)
+    ms, _, seq = text.partition("-")
+    return int(ms), int(seq or 0)
+
+
+async def _compaction_bound() -> Tuple[int, int]:
+    """
+    可以裁剪的上界 (不含)：早于保留期，且每个消费组都已读到并确认。
+    消费组尚未读到 (last-delivered-id 之后) 或读到未确认 (pending) 的事件都不能裁掉。
+    """
+    bound = (int((time.time() - EVENT_RETENTION) * 1000), 0)
+    for group in await redis_client.xinfo_groups(SUMMARIZED_STREAM):
+        ms, seq = _stream_id(group["last-delivered-id"])
+        bound = min(bound, (ms, seq + 1))
+        if group["pending"]:
+            summary = await redis_client.xpending(SUMMARIZED_STREAM, group["name"])
+            if summary["min"] is not None:
+                bound = min(bound, _stream_id(summary["min"]))
+    return bound
+
+
+async def compact_events() -> dict:
+    """把上界之前的事件按日期折叠进快照 (按 id 覆盖写，可重复执行)，再用 XTRIM MINID 删除"""
+    try:
+        ms, seq = await _compaction_bound()
+    except ResponseError:
+        return {"folded": 0, "trimmed": 0}  # 流或消费组尚不存在
+    min_id = f"{ms}-{seq}"
+    folded = 0
+    start = "-"
+    while True:
+        messages = await redis_client.xrange(SUMMARIZED_STREAM, min=start, max=f"({min_id}", count=READ_COUNT)
+        if not messages:
+            break
+        entries = [entry for entry in (_parse_event(fields) for _, fields in messages) if entry is not None]
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for date, _, entry in entries:
+                pipe.hset(_snapshot_key(date), str(entry.id), _pack(entry))
+            # 先写入再设置过期：新建的快照键也要带上 TTL
+            for date in {date for date, _, _ in entries}:
+                pipe.expire(_snapshot_key(date), SNAPSHOT_TTL)
+            await pipe.execute()
+        folded += len(entries)
+        start = "(" + messages[-1][0].decode()
+    trimmed = await redis_client.xtrim(SUMMARIZED_STREAM, minid=min_id, approximate=False)
+    return {"folded": folded, "trimmed": trimmed, "min_id": min_id}
+
+
+async def compaction_loop():
+    """每 COMPACT_INTERVAL 秒压缩一次；多个实例时由先拿到锁的实例执行"""
+    while True:
+        await asyncio.sleep(COMPACT_INTERVAL)
+        try:
+            if await redis_client.set(COMPACT_LOCK_KEY, CONSUMER_NAME, nx=True, ex=COMPACT_INTERVAL):
+                result = await compact_events()
+                if result["trimmed"]:
+                    print(f"Compacted event stream: {result}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Event compaction error: {e}")
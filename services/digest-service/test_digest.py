@@ -0,0 +1,148 @@
+import asyncio
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parent
+sys.path.append(str(SERVICE_DIR))
+
+# 后端同样有 main 模块，按文件路径以独立名称加载
+_spec = importlib.util.spec_from_file_location("digest_main", SERVICE_DIR / "main.py")
+digest = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(digest)
+
+from shared.events import encode as encode_event  # noqa: E402
+
+
+def _legacy_event(event_type, entry_id):
+    data = {
+        "entry_id": entry_id,
+        "title": f"Entry {entry_id}",
+        "link": f"https://example.com/{entry_id}",
+        "published_at": "2024-05-01T08:00:00+00:00",
+        "source_title": "Example",
+        "category": "tech",
+        "summary": "summary",
+        "content": "content",
+    }
+    return {"type": event_type, "data": json.dumps(data), "timestamp": "2024-05-01T08:00:00"}
+
+
+@pytest.fixture()
+def redis_client(make_redis, monkeypatch):
+    async def make():
+        client = await make_redis()
+        monkeypatch.setattr(digest, "redis_client", client)
+        return client
+
+    return make
+
+
+class TestLegacyStream:
+    def test_unacknowledged_summaries_are_applied_and_the_stream_deleted(self, redis_client):
+        async def scenario():
+            client = await redis_client()
+            legacy = digest.LEGACY_STREAM
+            await client.xadd(legacy, _legacy_event("entry.summarized", 1))
+            await client.xadd(legacy, _legacy_event("entry.created", 2))
+            await client.xadd(legacy, _legacy_event("entry.summarized", 3))
+            await client.xadd(legacy, _legacy_event("entry.summarized", 4))
+            # 旧版 digest-service：1 已确认，2、3 已领取 (3 未确认)，4 尚未读到
+            group = digest.CONSUMER_GROUP
+            await client.xgroup_create(legacy, group, id="0")
+            read = await client.xreadgroup(group, "old", {legacy: ">"}, count=1)
+            await client.xack(legacy, group, read[0][1][0][0])
+            read = await client.xreadgroup(group, "old", {legacy: ">"}, count=2)
+            await client.xack(legacy, group, read[0][1][0][0])
+
+            assert await digest.drain_legacy_stream() == 2
+            assert not await client.exists(legacy)
+            entries = await client.hkeys(digest._entries_key("2024-05-01"))
+            assert sorted(entries) == [b"3", b"4"]
+            assert await client.ttl(digest._entries_key("2024-05-01")) > 0
+
+            assert await digest.drain_legacy_stream() == 0
+
+        asyncio.run(scenario())
+
+    def test_stream_without_group_is_replayed_in_full(self, redis_client):
+        async def scenario():
+            client = await redis_client()
+            for entry_id in (1, 2):
+                await client.xadd(digest.LEGACY_STREAM, _legacy_event("entry.summarized", entry_id))
+            await client.xadd(digest.LEGACY_STREAM, {"type": "entry.summarized", "data": "{}"})
+
+            assert await digest.drain_legacy_stream() == 2
+            assert await client.zcard(digest._order_key("2024-05-01")) == 2
+            assert not await client.exists(digest.LEGACY_STREAM)
+
+        asyncio.run(scenario())
+
+
+def _summarized(entry_id, published_at, category="tech", link=None, title=None, source_weight=None):
+    data = {
+        "entry_id": entry_id,
+        "title": title or f"Entry {entry_id}",
+        "link": link or f"https://example.com/{entry_id}",
+        "published_at": published_at,
+        "source_title": "Example",
+        "category": category,
+        "summary": "summary",
+        "content": "content",
+    }
+    if source_weight is not None:
+        data["source_weight"] = source_weight
+    # 从流中读出的字段名为 bytes
+    return {key.encode(): value for key, value in encode_event(data).items()}
+
+
+async def _stage(client, events):
+    async with client.pipeline(transaction=True) as pipe:
+        digest._stage_entries(pipe, [digest._parse_event(fields) for fields in events])
+        await pipe.execute()
+
+
+class TestRankedDigest:
+    def test_heavier_source_outranks_a_newer_item(self, redis_client):
+        async def scenario():
+            client = await redis_client()
+            await _stage(client, [
+                _summarized(1, "2024-05-01T23:00:00+00:00"),
+                _summarized(2, "2024-05-01T17:00:00+00:00", source_weight=2.0),
+            ])
+
+            by_time = await digest.get_digest(date="2024-05-01", top=1, rank="time")
+            assert [entry.id for entry in by_time.categories["tech"]] == [1]
+
+            ranked = await digest.get_digest(date="2024-05-01", top=1, rank="score")
+            assert [entry.id for entry in ranked.categories["tech"]] == [2]
+            assert ranked.total == 2
+            top = ranked.categories["tech"][0]
+            expected = digest.ranking.score(7 * 3600, source_weight=2.0, coverage=1, unread=True)
+            assert top.score == pytest.approx(expected, abs=1e-4)
+
+        asyncio.run(scenario())
+
+    def test_story_covered_by_more_sources_outranks_a_newer_item(self, redis_client):
+        async def scenario():
+            client = await redis_client()
+            await _stage(client, [
+                _summarized(1, "2024-05-01T23:00:00+00:00"),
+                _summarized(2, "2024-05-01T17:00:00+00:00", link="https://news.example.com/story"),
+                # 另一个来源转载同一链接；同标题不同链接也计入覆盖度
+                _summarized(3, "2024-05-01T16:00:00+00:00", category="world", link="https://news.example.com/story"),
+                _summarized(4, "2024-05-01T18:00:00+00:00", title="Same  Story"),
+                _summarized(5, "2024-05-01T18:30:00+00:00", category="world", title="same story"),
+            ])
+
+            ranked = await digest.get_digest(date="2024-05-01", top=2, rank="score")
+
+            tech = ranked.categories["tech"]
+            assert [entry.id for entry in tech] == [4, 2]
+            assert [entry.coverage for entry in tech] == [2, 2]
+            assert [entry.id for entry in ranked.categories["world"]] == [5, 3]
+
+        asyncio.run(scenario())
@@ -0,0 +1,79 @@
+# 限流中间件压测
+# 进程内用 ASGI 直接调用一个空路由，对比不限流、旧版 INCR + EXPIRE、每次都走 Lua 脚本、带本地令牌桶四种情况的单次请求耗时
+#
+#   python bench_ratelimit.py --redis-url redis://localhost:6379 --requests 5000
+
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from redis.asyncio import Redis
+
+from limiter import RateLimiter
+
+
+def build_app(redis: Redis, mode: str) -> FastAPI:
+    app = FastAPI()
+    limiter: Optional[RateLimiter] = None
+    if mode == "lua":
+        limiter = RateLimiter(redis, 10**9, local_burst=0)
+    elif mode == "local":
+        limiter = RateLimiter(redis, 10**9)
+
+    if mode == "incr":
+        @app.middleware("http")
+        async def incr_expire(request: Request, call_next):
+            key = f"bench:ratelimit:{request.client.host}"
+            await redis.incr(key)
+            await redis.expire(key, 60)
+            return await call_next(request)
+    elif limiter is not None:
+        @app.middleware("http")
+        async def gcra(request: Request, call_next):
+            allowed, _ = await limiter.hit(request.client.host, request.url.path)
+            if not allowed:
+                return JSONResponse(status_code=429, content={"error": "Too many requests"})
+            return await call_next(request)
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run(redis: Redis, mode: str, requests: int) -> float:
+    transport = httpx.ASGITransport(app=build_app(redis, mode), client=("10.0.0.1", 1234))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/ping")
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/ping")
+            response.raise_for_status()
+        return (time.perf_counter() - started) / requests * 1e6
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark gateway rate limit middleware overhead")
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url)
+    try:
+        baseline = await run(redis, "none", args.requests)
+        print(f"{'none':>6}: {baseline:8.1f} us/request")
+        for mode in ("incr", "lua", "local"):
+            elapsed = await run(redis, mode, args.requests)
+            print(f"{mode:>6}: {elapsed:8.1f} us/request  (+{elapsed - baseline:.1f} us)")
+    finally:
+        await redis.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+# 限流 (GCRA)
+# Redis 侧用一个 Lua 脚本实现 GCRA：每个键只存一个"理论到达时间" (TAT)，判定与更新一次往返、原子完成，
+# 时间取 Redis 的 TIME，多个网关实例之间没有时钟偏差。
+# 进程内为每个键维护一个小令牌桶：桶里有令牌且距上次同步不超过 sync_interval 时直接放行，不访问 Redis；
+# 令牌用完或到期时才带着本地已放行的次数去 Redis 结算，并按剩余额度重新装桶。
+# 代价是多实例时全局最多超发 实例数 × local_burst 次请求。
+
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+KEY_PREFIX = "antiLLMade:ratelimit:"
+
+# KEYS[1]: 限流键
+# ARGV: 周期 (毫秒) / 周期内上限 / 本地已放行、需要补记的次数
+# 返回: {是否放行, 剩余额度, 需等待的毫秒数}
+_GCRA = """
+local period = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local used = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local interval = period / limit
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+tat = tat + used * interval
+local allowed = 0
+local retry = 0
+if tat + interval - now <= period then
+    tat = tat + interval
+    allowed = 1
+else
+    retry = math.ceil(tat + interval - period - now)
+end
+if tat > now then
+    redis.call('SET', KEYS[1], tat, 'PX', math.ceil(tat - now))
+end
+local remaining = math.floor((period - (tat - now)) / interval)
+return {allowed, math.max(remaining, 0), retry}
+"""
+
+
+def parse_rules(text: str) -> List[Tuple[str, int]]:
+    """"/summarize=20,/ingest=10" -> [(路径前缀, 每周期上限)]，按前缀长度降序，最长匹配优先"""
+    rules = []
+    for item in text.split(","):
+        prefix, _, limit = item.strip().partition("=")
+        if prefix and limit:
+            rules.append((prefix, int(limit)))
+    return sorted(rules, key=lambda rule: len(rule[0]), reverse=True)
+
+
+class _Bucket:
+    __slots__ = ("tokens", "used", "synced_at")
+
+    def __init__(self):
+        self.tokens = 0
+        self.used = 0
+        self.synced_at = 0.0
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        redis: Redis,
+        default_limit: int,
+        rules: Optional[List[Tuple[str, int]]] = None,
+        period_seconds: float = 60,
+        local_burst: int = 10,
+        sync_interval: float = 1.0,
+        max_keys: int = 10000,
+    ):
+        self.redis = redis
+        self.default_limit = default_limit
+        self.rules = rules or []
+        self.period_ms = int(period_seconds * 1000)
+        self.local_burst = local_burst
+        self.sync_interval = sync_interval
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self._script = redis.register_script(_GCRA)
+
+    def rule_for(self, path: str) -> Tuple[str, int]:
+        for prefix, limit in self.rules:
+            if path == prefix or path.startswith(prefix + "/"):
+                return prefix, limit
+        return "*", self.default_limit
+
+    def _bucket(self, key: str) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+            # 淘汰最久未访问的键；其本地已放行次数不再补记，最多少记 local_burst 次
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def hit(self, client: str, path: str) -> Tuple[bool, float]:
+        """记一次请求，返回 (是否放行, 建议重试等待秒数)"""
+        prefix, limit = self.rule_for(path)
+        if limit <= 0:
+            return True, 0.0
+        key = f"{KEY_PREFIX}{prefix}:{client}"
+        bucket = self._bucket(key)
+        now = time.monotonic()
+        if bucket.tokens > 0 and now - bucket.synced_at < self.sync_interval:
+            bucket.tokens -= 1
+            bucket.used += 1
+            return True, 0.0
+
+        # 先清零再 await，并发请求不会重复补记同一批次数
+        used, bucket.used, bucket.tokens = bucket.used, 0, 0
+        try:
+            allowed, remaining, retry_ms = await self._script(
+                keys=[key], args=[self.period_ms, limit, used]
+            )
+        except RedisError as e:
+            # Redis 不可用时放行，限流不应拖垮整个网关
+            print(f"Rate limiter unavailable: {e}")
+            return True, 0.0
+        bucket.synced_at = time.monotonic()
+        bucket.tokens = min(int(remaining), self.local_burst)
+        return bool(allowed), int(retry_ms) / 1000
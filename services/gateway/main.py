@@ -2,17 +2,21 @@
 # 路由、限流、认证、熔断
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import json
+import math
 import os
 import httpx
 import time
-from ratelimit import RateLimitMiddleware, Rule
 from redis.asyncio import Redis
 
+from limiter import RateLimiter, parse_rules
+
 # 配置
 PORT = int(os.getenv("GATEWAY_PORT", "8000"))
 SERVICES = {
@@ -24,15 +28,52 @@ SERVICES = {
     "data": os.getenv("DATA_SERVICE_URL", "http://localhost:8005"),
 }
 
+# 下游连接池：所有转发共用一个 keep-alive 客户端，避免每个请求都重新建连
+PROXY_MAX_CONNECTIONS = int(os.getenv("PROXY_MAX_CONNECTIONS", "200"))
+PROXY_MAX_KEEPALIVE = int(os.getenv("PROXY_MAX_KEEPALIVE", "50"))
+PROXY_TIMEOUT = float(os.getenv("PROXY_TIMEOUT", "30"))
+
+# 逐跳头 (RFC 9110 7.6.1) 只对单条连接有效，不能透传
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+}
+
+# 限流：按客户端 IP + 路由前缀，每 RATE_LIMIT_PERIOD 秒的上限；RATE_LIMIT_ROUTES 覆盖默认值 (0 表示不限)
+RATE_LIMIT_DEFAULT = int(os.getenv("RATE_LIMIT_DEFAULT", "100"))
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "/summarize=20,/ingest=10,/digest=300")
+RATE_LIMIT_PERIOD = float(os.getenv("RATE_LIMIT_PERIOD", "60"))
+RATE_LIMIT_LOCAL_BURST = int(os.getenv("RATE_LIMIT_LOCAL_BURST", "10"))
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", "1"))
+RATE_LIMIT_EXEMPT = {"/health"}
+
 redis: Optional[Redis] = None
+http: Optional[httpx.AsyncClient] = None
+limiter: Optional[RateLimiter] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global redis
+    global redis, http, limiter
     redis = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    limiter = RateLimiter(
+        redis,
+        RATE_LIMIT_DEFAULT,
+        parse_rules(RATE_LIMIT_ROUTES),
+        period_seconds=RATE_LIMIT_PERIOD,
+        local_burst=RATE_LIMIT_LOCAL_BURST,
+        sync_interval=RATE_LIMIT_SYNC_INTERVAL,
+    )
+    http = httpx.AsyncClient(
+        timeout=httpx.Timeout(PROXY_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=PROXY_MAX_CONNECTIONS,
+            max_keepalive_connections=PROXY_MAX_KEEPALIVE,
+        ),
+    )
     print(f"API Gateway started on port {PORT}")
     yield
+    await http.aclose()
     await redis.close()
 
 
@@ -50,24 +91,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 限流 (简单版本)
+# 限流
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host
-    key = f"ratelimit:{client_ip}"
-    
-    # 简单限流: 每分钟 100 次
-    count = await redis.incr(key)
-    await redis.expire(key, 60)
-    
-    if count > 100:
-        return JSONResponse(
-            status_code=429,
-            content={"error": "Too many requests"}
-        )
-    
-    response = await call_next(request)
-    return response
+    path = request.url.path
+    if path not in RATE_LIMIT_EXEMPT:
+        allowed, retry_after = await limiter.hit(request.client.host, path)
+        if not allowed:
+            return JSONResponse(
+                status_code=429,
+                content={"error": "Too many requests"},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+    return await call_next(request)
 
 
 class GatewayResponse(BaseModel):
@@ -91,85 +127,135 @@ def root():
 
 # ========== 路由转发 ==========
 
-async def proxy_request(service: str, path: str, method: str, body: Optional[dict] = None):
-    """转发请求到下游服务"""
+def _forward_headers(headers) -> List[tuple]:
+    return [
+        (name, value) for name, value in headers.raw
+        if name.decode("latin-1").lower() not in HOP_BY_HOP_HEADERS | {"host", "content-length"}
+    ]
+
+
+async def proxy_request(
+    request: Request,
+    service: str,
+    path: str,
+    content: Optional[bytes] = None,
+    event_stream: bool = False,
+) -> StreamingResponse:
+    """
+    转发请求到下游服务：方法、查询串、请求头和请求体原样转发，
+    状态码、响应头和响应体按原始字节流式透传，不做 JSON 解码再编码。
+    content 为 None 时转发客户端请求体；需要改写请求体的路由自行传入。
+    event_stream 用于 SSE 等长连接：不设读超时，并关闭反向代理缓冲。
+    """
     base_url = SERVICES.get(service)
     if not base_url:
         raise HTTPException(status_code=404, detail=f"Service {service} not found")
-    
-    url = f"{base_url}/{path}"
-    async with httpx.AsyncClient() as client:
-        try:
-            if method == "GET":
-                response = await client.get(url, params=body)
-            elif method == "POST":
-                response = await client.post(url, json=body)
-            elif method == "DELETE":
-                response = await client.delete(url)
-            else:
-                raise HTTPException(status_code=400, detail="Unsupported method")
-            
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=str(e))
-        except Exception as e:
-            raise HTTPException(status_code=503, detail=f"Service unavailable: {e}")
+
+    upstream = http.build_request(
+        request.method,
+        f"{base_url}/{path}",
+        params=request.query_params.multi_items(),
+        headers=_forward_headers(request.headers),
+        content=content if content is not None else await request.body(),
+        timeout=httpx.Timeout(PROXY_TIMEOUT, read=None) if event_stream else http.timeout,
+    )
+    try:
+        response = await http.send(upstream, stream=True)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {e}")
+
+    headers = {
+        name: value for name, value in response.headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    }
+    if event_stream:
+        headers.update({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=headers,
+        background=BackgroundTask(response.aclose),
+    )
+
+
+def _json_body(body: Any) -> bytes:
+    return json.dumps(body, ensure_ascii=False).encode()
 
 
 # Source Service 路由
 @app.get("/sources")
-async def list_sources():
-    return await proxy_request("source", "sources", "GET")
+async def list_sources(request: Request):
+    return await proxy_request(request, "source", "sources")
 
 
 @app.get("/sources/meta")
-async def sources_meta():
-    return await proxy_request("source", "sources/meta", "GET")
+async def sources_meta(request: Request):
+    return await proxy_request(request, "source", "sources/meta")
 
 
 @app.post("/sources")
-async def create_source(body: dict):
-    return await proxy_request("source", "sources", "POST", body)
+async def create_source(request: Request):
+    return await proxy_request(request, "source", "sources")
 
 
 @app.delete("/sources/{source_id}")
-async def delete_source(source_id: int):
-    return await proxy_request("source", f"sources/{source_id}", "DELETE")
+async def delete_source(request: Request, source_id: int):
+    return await proxy_request(request, "source", f"sources/{source_id}")
 
 
 # RSS Service 路由
 @app.post("/ingest")
-async def start_ingest(body: Optional[dict] = None):
-    return await proxy_request("rss", "ingest", "POST", body or {})
+async def start_ingest(request: Request):
+    """不带请求体时拉取全部订阅源；scheduler 按批传入到期的源"""
+    return await proxy_request(request, "rss", "ingest")
 
 
 @app.get("/job/{job_id}")
-async def get_job_status(job_id: str):
-    return await proxy_request("rss", f"job/{job_id}", "GET")
+async def get_job_status(request: Request, job_id: str):
+    return await proxy_request(request, "rss", f"job/{job_id}")
+
+
+@app.get("/job/{job_id}/events")
+async def stream_job_progress(request: Request, job_id: str):
+    return await proxy_request(request, "rss", f"job/{job_id}/events", event_stream=True)
 
 
 # Digest Service 路由
 @app.get("/digest")
-async def get_digest(date: Optional[str] = None):
-    return await proxy_request("digest", f"digest?date={date or ''}", "GET")
+async def get_digest(request: Request):
+    """date / top / rank 等查询参数原样转发给 digest-service"""
+    return await proxy_request(request, "digest", "digest")
 
 
 @app.post("/digest/{date}/regenerate")
-async def regenerate_digest(date: str):
-    return await proxy_request("digest", f"digest/{date}/regenerate", "POST")
+async def regenerate_digest(request: Request, date: str):
+    return await proxy_request(request, "digest", f"digest/{date}/regenerate")
 
 
 # Entry 路由
 @app.post("/entries/{entry_id}/read")
-async def mark_entry_read(entry_id: int):
-    return await proxy_request("data", f"entries/{entry_id}/read", "POST")
+async def mark_entry_read(request: Request, entry_id: int):
+    return await proxy_request(request, "data", f"entries/{entry_id}/read")
 
 
 # Summary Service 路由
 @app.post("/summarize")
-async def summarize(body: dict):
-    return await proxy_request("summary", "summarize", "POST", body)
+async def summarize(request: Request, body: dict):
+    # 经网关进来的都是用户触发的请求，默认走 interactive 通道
+    body.setdefault("priority", "interactive")
+    return await proxy_request(request, "summary", "summarize", _json_body(body))
+
+
+@app.post("/summarize/stream")
+async def summarize_stream(request: Request, body: dict):
+    """SSE 流式摘要，逐块转发下游输出，不做缓冲"""
+    body.setdefault("priority", "interactive")
+    return await proxy_request(request, "summary", "summarize/stream", _json_body(body), event_stream=True)
+
+
+@app.get("/summarize/metrics")
+async def summarize_metrics(request: Request):
+    return await proxy_request(request, "summary", "metrics")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from limiter import KEY_PREFIX, RateLimiter, parse_rules  # noqa: E402
+
+
+async def _hits(limiter, count, client="10.0.0.1", path="/summarize"):
+    return [await limiter.hit(client, path) for _ in range(count)]
+
+
+class TestParseRules:
+    def test_longest_prefix_wins(self):
+        rules = parse_rules("/summarize=20, /summarize/stream=5,/ingest=10,bad")
+        assert rules[0] == ("/summarize/stream", 5)
+        limiter = RateLimiter.__new__(RateLimiter)
+        limiter.rules, limiter.default_limit = rules, 100
+        assert limiter.rule_for("/summarize/stream") == ("/summarize/stream", 5)
+        assert limiter.rule_for("/summarize/metrics") == ("/summarize", 20)
+        assert limiter.rule_for("/summarizer") == ("*", 100)
+
+
+class TestRateLimiter:
+    @pytest.mark.parametrize("local_burst", [0, 3, 10, 50])
+    def test_exactly_limit_requests_pass_per_period(self, make_redis, local_burst):
+        async def scenario():
+            client = await make_redis()
+            limiter = RateLimiter(client, 10, period_seconds=60, local_burst=local_burst, sync_interval=60)
+
+            results = await _hits(limiter, 25)
+
+            assert [allowed for allowed, _ in results] == [True] * 10 + [False] * 15
+            # 本地放行的次数都已补记到 Redis：没有本地令牌的新实例也拿不到名额
+            fresh = RateLimiter(client, 10, period_seconds=60, local_burst=local_burst)
+            assert await fresh.hit("10.0.0.1", "/summarize") == (False, pytest.approx(6, abs=0.5))
+            assert await client.pttl(f"{KEY_PREFIX}*:10.0.0.1") > 59000
+
+        asyncio.run(scenario())
+
+    def test_retry_after_is_the_time_until_the_next_slot(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            # 周期 60 秒上限 10 次：每 6 秒释放一个名额
+            limiter = RateLimiter(client, 10, period_seconds=60, local_burst=5, sync_interval=60)
+            started = time.monotonic()
+            await _hits(limiter, 10)
+
+            allowed, retry_after = await limiter.hit("10.0.0.1", "/summarize")
+            elapsed = time.monotonic() - started
+            assert not allowed
+            assert 6 - elapsed - 0.01 <= retry_after <= 6
+
+            # 被拒绝的请求不占名额，重试等待不会越拒越长
+            _, again = await limiter.hit("10.0.0.1", "/summarize")
+            assert again <= retry_after
+
+        asyncio.run(scenario())
+
+    def test_slot_frees_after_retry_after(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            limiter = RateLimiter(client, 5, period_seconds=0.5, local_burst=2, sync_interval=60)
+            assert all(allowed for allowed, _ in await _hits(limiter, 5))
+            allowed, retry_after = await limiter.hit("10.0.0.1", "/summarize")
+            assert not allowed and 0 < retry_after <= 0.1
+
+            await asyncio.sleep(retry_after + 0.02)
+            assert (await limiter.hit("10.0.0.1", "/summarize"))[0]
+            assert not (await limiter.hit("10.0.0.1", "/summarize"))[0]
+
+        asyncio.run(scenario())
+
+    def test_clients_and_routes_are_limited_separately(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            limiter = RateLimiter(client, 3, rules=parse_rules("/ingest=1"), period_seconds=60, local_burst=2)
+
+            assert [allowed for allowed, _ in await _hits(limiter, 4)] == [True, True, True, False]
+            assert [allowed for allowed, _ in await _hits(limiter, 4, client="10.0.0.2")] == [True] * 3 + [False]
+            assert [allowed for allowed, _ in await _hits(limiter, 2, path="/ingest")] == [True, False]
+
+        asyncio.run(scenario())
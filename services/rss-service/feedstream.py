@@ -0,0 +1,129 @@
+# 流式 Feed 解析
+# 边下载边用 XMLPullParser 增量解析，每解析完一个 item/entry 就提取字段并释放节点，
+# 峰值内存约等于单个条目的大小；拿到最新的 N 条或连续遇到已收录的链接后立即停止并断开下载。
+# 支持 RSS 2.0、RSS 1.0 (RDF) 与 Atom；遇到 XML 之外的写法 (如未声明的 HTML 实体) 抛出 ParseError，由调用方回退到 feedparser。
+
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+ITEM_TAGS = {"item", "entry"}
+_PUBLISHED_TAGS = ("pubDate", "published", "date", "issued")
+_UPDATED_TAGS = ("updated", "modified")
+
+
+class FeedTooLargeError(Exception):
+    pass
+
+
+@dataclass
+class StreamResult:
+    items: List[dict] = field(default_factory=list)
+    # 读到但已收录的条目 (只含 link / published)，供调用方统计发布节奏
+    seen: List[dict] = field(default_factory=list)
+    bytes_read: int = 0
+    # 提前结束的原因: max_items / seen / None (读完整个文档)
+    stopped: Optional[str] = None
+    # RSS <ttl>：建议的缓存时长 (分钟)
+    ttl: Optional[int] = None
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1] if "}" in tag else tag
+
+
+def _text(element: Element) -> str:
+    # Atom type="xhtml" 的内容是子元素，只取文本
+    return "".join(element.itertext()).strip()
+
+
+def item_from_element(element: Element) -> dict:
+    """从 item/entry 节点提取与 feedparser 模式相同的字段"""
+    values: Dict[str, str] = {}
+    link = ""
+    for child in element:
+        name = _local(child.tag)
+        if name == "link":
+            href = child.get("href")
+            if href is not None:
+                if child.get("rel", "alternate") == "alternate" and not link:
+                    link = href.strip()
+            elif child.text and not link:
+                link = child.text.strip()
+        elif name == "guid" and child.get("isPermaLink", "true") != "false":
+            values.setdefault("guid", _text(child))
+        elif name == "origLink":  # feedburner:origLink
+            values.setdefault("origlink", _text(child))
+        else:
+            values.setdefault(name, _text(child))
+
+    published = next((values[tag] for tag in _PUBLISHED_TAGS if values.get(tag)), None)
+    if published is None:
+        published = next((values[tag] for tag in _UPDATED_TAGS if values.get(tag)), None)
+    return {
+        "title": values.get("title") or "无标题",
+        "link": values.get("origlink") or link or values.get("guid", ""),
+        "content": values.get("description") or values.get("summary") or values.get("encoded") or values.get("content") or "",
+        "published": published,
+    }
+
+
+async def parse_stream(
+    chunks: AsyncIterator[bytes],
+    max_items: int,
+    max_bytes: int,
+    is_seen: Optional[Callable[[str], Awaitable[bool]]] = None,
+    stop_after_seen: int = 3,
+) -> StreamResult:
+    """
+    chunks 为响应体的字节块。连续 stop_after_seen 条已收录链接时认为后面都是旧条目
+    (允许少量置顶或乱序)，已收录的条目不计入 items，只记在 seen 中。
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    result = StreamResult()
+    depth = 0  # 当前所在 item/entry 的嵌套层数
+    parents: List[Element] = []  # item/entry 之外的祖先节点，处理完的条目要从父节点上摘掉
+    seen_streak = 0
+    async for chunk in chunks:
+        result.bytes_read += len(chunk)
+        if result.bytes_read > max_bytes:
+            raise FeedTooLargeError(f"more than {max_bytes} bytes")
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            name = _local(element.tag)
+            if name not in ITEM_TAGS:
+                if not depth:
+                    if event == "start":
+                        parents.append(element)
+                        continue
+                    parents.pop()
+                    if name == "ttl" and (element.text or "").strip().isdigit():
+                        result.ttl = int(element.text.strip())
+                continue
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth:
+                continue
+            item = item_from_element(element)
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+            if is_seen is not None and item["link"] and await is_seen(item["link"]):
+                result.seen.append({"link": item["link"], "published": item["published"]})
+                seen_streak += 1
+                if seen_streak >= stop_after_seen:
+                    result.stopped = "seen"
+                    return result
+                continue
+            seen_streak = 0
+            result.items.append(item)
+            if len(result.items) >= max_items:
+                result.stopped = "max_items"
+                return result
+    parser.close()
+    return result
+
+
+__all__ = ["FeedTooLargeError", "ParseError", "StreamResult", "item_from_element", "parse_stream"]
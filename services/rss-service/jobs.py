@@ -0,0 +1,170 @@
+# Ingest 任务登记表
+# 每个任务一个 Redis Hash，记录状态、计数器与各阶段耗时；Redis 不可用时退化为进程内字典。
+# 任务按订阅源拆给多个 worker 处理，每个源的统计写在独立字段 source:{key} 里 (覆盖写，重复投递也不会重复计数)，
+# 读取时再汇总。
+
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+
+from pipeline import Stage
+
+JOB_KEY_PREFIX = "antiLLMade:rss:job:"
+JOB_TTL_SECONDS = 7 * 24 * 3600
+# 管线进度写回 Redis 的最小间隔，避免每条条目一次写入
+PROGRESS_FLUSH_INTERVAL = 0.5
+
+COUNTER_FIELDS = (
+    "sources_total",
+    "sources_done",
+    "sources_failed",
+    "entries_fetched",
+    "entries_summarized",
+    "entries_persisted",
+)
+FINAL_STATUSES = ("completed", "failed")
+_SOURCE_PREFIX = "source:"
+_FINISHED_PREFIX = "finished:"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _merge_stages(total: Dict[str, Dict[str, float]], stages: Dict[str, Dict[str, Any]]) -> None:
+    for name, stats in stages.items():
+        merged = total.setdefault(name, {})
+        for metric, value in stats.items():
+            merged[metric] = merged.get(metric, 0) + value
+
+
+class JobRegistry:
+    def __init__(self, client: Optional[redis.Redis]):
+        self.client = client
+        self._local: Dict[str, Dict[str, str]] = {}
+
+    def _key(self, job_id: str) -> str:
+        return f"{JOB_KEY_PREFIX}{job_id}"
+
+    async def _write(self, job_id: str, fields: Dict[str, Any]) -> None:
+        values = {name: value if isinstance(value, str) else json.dumps(value) for name, value in fields.items()}
+        if self.client is None:
+            self._local.setdefault(job_id, {}).update(values)
+            return
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(job_id), mapping=values)
+            pipe.expire(self._key(job_id), JOB_TTL_SECONDS)
+            await pipe.execute()
+
+    async def _read(self, job_id: str) -> Optional[Dict[str, str]]:
+        if self.client is None:
+            return self._local.get(job_id)
+        raw = await self.client.hgetall(self._key(job_id))
+        return {key.decode(): value.decode() for key, value in raw.items()} if raw else None
+
+    async def create(self, job_id: str) -> None:
+        await self._write(job_id, {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": _now(),
+            "sources_total": 0,
+            "sources_finished": 0,
+        })
+
+    async def start(self, job_id: str, sources_total: int) -> None:
+        await self._write(job_id, {"status": "running", "started_at": _now(), "sources_total": sources_total})
+
+    async def update_source(self, job_id: str, source_key: str, stages: Dict[str, Dict[str, Any]]) -> None:
+        """记录单个源当前的管线统计 (覆盖写)"""
+        await self._write(job_id, {f"{_SOURCE_PREFIX}{source_key}": stages})
+
+    async def is_source_finished(self, job_id: str, source_key: str) -> bool:
+        field = f"{_FINISHED_PREFIX}{source_key}"
+        if self.client is None:
+            return field in self._local.get(job_id, {})
+        return bool(await self.client.hexists(self._key(job_id), field))
+
+    async def finish_source(self, job_id: str, source_key: str) -> bool:
+        """
+        标记某个源处理完毕，同一个源只计一次。
+        返回 True 表示这是任务的最后一个源，调用方负责收尾。
+        """
+        field = f"{_FINISHED_PREFIX}{source_key}"
+        if self.client is None:
+            job = self._local.setdefault(job_id, {})
+            if field in job:
+                return False
+            job[field] = "1"
+            finished = int(job.get("sources_finished", 0)) + 1
+            job["sources_finished"] = str(finished)
+            return finished >= int(job.get("sources_total", 0))
+
+        key = self._key(job_id)
+        if not await self.client.hsetnx(key, field, 1):
+            return False
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, "sources_finished", 1)
+            pipe.hget(key, "sources_total")
+            finished, total = await pipe.execute()
+        return finished >= int(total or 0)
+
+    async def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        fields: Dict[str, Any] = {"status": status, "finished_at": _now()}
+        if error:
+            fields["error"] = error
+        await self._write(job_id, fields)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._read(job_id)
+        if not raw:
+            return None
+        job: Dict[str, Any] = {
+            key: value for key, value in raw.items()
+            if not key.startswith((_SOURCE_PREFIX, _FINISHED_PREFIX))
+        }
+        stages: Dict[str, Dict[str, float]] = {}
+        for key, value in raw.items():
+            if key.startswith(_SOURCE_PREFIX):
+                _merge_stages(stages, json.loads(value))
+
+        def stat(stage: str, name: str) -> int:
+            return int(stages.get(stage, {}).get(name, 0))
+
+        job.update({
+            "sources_total": int(raw.get("sources_total", 0)),
+            "sources_done": stat("parse", "processed") - stat("parse", "failed"),
+            "sources_failed": stat("fetch", "failed") + stat("parse", "failed"),
+            "entries_fetched": stat("parse", "emitted"),
+            "entries_summarized": stat("summarize", "emitted"),
+            "entries_persisted": stat("persist", "emitted"),
+            "stages": {
+                name: {metric: round(value, 3) for metric, value in stats.items()}
+                for name, stats in stages.items()
+            },
+        })
+        job.pop("sources_finished", None)
+        return job
+
+
+class JobProgress:
+    """作为 Pipeline.on_progress 回调：按固定间隔把单个源的阶段统计写回登记表"""
+
+    def __init__(self, registry: JobRegistry, job_id: str, source_key: str):
+        self.registry = registry
+        self.job_id = job_id
+        self.source_key = source_key
+        self.stages: Dict[str, Stage] = {}
+        self._flushed = 0.0
+
+    async def __call__(self, stage: Stage) -> None:
+        self.stages[stage.name] = stage
+        if time.monotonic() - self._flushed >= PROGRESS_FLUSH_INTERVAL:
+            await self.flush()
+
+    async def flush(self, stages: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self._flushed = time.monotonic()
+        snapshot = stages or {name: stage.stats.as_dict() for name, stage in self.stages.items()}
+        await self.registry.update_source(self.job_id, self.source_key, snapshot)
@@ -2,32 +2,120 @@
 # 独立的 RSS 聚合微服务，支持异步事件发布
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
+from textwrap import shorten
 import asyncio
 import feedparser
 import httpx
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional
 import os
+import sys
+import time
 import redis.asyncio as redis
 
+from feedstream import FeedTooLargeError, ParseError, parse_stream
+from jobs import FINAL_STATUSES, JobProgress, JobRegistry
+from pipeline import Pipeline, Stage
+from worker import StreamWorker, consumer_name, enqueue
+
+# 容器内 shared/ 与 main.py 同级；本地运行时它在上一级的 services/ 下
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.events import encode as encode_event, stream_key, xadd_kwargs  # noqa: E402
+from shared.models import EntryCreatedEvent, EntrySummarizedEvent  # noqa: E402
+
+# 时间戳解析与后端共用 backend/timestamps.py：容器内复制到 main.py 同级，本地运行时从仓库的 backend/ 导入
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "backend"))
+from timestamps import parse_timestamp  # noqa: E402
+
 # 配置
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
-STREAMS_KEY = "antiLLMade:events"
 SUMMARY_SERVICE_URL = os.getenv("SUMMARY_SERVICE_URL", "http://localhost:8001")
-MAX_CONCURRENT = 5  # 并发拉取数量
+SOURCE_SERVICE_URL = os.getenv("SOURCE_SERVICE_URL", "http://localhost:8002")
+DATA_SERVICE_URL = os.getenv("DATA_SERVICE_URL", "http://localhost:8005")
+# 已收录链接 (有序集合，分值为最近一次在 Feed 中见到的时间)；超过保留期未再出现的链接被裁掉，
+# 重新出现时由 data-service 的 ON CONFLICT 去重，不会重复入库
+SEEN_LINKS_KEY = "antiLLMade:rss:seen_at"
+SEEN_LINKS_RETENTION = int(os.getenv("SEEN_LINKS_RETENTION_DAYS", "30")) * 86400
+# 旧版本的已收录链接集合 (无上限)，启动时迁入 SEEN_LINKS_KEY
+LEGACY_SEEN_LINKS_KEY = "antiLLMade:rss:seen_links"
+# 每个源最近一次拉取的发布节奏与缓存提示，供 scheduler 自适应调整轮询间隔
+FEED_STATS_KEY = "antiLLMade:rss:feed_stats"
+MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "5"))  # 并发拉取数量
+ENTRIES_PER_SOURCE = int(os.getenv("ENTRIES_PER_SOURCE", "20"))
+
+# 管线各阶段的并发与队列长度 (见 pipeline.py)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "500"))  # 每次 /entries/bulk 的条数
+PERSIST_CONCURRENCY = int(os.getenv("PERSIST_CONCURRENCY", "2"))
+PERSIST_TIMEOUT = float(os.getenv("PERSIST_TIMEOUT", "60"))
+PUBLISH_BATCH_SIZE = int(os.getenv("PUBLISH_BATCH_SIZE", "100"))  # 每次 Redis pipeline 的事件数
+# 随服务一起启动的 worker 数；其余容量通过单独运行 worker.py 水平扩展
+EMBEDDED_WORKERS = int(os.getenv("EMBEDDED_WORKERS", "1"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))  # 进度流的轮询间隔
+BULK_FIELDS = ("source_id", "title", "link", "published_at", "summary", "content")
+
+# 下载: 共享连接池 + 超时 + 体积上限，防止单个慢源/超大源拖垮服务
+FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", "5"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "20"))
+MAX_FEED_BYTES = int(os.getenv("MAX_FEED_BYTES", str(5 * 1024 * 1024)))
+USER_AGENT = os.getenv("FETCH_USER_AGENT", "AntiLLMade-RSS/1.0 (+https://github.com/YiJing233/AntiLLMade)")
+
+# 解析: feedparser 是纯 CPU 的同步代码，放到进程池里，不阻塞事件循环
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# stream: 边下载边增量解析 (feedstream.py)，取够条目或遇到已收录链接即断开，非标准 XML 自动回退到 feedparser
+# feedparser: 整个响应下载完后在进程池中解析
+FEED_PARSER = os.getenv("FEED_PARSER", "stream")
+STOP_AFTER_SEEN = int(os.getenv("STOP_AFTER_SEEN", "3"))  # 连续多少条已收录链接后停止读取
+
+# 同时请求摘要的条目数 (summary-service 侧还有优先级通道限流)
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+SUMMARY_TIMEOUT = float(os.getenv("SUMMARY_TIMEOUT", "30"))
 
 redis_client: Optional[redis.Redis] = None
+job_registry = JobRegistry(None)
+background_tasks: set = set()
+http_client: Optional[httpx.AsyncClient] = None
+parse_pool: Optional[ProcessPoolExecutor] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global redis_client
+    global redis_client, http_client, parse_pool, job_registry
     redis_client = redis.from_url(REDIS_URL)
-    print(f"RSS Service started, REDIS_URL={REDIS_URL}")
+    job_registry = JobRegistry(redis_client)
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(FETCH_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=MAX_CONCURRENT + SUMMARY_CONCURRENCY + 10),
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+    )
+    parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    try:
+        migrated = await migrate_seen_links()
+        if migrated:
+            print(f"Migrated {migrated} seen links to {SEEN_LINKS_KEY}")
+    except Exception as e:
+        print(f"Seen links not migrated: {e}")
+    stop = asyncio.Event()
+    workers = [
+        asyncio.create_task(
+            StreamWorker(redis_client, process_work_item, consumer_name(index), on_dead=fail_work_item).run(stop)
+        )
+        for index in range(EMBEDDED_WORKERS)
+    ]
+    print(f"RSS Service started, REDIS_URL={REDIS_URL}, parse workers={PARSE_WORKERS}, workers={EMBEDDED_WORKERS}")
     yield
+    stop.set()
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await http_client.aclose()
+    parse_pool.shutdown(wait=False, cancel_futures=True)
     await redis_client.close()
 
 
@@ -46,65 +134,306 @@ class IngestResponse(BaseModel):
     source_count: int
 
 
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued / running / completed / failed
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    sources_total: int = 0
+    sources_done: int = 0
+    sources_failed: int = 0
+    entries_fetched: int = 0
+    entries_summarized: int = 0
+    entries_persisted: int = 0
+    # 各阶段 processed / emitted / dropped / failed / busy_seconds
+    stages: dict = {}
+
+
 class SourceCreate(BaseModel):
     url: str
     title: str
     category: str = "默认"
+    weight: float = Field(default=1.0, ge=0)
 
 
 async def publish_event(event_type: str, data: dict):
-    """发布事件到 Redis Streams"""
+    """发布事件到该类型的 Redis Stream (msgpack 编码，近似 MAXLEN 裁剪)"""
     if redis_client:
-        event = {
-            "type": event_type,
-            "data": json.dumps(data, default=str),
-            "timestamp": datetime.utcnow().isoformat(),
-        }
-        await redis_client.xadd(STREAMS_KEY, event)
+        await redis_client.xadd(stream_key(event_type), encode_event(data), **xadd_kwargs())
 
 
-async def fetch_and_summarize(url: str, source_id: int, source_title: str, category: str) -> List[dict]:
-    """拉取 RSS 并异步调用摘要服务"""
-    entries = []
-    try:
-        feed = feedparser.parse(url)
-        for item in feed.entries[:20]:  # 限制每个源最多20条
-            content = item.get("summary") or item.get("description") or ""
-            
-            # 调用摘要服务
-            summary = await summarize_content(content)
-            
-            entry = {
-                "source_id": source_id,
-                "title": item.get("title", "无标题"),
-                "link": item.get("link", ""),
-                "content": content,
-                "summary": summary,
-                "published_at": datetime.utcnow().isoformat(),
-                "category": category,
-                "source_title": source_title,
-            }
-            entries.append(entry)
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-    
-    return entries
+async def publish_events(event_type: str, items: List[dict]):
+    """批量发布：一次 Redis pipeline 往返写入多条事件"""
+    if redis_client and items:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for data in items:
+                pipe.xadd(stream_key(event_type), encode_event(data), **xadd_kwargs())
+            await pipe.execute()
 
 
-async def summarize_content(content: str) -> str:
-    """调用 Summary Service"""
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{SUMMARY_SERVICE_URL}/summarize",
-                json={"text": content, "use_cache": True},
+async def migrate_seen_links() -> int:
+    """旧版集合逐批迁入有序集合 (分值记为迁移时刻) 后删除；ZADD NX 可重复执行，多个实例同时迁移也无妨"""
+    if await redis_client.type(LEGACY_SEEN_LINKS_KEY) not in (b"set", "set"):
+        return 0
+    now = time.time()
+    migrated = 0
+    cursor = 0
+    while True:
+        cursor, links = await redis_client.sscan(LEGACY_SEEN_LINKS_KEY, cursor, count=1000)
+        if links:
+            migrated += await redis_client.zadd(SEEN_LINKS_KEY, {link: now for link in links}, nx=True)
+        if not cursor:
+            break
+    await redis_client.delete(LEGACY_SEEN_LINKS_KEY)
+    return migrated
+
+
+async def mark_seen(links: List[str]):
+    """标记为已收录，并裁掉超过 SEEN_LINKS_RETENTION 未再出现的链接"""
+    if redis_client and links:
+        now = time.time()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(SEEN_LINKS_KEY, {link: now for link in links})
+            pipe.zremrangebyscore(SEEN_LINKS_KEY, "-inf", now - SEEN_LINKS_RETENTION)
+            await pipe.execute()
+
+
+def cache_max_age(headers: httpx.Headers) -> Optional[int]:
+    """Cache-Control: max-age=N，供调度器参考"""
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name.lower() == "max-age" and value.strip().isdigit():
+            return int(value)
+    return None
+
+
+async def download_feed(url: str) -> dict:
+    """流式下载，超过 MAX_FEED_BYTES 立即中断"""
+    async with http_client.stream("GET", url) as response:
+        response.raise_for_status()
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > MAX_FEED_BYTES:
+            raise FeedTooLargeError(f"{url}: {declared} bytes > {MAX_FEED_BYTES}")
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > MAX_FEED_BYTES:
+                raise FeedTooLargeError(f"{url}: more than {MAX_FEED_BYTES} bytes")
+            chunks.append(chunk)
+    return {"data": b"".join(chunks), "max_age": cache_max_age(response.headers)}
+
+
+async def stream_feed(url: str) -> Optional[dict]:
+    """流式解析；返回 None 表示文档不是合法 XML，需要回退到 feedparser"""
+
+    async def is_seen(link: str) -> bool:
+        # 已收录的链接仍在 Feed 中：刷新时间，避免因保留期被裁掉后重新摘要
+        if not redis_client or await redis_client.zscore(SEEN_LINKS_KEY, link) is None:
+            return False
+        await redis_client.zadd(SEEN_LINKS_KEY, {link: time.time()}, xx=True)
+        return True
+
+    async with http_client.stream("GET", url) as response:
+        response.raise_for_status()
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > MAX_FEED_BYTES:
+            raise FeedTooLargeError(f"{url}: {declared} bytes > {MAX_FEED_BYTES}")
+        try:
+            result = await parse_stream(
+                response.aiter_bytes(), ENTRIES_PER_SOURCE, MAX_FEED_BYTES, is_seen, STOP_AFTER_SEEN
             )
-            response.raise_for_status()
-            return response.json()["summary"]
+        except FeedTooLargeError as e:
+            raise FeedTooLargeError(f"{url}: {e}") from None
+        except ParseError as e:
+            print(f"Stream parser fallback for {url}: {e}")
+            return None
+    # 提前返回时离开 with 块即关闭连接，剩余的响应体不再下载
+    return {
+        "items": result.items,
+        "seen": result.seen,
+        "ttl": result.ttl,
+        "max_age": cache_max_age(response.headers),
+    }
+
+
+def parse_feed(data: bytes, limit: int) -> dict:
+    """在工作进程中执行：解析并只返回需要的字段 (普通 dict，便于跨进程传递)"""
+    feed = feedparser.parse(data)
+    items = []
+    for item in feed.entries[:limit]:
+        items.append({
+            "title": item.get("title", "无标题"),
+            "link": item.get("link", ""),
+            "content": item.get("summary") or item.get("description") or "",
+            "published": item.get("published") or item.get("updated"),
+        })
+    ttl = str(feed.feed.get("ttl", "")).strip()
+    return {"items": items, "ttl": int(ttl) if ttl.isdigit() else None}
+
+
+async def record_feed_stats(source: dict, items: List[dict]):
+    """
+    记录本次拉取的发布节奏与缓存提示 (FEED_STATS_KEY，按 URL)，调度器据此调整各源的轮询间隔。
+    new 为尚未收录的条目数，published 为条目的发布时间 (epoch 秒)。
+    stream 模式下已收录的条目不在 items 里，由 source["seen"] 补回，两种解析方式统计口径一致。
+    """
+    if not redis_client:
+        return
+    items = items + source.get("seen", [])
+    links = [item["link"] for item in items if item["link"]]
+    seen = [score is not None for score in await redis_client.zmscore(SEEN_LINKS_KEY, links)] if links else []
+    # 仍在 Feed 中的已收录链接刷新时间，只要还能拉到就不会因保留期被裁掉
+    still_listed = {link: time.time() for link, flag in zip(links, seen) if flag}
+    if still_listed:
+        await redis_client.zadd(SEEN_LINKS_KEY, still_listed, xx=True)
+    published = sorted(
+        (int(moment.timestamp()) for moment in (parse_timestamp(item["published"]) for item in items) if moment),
+        reverse=True,
+    )
+    await redis_client.hset(FEED_STATS_KEY, source["url"], json.dumps({
+        "fetched_at": int(time.time()),
+        "new": sum(1 for flag in seen if not flag),
+        "published": published,
+        "ttl": source.get("ttl"),
+        "max_age": source.get("max_age"),
+    }))
+
+
+async def summarize_content(content: str) -> dict:
+    """调用 Summary Service，返回 {summary, model}"""
+    try:
+        response = await http_client.post(
+            f"{SUMMARY_SERVICE_URL}/summarize",
+            json={"text": content, "use_cache": True, "priority": "ingest"},
+            timeout=SUMMARY_TIMEOUT,
+        )
+        response.raise_for_status()
+        result = response.json()
+        return {"summary": result["summary"], "model": result.get("model", "")}
     except Exception as e:
         print(f"Summary service error: {e}")
-        from textwrap import shorten
-        return shorten(content, width=240, placeholder="...")
+        return {"summary": shorten(content, width=240, placeholder="..."), "model": "truncate"}
+
+
+def build_pipeline(job_id: str, progress: Optional[JobProgress] = None) -> Pipeline:
+    """fetch → parse → dedupe → summarize → persist → publish"""
+    seen_links = set()
+    loop = asyncio.get_running_loop()
+
+    async def fetch(source: dict) -> dict:
+        if FEED_PARSER == "stream":
+            streamed = await stream_feed(source["url"])
+            if streamed is not None:
+                return {**source, **streamed}
+        return {**source, **await download_feed(source["url"])}
+
+    async def parse(fetched: dict) -> List[dict]:
+        if "items" not in fetched:
+            parsed = await loop.run_in_executor(parse_pool, parse_feed, fetched.pop("data"), ENTRIES_PER_SOURCE)
+            fetched.update(parsed)
+        items = fetched["items"]
+        await record_feed_stats(fetched, items)
+        fetched_at = datetime.now(timezone.utc)
+        return [
+            {
+                "source_id": fetched["id"],
+                "title": item["title"],
+                "link": item["link"],
+                "content": item["content"],
+                # 统一为 UTC；缺失或无法识别的日期按收录时间处理
+                "published_at": (parse_timestamp(item["published"]) or fetched_at).isoformat(),
+                "category": fetched["category"],
+                "source_title": fetched["title"],
+                "source_weight": fetched.get("weight", 1.0),
+            }
+            for item in items
+        ]
+
+    async def dedupe(entry: dict) -> Optional[dict]:
+        # 本次任务内重复的链接，以及之前任务已经入库的链接，都不再摘要
+        link = entry["link"]
+        if not link or link in seen_links:
+            return None
+        seen_links.add(link)
+        if redis_client and await redis_client.zscore(SEEN_LINKS_KEY, link) is not None:
+            return None
+        return entry
+
+    async def summarize(entry: dict) -> dict:
+        entry.update(await summarize_content(entry["content"]))
+        return entry
+
+    async def persist(entries: List[dict]) -> List[dict]:
+        # 一批一次 /entries/bulk；已存在的 (source_id, link) 由 data-service 跳过插入。
+        # 能走到这里的链接都还没标记为已收录 (见 publish)，已存在说明上次入库后没来得及发布，照样往下发布
+        response = await http_client.post(
+            f"{DATA_SERVICE_URL}/entries/bulk",
+            json={"entries": [{field: entry[field] for field in BULK_FIELDS} for entry in entries]},
+            timeout=PERSIST_TIMEOUT,
+        )
+        response.raise_for_status()
+        result = response.json()
+        ids = {
+            (row["source_id"], row["link"]): row["id"]
+            for row in result["entries"] + result.get("existing", [])
+        }
+        persisted = []
+        for entry in entries:
+            entry_id = ids.get((entry["source_id"], entry["link"]))
+            if entry_id is not None:
+                persisted.append({**entry, "entry_id": entry_id})
+        return persisted
+
+    async def publish(entries: List[dict]) -> List[dict]:
+        events = [
+            EntryCreatedEvent(
+                entry_id=entry["entry_id"],
+                source_id=entry["source_id"],
+                title=entry["title"],
+                content=entry["content"],
+                published_at=entry["published_at"],
+            )
+            for entry in entries
+        ]
+        await publish_events("entry.created", [{"job_id": job_id, **event.model_dump(mode="json")} for event in events])
+        # 摘要已在入库前完成，这里直接发布 entry.summarized，digest-service 据此增量更新日报
+        summarized = [
+            EntrySummarizedEvent(
+                entry_id=entry["entry_id"],
+                summary=entry["summary"],
+                model=entry["model"],
+                source_id=entry["source_id"],
+                title=entry["title"],
+                link=entry["link"],
+                content=entry["content"],
+                published_at=entry["published_at"],
+                category=entry["category"],
+                source_title=entry["source_title"],
+                source_weight=entry.get("source_weight", 1.0),
+            )
+            for entry in entries
+        ]
+        await publish_events(
+            "entry.summarized", [{"job_id": job_id, **event.model_dump(mode="json")} for event in summarized]
+        )
+        # 事件发出后才标记为已收录：在此之前崩溃，重新投递的工作项不会被 dedupe 丢弃
+        await mark_seen([entry["link"] for entry in entries])
+        return entries
+
+    return Pipeline([
+        Stage("fetch", fetch, concurrency=MAX_CONCURRENT, queue_size=MAX_CONCURRENT),
+        Stage("parse", parse, concurrency=PARSE_WORKERS, queue_size=PARSE_WORKERS, fan_out=True),
+        Stage("dedupe", dedupe, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage("summarize", summarize, concurrency=SUMMARY_CONCURRENCY, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage(
+            "persist", persist, concurrency=PERSIST_CONCURRENCY,
+            queue_size=PERSIST_BATCH_SIZE, batch_size=PERSIST_BATCH_SIZE,
+        ),
+        Stage("publish", publish, queue_size=PIPELINE_QUEUE_SIZE, batch_size=PUBLISH_BATCH_SIZE),
+    ], on_progress=progress)
 
 
 @app.get("/health")
@@ -128,58 +457,60 @@ async def start_ingest(sources: Optional[List[SourceCreate]] = None):
         "source_count": len(sources) if sources else 0,
     })
     
-    # 后台任务
-    asyncio.create_task(process_ingest(job_id, sources))
+    await job_registry.create(job_id)
+    
+    # 后台拆分任务 (保留引用，避免任务被回收)
+    task = asyncio.create_task(process_ingest(job_id, sources))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
     
     return IngestResponse(
         job_id=job_id,
-        status="processing",
+        status="queued",
         source_count=len(sources) if sources else 0
     )
 
 
 async def process_ingest(job_id: str, sources: Optional[List[SourceCreate]]):
-    """后台处理 ingest"""
+    """解析订阅源并按源拆成工作项，交给消费组里的 worker 处理"""
     try:
         # 获取订阅源列表
         if sources:
-            source_list = [(s.url, s.title, s.category) for s in sources]
+            source_list = [s.model_dump() for s in sources]
         else:
             # 从 Source Service 获取
-            async with httpx.AsyncClient() as client:
-                resp = await client.get("http://localhost:8002/sources")
-                sources_data = resp.json()
-                source_list = [(s["url"], s["title"], s["category"]) for s in sources_data]
+            resp = await http_client.get(f"{SOURCE_SERVICE_URL}/sources")
+            resp.raise_for_status()
+            source_list = [
+                {"url": s["url"], "title": s["title"], "category": s["category"], "weight": s.get("weight", 1.0)}
+                for s in resp.json()
+            ]
         
-        total_entries = 0
+        # 条目外键指向 data-service 的 sources，按 URL 解析出真实 id；来源权重只在 source-service 中维护，随工作项带上
+        weights = {source["url"]: source.get("weight", 1.0) for source in source_list}
+        resp = await http_client.post(f"{DATA_SERVICE_URL}/sources/resolve", json=source_list)
+        resp.raise_for_status()
+        source_list = [{**source, "weight": weights.get(source["url"], 1.0)} for source in resp.json()]
+        await job_registry.start(job_id, len(source_list))
+        if not source_list:
+            await complete_job(job_id)
+            return
         
-        # 并发拉取 (限制并发数)
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT)
-        
-        async def fetch_with_limit(url, title, category):
-            async with semaphore:
-                return await fetch_and_summarize(url, 0, title, category)
-        
-        tasks = [fetch_with_limit(url, title, category) for url, title, category in source_list]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        all_entries = []
-        for result in results:
-            if isinstance(result, list):
-                all_entries.extend(result)
-        
-        total_entries = len(all_entries)
-        
-        # 发布完成事件
-        await publish_event("ingest.completed", {
-            "job_id": job_id,
-            "total_entries": total_entries,
-            "timestamp": datetime.utcnow().isoformat(),
-        })
-        
-        print(f"Job {job_id} completed: {total_entries} entries")
+        items = [{"job_id": job_id, "source": json.dumps(source)} for source in source_list]
+        if redis_client is None:
+            # 没有 Redis 时在本进程内处理
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+
+            async def run_local(fields: dict):
+                async with semaphore:
+                    await process_work_item(fields)
+
+            await asyncio.gather(*(run_local(fields) for fields in items))
+        else:
+            await enqueue(redis_client, items)
         
     except Exception as e:
+        await job_registry.finish(job_id, "failed", str(e))
         await publish_event("ingest.failed", {
             "job_id": job_id,
             "error": str(e),
@@ -187,13 +518,85 @@ async def process_ingest(job_id: str, sources: Optional[List[SourceCreate]]):
         print(f"Job {job_id} failed: {e}")
 
 
-@app.get("/job/{job_id}")
-async def get_job_status(job_id: str):
-    """查询任务状态"""
-    if redis_client:
-        # 从 Streams 获取事件
-        events = await redis_client.xrange(f"{STREAMS_KEY}:{job_id}", count=1)
-        if events:
-            return {"job_id": job_id, "status": "completed"}
+async def process_work_item(fields: dict):
+    """处理单个源的工作项；同一 (job_id, source) 已完成则直接跳过，保证重复投递幂等"""
+    job_id = fields["job_id"]
+    source = json.loads(fields["source"])
+    source_key = str(source["id"])
+    if await job_registry.is_source_finished(job_id, source_key):
+        return
+    
+    progress = JobProgress(job_registry, job_id, source_key)
+    stats = await build_pipeline(job_id, progress).run([source])
+    # 入库或发布失败时不确认工作项，交给重新投递：已入库的条目会从 existing 找回，不会丢事件
+    for stage in ("persist", "publish"):
+        if stats[stage]["failed"]:
+            raise RuntimeError(f"{stage} failed for source {source_key}")
+    await progress.flush(stats)
+    if await job_registry.finish_source(job_id, source_key):
+        await complete_job(job_id)
+
+
+async def fail_work_item(fields: dict):
+    """多次重试仍失败 (进入死信流) 的工作项按失败源计入任务"""
+    job_id = fields["job_id"]
+    source_key = str(json.loads(fields["source"])["id"])
+    await job_registry.update_source(job_id, source_key, {"fetch": {"processed": 1, "failed": 1}})
+    if await job_registry.finish_source(job_id, source_key):
+        await complete_job(job_id)
+
+
+async def complete_job(job_id: str):
+    await job_registry.finish(job_id, "completed")
+    job = await job_registry.get(job_id) or {}
+    total_entries = job.get("stages", {}).get("publish", {}).get("processed", 0)
+    
+    # 发布完成事件
+    await publish_event("ingest.completed", {
+        "job_id": job_id,
+        "total_entries": total_entries,
+        "stages": job.get("stages", {}),
+        "timestamp": datetime.utcnow().isoformat(),
+    })
     
-    return {"job_id": job_id, "status": "processing"}
+    print(f"Job {job_id} completed: {total_entries} entries")
+
+
+@app.get("/job/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str):
+    """查询任务状态与进度计数"""
+    job = await job_registry.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus(**job)
+
+
+@app.get("/job/{job_id}/events")
+async def stream_job_progress(job_id: str):
+    """
+    SSE 进度流：状态或计数变化时推送 progress 事件，任务结束时推送 done 后关闭。
+    调度器等调用方订阅这里即可，不必阻塞在一次长 HTTP 调用上。
+    """
+    if await job_registry.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last = None
+        while True:
+            job = await job_registry.get(job_id)
+            if job is None:
+                return
+            payload = JobStatus(**job).model_dump_json()
+            final = job["status"] in FINAL_STATUSES
+            if payload != last:
+                yield f"event: {'done' if final else 'progress'}\ndata: {payload}\n\n"
+                last = payload
+            if final:
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,144 @@
+# 分阶段流式处理管线
+# 各阶段之间用有界 asyncio.Queue 连接：下游处理不过来时 put 会阻塞，背压逐级传回上游，
+# 内存占用只取决于队列长度与并发数，与订阅源数量无关；整体吞吐由最慢的阶段决定。
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+# 上游结束的标记
+DONE = object()
+
+
+@dataclass
+class StageStats:
+    processed: int = 0  # 输入条数
+    emitted: int = 0  # 输出条数
+    dropped: int = 0  # 被过滤 (返回 None) 的条数
+    failed: int = 0
+    busy_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+
+@dataclass
+class Stage:
+    """
+    handler 返回 None 表示丢弃，fan_out=True 时返回可迭代对象逐条下发。
+    batch_size > 1 时 handler 收到列表 (最多等待 batch_wait 秒凑批)，返回输出列表。
+    """
+
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+    queue_size: int = 100
+    fan_out: bool = False
+    batch_size: int = 1
+    batch_wait: float = 0.5
+    stats: StageStats = field(default_factory=StageStats)
+
+
+async def _next_batch(queue: asyncio.Queue, size: int, wait: float) -> Union[List[Any], object]:
+    first = await queue.get()
+    if first is DONE or size <= 1:
+        return first if first is DONE else [first]
+    batch = [first]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while len(batch) < size:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            break
+        if item is DONE:
+            # 留给同阶段的其他 worker
+            queue.put_nowait(DONE)
+            break
+        batch.append(item)
+    return batch
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], on_progress: Optional[Callable[[Stage], Awaitable[None]]] = None):
+        self.stages = stages
+        self.on_progress = on_progress
+
+    async def _worker(self, stage: Stage, inbound: asyncio.Queue, outbound: Optional[asyncio.Queue]) -> None:
+        while True:
+            batch = await _next_batch(inbound, stage.batch_size, stage.batch_wait)
+            if batch is DONE:
+                inbound.put_nowait(DONE)
+                return
+            stage.stats.processed += len(batch)
+            started = time.perf_counter()
+            try:
+                if stage.batch_size > 1:
+                    outputs = list(await stage.handler(batch) or [])
+                else:
+                    result = await stage.handler(batch[0])
+                    if result is None:
+                        outputs = []
+                    elif stage.fan_out:
+                        outputs = list(result)
+                    else:
+                        outputs = [result]
+            except Exception as e:
+                stage.stats.failed += len(batch)
+                print(f"Pipeline stage {stage.name} failed: {e}")
+                continue
+            finally:
+                stage.stats.busy_seconds += time.perf_counter() - started
+
+            if stage.batch_size > 1 or not stage.fan_out:
+                stage.stats.dropped += max(len(batch) - len(outputs), 0)
+            stage.stats.emitted += len(outputs)
+            if outbound is not None:
+                for output in outputs:
+                    await outbound.put(output)
+            if self.on_progress is not None:
+                await self.on_progress(stage)
+
+    async def run(self, items: Union[Iterable[Any], AsyncIterable[Any]]) -> Dict[str, Dict[str, Any]]:
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        groups = []
+        for index, stage in enumerate(self.stages):
+            outbound = queues[index + 1] if index + 1 < len(self.stages) else None
+            workers = [
+                asyncio.create_task(self._worker(stage, queues[index], outbound))
+                for _ in range(max(stage.concurrency, 1))
+            ]
+            groups.append(workers)
+
+        try:
+            # 按需投喂第一个阶段，队列满时这里会等待
+            if hasattr(items, "__aiter__"):
+                async for item in items:
+                    await queues[0].put(item)
+            else:
+                for item in items:
+                    await queues[0].put(item)
+            await queues[0].put(DONE)
+
+            # 逐级收尾：某阶段全部 worker 退出后，再通知下一阶段
+            for index, workers in enumerate(groups):
+                await asyncio.gather(*workers)
+                if index + 1 < len(queues):
+                    await queues[index + 1].put(DONE)
+        except BaseException:
+            for workers in groups:
+                for worker in workers:
+                    worker.cancel()
+            raise
+
+        return {stage.name: stage.stats.as_dict() for stage in self.stages}
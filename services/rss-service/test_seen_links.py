@@ -0,0 +1,132 @@
+import asyncio
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parent
+sys.path.append(str(SERVICE_DIR))
+
+# 后端同样有 main 模块，按文件路径以独立名称加载
+_spec = importlib.util.spec_from_file_location("rss_main", SERVICE_DIR / "main.py")
+rss = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(rss)
+
+
+@pytest.fixture()
+def redis_client(make_redis, monkeypatch):
+    async def make():
+        client = await make_redis()
+        monkeypatch.setattr(rss, "redis_client", client)
+        return client
+
+    return make
+
+
+class TestSeenLinks:
+    def test_legacy_set_is_migrated_once(self, redis_client):
+        async def scenario():
+            client = await redis_client()
+            links = [f"https://example.com/{n}" for n in range(2500)]
+            await client.sadd(rss.LEGACY_SEEN_LINKS_KEY, *links)
+
+            assert await rss.migrate_seen_links() == 2500
+            assert not await client.exists(rss.LEGACY_SEEN_LINKS_KEY)
+            assert await client.zcard(rss.SEEN_LINKS_KEY) == 2500
+            assert await rss.migrate_seen_links() == 0
+
+        asyncio.run(scenario())
+
+    def test_links_not_seen_within_retention_are_trimmed(self, redis_client):
+        async def scenario():
+            client = await redis_client()
+            now = time.time()
+            await client.zadd(rss.SEEN_LINKS_KEY, {
+                "https://example.com/old": now - rss.SEEN_LINKS_RETENTION - 60,
+                "https://example.com/recent": now - 60,
+            })
+
+            await rss.mark_seen(["https://example.com/new"])
+
+            members = await client.zrange(rss.SEEN_LINKS_KEY, 0, -1)
+            assert sorted(members) == [b"https://example.com/new", b"https://example.com/recent"]
+
+        asyncio.run(scenario())
+
+    def test_feed_stats_count_new_links_and_refresh_listed_ones(self, redis_client):
+        async def scenario():
+            client = await redis_client()
+            listed_at = time.time() - 7 * 86400
+            await client.zadd(rss.SEEN_LINKS_KEY, {"https://example.com/1": listed_at})
+            items = [
+                {"link": "https://example.com/1", "published": None},
+                {"link": "https://example.com/2", "published": "2024-05-01T08:00:00Z"},
+                {"link": "", "published": None},
+            ]
+
+            await rss.record_feed_stats({"url": "https://example.com/feed.xml", "ttl": 60}, items)
+
+            stats = json.loads(await client.hget(rss.FEED_STATS_KEY, "https://example.com/feed.xml"))
+            assert stats["new"] == 1
+            assert stats["ttl"] == 60
+            # 仍在 Feed 中的已收录链接刷新时间；未收录的链接只在发布后才标记
+            assert await client.zscore(rss.SEEN_LINKS_KEY, "https://example.com/1") > listed_at
+            assert await client.zscore(rss.SEEN_LINKS_KEY, "https://example.com/2") is None
+
+        asyncio.run(scenario())
+
+    def test_stream_mode_refreshes_listed_links_and_reports_them(self, redis_client, monkeypatch):
+        feed_url = "https://example.com/feed.xml"
+        items = "".join(
+            f"<item><title>Post {n}</title><link>https://example.com/{n}</link>"
+            f"<pubDate>Wed, 0{n} May 2024 08:00:00 GMT</pubDate><description>Body {n}</description></item>"
+            for n in range(5, 0, -1)
+        )
+        feed = f"<rss version='2.0'><channel><title>Example</title><ttl>30</ttl>{items}</channel></rss>"
+        persisted = []
+
+        def handler(request):
+            if str(request.url) == feed_url:
+                return httpx.Response(200, text=feed, headers={"content-type": "application/rss+xml"})
+            if request.url.path == "/summarize":
+                return httpx.Response(200, json={"summary": "summary", "model": "stub"})
+            if request.url.path == "/entries/bulk":
+                entries = json.loads(request.content)["entries"]
+                persisted.extend(entry["link"] for entry in entries)
+                rows = [
+                    {"id": index + 1, "source_id": entry["source_id"], "link": entry["link"]}
+                    for index, entry in enumerate(entries)
+                ]
+                return httpx.Response(200, json={"inserted": len(rows), "entries": rows, "existing": []})
+            return httpx.Response(404)
+
+        async def scenario():
+            client = await redis_client()
+            monkeypatch.setattr(rss, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+            monkeypatch.setattr(rss, "FEED_PARSER", "stream")
+            monkeypatch.setattr(rss, "STOP_AFTER_SEEN", 3)
+            # 最早的三条已收录，且快到保留期
+            listed_at = time.time() - rss.SEEN_LINKS_RETENTION + 60
+            await client.zadd(rss.SEEN_LINKS_KEY, {f"https://example.com/{n}": listed_at for n in (1, 2, 3)})
+
+            source = {"id": 7, "url": feed_url, "title": "Example", "category": "tech"}
+            stats = await rss.build_pipeline("job-1", None).run([source])
+
+            assert stats["publish"]["processed"] == 2
+            assert sorted(persisted) == ["https://example.com/4", "https://example.com/5"]
+            feed_stats = json.loads(await client.hget(rss.FEED_STATS_KEY, feed_url))
+            assert feed_stats["new"] == 2
+            assert len(feed_stats["published"]) == 5
+            assert feed_stats["ttl"] == 30
+
+            # 仍在 Feed 中的旧链接已刷新，之后的裁剪不会把它们删掉
+            await rss.mark_seen(["https://example.com/6"])
+            assert await client.zcard(rss.SEEN_LINKS_KEY) == 6
+            for n in (1, 2, 3):
+                assert await client.zscore(rss.SEEN_LINKS_KEY, f"https://example.com/{n}") > listed_at + 30
+
+        asyncio.run(scenario())
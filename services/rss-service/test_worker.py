@@ -0,0 +1,111 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import worker  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fast_worker(monkeypatch):
+    # 闲置 20ms 即可接管、每轮都尝试接管，短阻塞读，出错不退避
+    monkeypatch.setattr(worker, 'CLAIM_IDLE_MS', 20)
+    monkeypatch.setattr(worker, 'CLAIM_INTERVAL', 0)
+    monkeypatch.setattr(worker, 'READ_BLOCK_MS', 10)
+    monkeypatch.setattr(worker, 'MAX_DELIVERIES', 3)
+    monkeypatch.setattr(worker, 'RETRY_BACKOFF', 0)
+
+
+async def _run_until(stream_worker, condition, timeout=5.0):
+    stop = asyncio.Event()
+    task = asyncio.create_task(stream_worker.run(stop))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await asyncio.wait_for(task, timeout)
+
+
+class TestStreamWorker:
+    def test_crashed_consumer_work_is_claimed_and_completed(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            await worker.ensure_group(client)
+            await worker.enqueue(client, [{'job_id': 'j1', 'source': '{"id": 1}'}])
+
+            # 第一个 worker 读到工作项后崩溃，没有确认
+            crashed = worker.StreamWorker(client, None, 'crashed')
+            assert len(await crashed.read(1)) == 1
+
+            handled = []
+
+            async def handler(fields):
+                handled.append(fields)
+
+            survivor = worker.StreamWorker(client, handler, 'survivor')
+            await _run_until(survivor, lambda: handled)
+
+            assert handled == [{'job_id': 'j1', 'source': '{"id": 1}'}]
+            assert (await client.xpending(worker.WORK_STREAM, worker.WORK_GROUP))['pending'] == 0
+            # 确认后即删除，工作流不再保留已完成的项
+            assert await client.xlen(worker.WORK_STREAM) == 0
+
+        asyncio.run(scenario())
+
+    def test_failing_item_is_redelivered_then_dead_lettered(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            await worker.ensure_group(client)
+            await worker.enqueue(client, [{'job_id': 'j2', 'source': '{"id": 2}'}])
+            attempts = []
+            dead = []
+
+            async def handler(fields):
+                attempts.append(fields)
+                raise RuntimeError('feed unreachable')
+
+            async def on_dead(fields):
+                dead.append(fields)
+
+            failing = worker.StreamWorker(client, handler, 'failing', on_dead=on_dead)
+            await _run_until(failing, lambda: dead)
+
+            assert len(attempts) == worker.MAX_DELIVERIES
+            assert dead == [{'job_id': 'j2', 'source': '{"id": 2}'}]
+            letters = await client.xrange(worker.DEAD_LETTER_STREAM)
+            assert len(letters) == 1
+            assert letters[0][1][b'error'] == b'feed unreachable'
+            assert (await client.xpending(worker.WORK_STREAM, worker.WORK_GROUP))['pending'] == 0
+
+        asyncio.run(scenario())
+
+    def test_redis_errors_do_not_stop_the_worker(self, make_redis, monkeypatch):
+        async def scenario():
+            client = await make_redis()
+            await worker.ensure_group(client)
+            await worker.enqueue(client, [{'job_id': 'j3', 'source': '{"id": 3}'}])
+            handled = []
+
+            async def handler(fields):
+                handled.append(fields)
+
+            flaky = worker.StreamWorker(client, handler, 'flaky')
+            read = flaky.read
+            failures = iter([True, True])
+
+            async def flaky_read(count):
+                if next(failures, False):
+                    raise ConnectionError('Connection reset by peer')
+                return await read(count)
+
+            monkeypatch.setattr(flaky, 'read', flaky_read)
+            monkeypatch.setattr(worker, 'CLAIM_INTERVAL', 3600)
+            await _run_until(flaky, lambda: handled)
+
+            assert len(handled) == 1
+
+        asyncio.run(scenario())
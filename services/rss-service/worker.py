@@ -0,0 +1,226 @@
+# Ingest Worker - Redis Streams 消费组
+# /ingest 把任务拆成按订阅源的工作项写入 WORK_STREAM，由消费组里的多个 worker 分摊处理。
+# 处理成功才 XACK；worker 崩溃后未确认的工作项闲置超过 CLAIM_IDLE_MS 会被其他 worker 用 XAUTOCLAIM 接管；
+# 多次失败的工作项转入死信流。处理本身按 (job_id, source) 幂等，重复投递不会重复计数。
+# 确认后的工作项随即 XDEL，工作流只保留未完成的项；死信流按近似 MAXLEN 裁剪。
+#
+# 独立运行 (可在多台机器上启动任意多个):
+#   REDIS_URL=redis://localhost:6379 python worker.py --concurrency 4
+
+import argparse
+import asyncio
+import os
+import socket
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+WORK_STREAM = "antiLLMade:rss:work"
+WORK_GROUP = "ingest-workers"
+DEAD_LETTER_STREAM = f"{WORK_STREAM}:dead"
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))  # 单个 worker 同时处理的工作项
+CLAIM_IDLE_MS = int(os.getenv("CLAIM_IDLE_MS", "60000"))  # 闲置多久视为原消费者已失联
+CLAIM_INTERVAL = float(os.getenv("CLAIM_INTERVAL", "15"))
+MAX_DELIVERIES = int(os.getenv("MAX_DELIVERIES", "5"))
+READ_BLOCK_MS = int(os.getenv("READ_BLOCK_MS", "5000"))
+DEAD_LETTER_MAXLEN = int(os.getenv("DEAD_LETTER_MAXLEN", "10000"))
+# Redis 出错时的重试间隔：从 RETRY_BACKOFF 秒起翻倍，最长 RETRY_BACKOFF_MAX 秒，成功一轮后复位
+RETRY_BACKOFF = float(os.getenv("WORKER_RETRY_BACKOFF", "1"))
+RETRY_BACKOFF_MAX = float(os.getenv("WORKER_RETRY_BACKOFF_MAX", "30"))
+
+Message = Tuple[bytes, Dict[str, str]]
+Handler = Callable[[Dict[str, str]], Awaitable[None]]
+
+
+def consumer_name(index: int = 0) -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{index}"
+
+
+async def ensure_group(client: redis.Redis) -> None:
+    try:
+        await client.xgroup_create(WORK_STREAM, WORK_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def enqueue(client: redis.Redis, items: List[Dict[str, str]]) -> List[bytes]:
+    """一次 pipeline 写入多个工作项"""
+    async with client.pipeline(transaction=False) as pipe:
+        for fields in items:
+            pipe.xadd(WORK_STREAM, fields)
+        return await pipe.execute()
+
+
+def _decode(fields: Dict[bytes, bytes]) -> Dict[str, str]:
+    return {
+        (key.decode() if isinstance(key, bytes) else key): (value.decode() if isinstance(value, bytes) else value)
+        for key, value in fields.items()
+    }
+
+
+class StreamWorker:
+    def __init__(
+        self,
+        client: redis.Redis,
+        handler: Handler,
+        consumer: str,
+        concurrency: int = WORKER_CONCURRENCY,
+        on_dead: Optional[Handler] = None,
+    ):
+        self.client = client
+        self.handler = handler
+        self.on_dead = on_dead
+        self.consumer = consumer
+        self.concurrency = concurrency
+        self.active: set = set()
+        self.in_flight: set = set()
+        self._claim_cursor = "0-0"
+        self._last_claim = 0.0
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        stop = stop or asyncio.Event()
+        loop = asyncio.get_running_loop()
+        backoff = RETRY_BACKOFF
+        ready = False
+        while not stop.is_set():
+            try:
+                if not ready:
+                    # 首次启动，或 Redis 重启 / 工作流被删除 (NOGROUP) 后重建消费组
+                    await ensure_group(self.client)
+                    ready = True
+                free = self.concurrency - len(self.active)
+                if free <= 0:
+                    await asyncio.wait(self.active, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                messages: List[Message] = []
+                if loop.time() - self._last_claim >= CLAIM_INTERVAL:
+                    self._last_claim = loop.time()
+                    messages = await self.claim_stalled(free)
+                if not messages:
+                    messages = await self.read(free)
+                backoff = RETRY_BACKOFF
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Redis 断开等错误不能让 worker 退出，否则拉取会一直停到服务重启
+                print(f"Ingest worker {self.consumer} error: {e}, retrying in {backoff:.0f}s")
+                ready = False
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX)
+                continue
+            for message_id, fields in messages:
+                # XAUTOCLAIM 也可能交回本 worker 自己仍在处理的项 (续期落后时)，不重复处理
+                if message_id in self.in_flight:
+                    continue
+                self.in_flight.add(message_id)
+                task = asyncio.create_task(self.process(message_id, fields))
+                self.active.add(task)
+                task.add_done_callback(self.active.discard)
+                task.add_done_callback(lambda _, message_id=message_id: self.in_flight.discard(message_id))
+        if self.active:
+            await asyncio.gather(*self.active, return_exceptions=True)
+
+    async def read(self, count: int) -> List[Message]:
+        response = await self.client.xreadgroup(
+            WORK_GROUP, self.consumer, {WORK_STREAM: ">"}, count=count, block=READ_BLOCK_MS
+        )
+        return [(message_id, _decode(fields)) for _, messages in response or [] for message_id, fields in messages]
+
+    async def claim_stalled(self, count: int) -> List[Message]:
+        """接管其他消费者闲置过久的工作项 (对方崩溃或卡死)"""
+        result = await self.client.xautoclaim(
+            WORK_STREAM, WORK_GROUP, self.consumer,
+            min_idle_time=CLAIM_IDLE_MS, start_id=self._claim_cursor, count=count,
+        )
+        next_cursor, messages = result[0], result[1]
+        self._claim_cursor = next_cursor.decode() if isinstance(next_cursor, bytes) else next_cursor
+        return [(message_id, _decode(fields)) for message_id, fields in messages if fields]
+
+    async def _keepalive(self, message_id: bytes) -> None:
+        # 处理耗时较长时定期重置闲置时间，避免被别的 worker 误认为失联而重复处理；
+        # 已被别人接管的工作项不再抢回
+        while True:
+            await asyncio.sleep(CLAIM_IDLE_MS / 3000)
+            pending = await self.client.xpending_range(
+                WORK_STREAM, WORK_GROUP, min=message_id, max=message_id, count=1
+            )
+            owner = pending[0]["consumer"] if pending else None
+            if isinstance(owner, bytes):
+                owner = owner.decode()
+            if owner != self.consumer:
+                return
+            await self.client.xclaim(
+                WORK_STREAM, WORK_GROUP, self.consumer, min_idle_time=0,
+                message_ids=[message_id], justid=True,
+            )
+
+    async def _deliveries(self, message_id: bytes) -> int:
+        pending = await self.client.xpending_range(
+            WORK_STREAM, WORK_GROUP, min=message_id, max=message_id, count=1
+        )
+        return pending[0]["times_delivered"] if pending else 0
+
+    async def process(self, message_id: bytes, fields: Dict[str, str]) -> None:
+        keepalive = asyncio.create_task(self._keepalive(message_id))
+        try:
+            try:
+                await self.handler(fields)
+            finally:
+                keepalive.cancel()
+        except Exception as e:
+            print(f"Work item {message_id!r} failed: {e}")
+            try:
+                await self.retry_or_dead_letter(message_id, fields, e)
+            except Exception as bookkeeping:
+                # 记账失败 (如 Redis 断开) 时工作项保持未确认，之后仍会被 XAUTOCLAIM 重新投递
+                print(f"Work item {message_id!r} left pending: {bookkeeping}")
+            return
+        try:
+            await self.complete(message_id)
+        except Exception as e:
+            print(f"Work item {message_id!r} done but not acknowledged: {e}")
+
+    async def retry_or_dead_letter(self, message_id: bytes, fields: Dict[str, str], error: Exception) -> None:
+        if await self._deliveries(message_id) < MAX_DELIVERIES:
+            # 保持未确认，闲置超时后由 XAUTOCLAIM 重新投递
+            return
+        await self.client.xadd(
+            DEAD_LETTER_STREAM, {**fields, "error": str(error)},
+            maxlen=DEAD_LETTER_MAXLEN, approximate=True,
+        )
+        if self.on_dead is not None:
+            await self.on_dead(fields)
+        await self.complete(message_id)
+
+    async def complete(self, message_id: bytes) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.xack(WORK_STREAM, WORK_GROUP, message_id)
+            pipe.xdel(WORK_STREAM, message_id)
+            await pipe.execute()
+
+
+async def main() -> None:
+    import main as service
+
+    parser = argparse.ArgumentParser(description="RSS ingest worker (Redis Streams consumer group)")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--name", default=None, help="consumer name, defaults to host-pid")
+    args = parser.parse_args()
+
+    service.EMBEDDED_WORKERS = 0
+    async with service.lifespan(service.app):
+        worker = StreamWorker(
+            service.redis_client,
+            service.process_work_item,
+            args.name or consumer_name(),
+            concurrency=args.concurrency,
+            on_dead=service.fail_work_item,
+        )
+        print(f"Ingest worker {worker.consumer} consuming {WORK_STREAM} as {WORK_GROUP}")
+        await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+# 自适应轮询模拟
+# 按泊松过程为若干组订阅源生成发布时间，比较固定间隔轮询与 PollingScheduler 的每日拉取次数和新条目延迟
+#
+#   python bench_polling.py --days 14 --fixed-minutes 60 --target 2
+
+import argparse
+import bisect
+import random
+from typing import Dict, List, Tuple
+
+from polling import PollingScheduler
+
+# (组名, 源数量, 每小时发布条数)
+GROUPS = [("busy", 10, 6.0), ("medium", 20, 0.5), ("daily", 20, 1 / 24), ("weekly", 20, 1 / 168)]
+START = 1_000_000_000
+STEP = 60  # 模拟时钟步长 (秒)
+HISTORY_DAYS = 30  # 开始前已有的条目，供首次拉取估算速率
+
+
+def make_feeds(days: int, seed: int) -> Dict[str, Tuple[str, List[float]]]:
+    rng = random.Random(seed)
+    feeds = {}
+    for group, count, rate in GROUPS:
+        for i in range(count):
+            t = START - HISTORY_DAYS * 86400
+            arrivals = []
+            while t < START + days * 86400:
+                t += rng.expovariate(rate / 3600)
+                arrivals.append(t)
+            feeds[f"https://{group}{i}.example.com/feed.xml"] = (group, arrivals)
+    return feeds
+
+
+def simulate(feeds, days: int, scheduler=None, fixed_interval: int = 3600) -> Dict[str, Tuple[int, List[float]]]:
+    """返回 {组名: (拉取次数, 每条新条目从发布到被拉到的延迟秒数)}；scheduler 为 None 时按固定间隔轮询"""
+    result = {group: (0, []) for group, _, _ in GROUPS}
+    last_poll = {url: START - fixed_interval for url in feeds}
+    if scheduler is not None:
+        scheduler.sync_sources([{"url": url, "title": url} for url in feeds], now=START)
+
+    def poll(url: str, now: float) -> None:
+        group, arrivals = feeds[url]
+        polls, delays = result[group]
+        lo = bisect.bisect_right(arrivals, last_poll[url])
+        hi = bisect.bisect_right(arrivals, now)
+        delays.extend(now - a for a in arrivals[lo:hi])
+        result[group] = (polls + 1, delays)
+        if scheduler is not None:
+            scheduler.observe(url, {
+                "fetched_at": int(now) + 5,
+                "new": hi - lo,
+                "published": [int(a) for a in arrivals[max(hi - 20, 0):hi]],
+            })
+        last_poll[url] = now
+
+    now = START
+    while now < START + days * 86400:
+        if scheduler is not None:
+            for source in scheduler.pop_due(now):
+                poll(source.url, now)
+        elif (now - START) % fixed_interval == 0:
+            for url in feeds:
+                poll(url, now)
+        now += STEP
+    return result
+
+
+def report(label: str, result, days: int) -> None:
+    print(label)
+    counts = {group: count for group, count, _ in GROUPS}
+    for group, (polls, delays) in result.items():
+        delays = sorted(delays)
+        median = delays[len(delays) // 2] / 60 if delays else 0.0
+        print(f"  {group:7} {polls / days / counts[group]:6.1f} fetches/day/feed   median delay {median:6.1f} min")
+    print(f"  total   {sum(polls for polls, _ in result.values()) / days:6.0f} fetches/day")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate adaptive polling against fixed-interval polling")
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fixed-minutes", type=int, default=60)
+    parser.add_argument("--min-minutes", type=int, default=15)
+    parser.add_argument("--max-minutes", type=int, default=1440)
+    parser.add_argument("--target", type=float, default=2)
+    args = parser.parse_args()
+
+    feeds = make_feeds(args.days, args.seed)
+    fixed = args.fixed_minutes * 60
+    report(f"fixed {args.fixed_minutes}min", simulate(feeds, args.days, fixed_interval=fixed), args.days)
+    scheduler = PollingScheduler(args.min_minutes * 60, args.max_minutes * 60, fixed, args.target)
+    report("adaptive", simulate(feeds, args.days, scheduler, fixed_interval=fixed), args.days)
+
+
+if __name__ == "__main__":
+    main()
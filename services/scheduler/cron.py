@@ -0,0 +1,112 @@
+# Cron 表达式
+# 标准 5 段: 分 时 日 月 周，支持 * / a-b / a-b/n / */n / 列表 / 英文缩写 (jan, mon) 以及 @hourly 等宏。
+# 日与周同时受限时按 cron 惯例取并集。时间一律按 UTC 计算。
+
+from datetime import datetime, timedelta
+from typing import FrozenSet, List, Tuple
+
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+# (最小值, 最大值, 名称表, 名称对应的起始值)
+_FIELDS: List[Tuple[int, int, List[str], int]] = [
+    (0, 59, [], 0),
+    (0, 23, [], 0),
+    (1, 31, [], 0),
+    (1, 12, _MONTH_NAMES, 1),
+    (0, 7, _DAY_NAMES, 0),  # 0 与 7 都表示周日
+]
+# 最多向后搜索的时间，超过则认为表达式永远不会触发 (如 2 月 30 日)
+_SEARCH_LIMIT = timedelta(days=366 * 5)
+
+
+class CronError(ValueError):
+    pass
+
+
+def _value(token: str, low: int, high: int, names: List[str], offset: int) -> int:
+    lowered = token.lower()
+    if lowered in names:
+        return names.index(lowered) + offset
+    if not token.isdigit():
+        raise CronError(f"invalid value {token!r}")
+    value = int(token)
+    if not low <= value <= high:
+        raise CronError(f"{value} out of range {low}-{high}")
+    return value
+
+
+def _parse_field(text: str, low: int, high: int, names: List[str], offset: int) -> Tuple[FrozenSet[int], bool]:
+    """返回 (取值集合, 是否为 *)"""
+    values = set()
+    for part in text.split(","):
+        base, _, step_text = part.partition("/")
+        step = int(step_text) if step_text.isdigit() and int(step_text) > 0 else None
+        if step_text and step is None:
+            raise CronError(f"invalid step in {part!r}")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            first, last = base.split("-", 1)
+            start, end = _value(first, low, high, names, offset), _value(last, low, high, names, offset)
+            if start > end:
+                raise CronError(f"invalid range {base!r}")
+        else:
+            start = _value(base, low, high, names, offset)
+            end = high if step else start
+        values.update(range(start, end + 1, step or 1))
+    return frozenset(values), text == "*"
+
+
+class CronExpression:
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        text = _MACROS.get(self.expression.lower(), self.expression)
+        parts = text.split()
+        if len(parts) != 5:
+            raise CronError(f"expected 5 fields, got {len(parts)}: {expression!r}")
+        parsed = [_parse_field(part, *spec) for part, spec in zip(parts, _FIELDS)]
+        (self.minutes, _), (self.hours, _), (self.days, any_day), (self.months, _), (weekdays, any_weekday) = parsed
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self.any_day = any_day
+        self.any_weekday = any_weekday
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7  # cron: 0 = 周日
+        day_ok = moment.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """严格晚于 moment 的下一个触发时间 (不带时区的 UTC)"""
+        candidate = moment.replace(second=0, microsecond=0, tzinfo=None) + timedelta(minutes=1)
+        limit = candidate + _SEARCH_LIMIT
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = (candidate.year + 1, 1) if candidate.month == 12 else (candidate.year, candidate.month + 1)
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise CronError(f"{self.expression!r} never fires")
@@ -0,0 +1,150 @@
+# 任务存储 (SQLite)
+# 保存任务的 cron 表达式、抖动、下次运行时间与运行历史，服务重启后继续沿用。
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Job:
+    job_id: str
+    name: str
+    schedule: str  # cron 表达式
+    jitter_seconds: int
+    enabled: bool
+    next_run_ts: Optional[float]
+    last_run_ts: Optional[float]
+    last_status: Optional[str]
+
+
+@dataclass
+class JobRun:
+    id: int
+    job_id: str
+    trigger: str  # schedule / manual
+    instance: str
+    started_ts: float
+    finished_ts: Optional[float]
+    duration_ms: Optional[int]
+    status: str  # running / succeeded / failed / abandoned
+    detail: Optional[str]
+
+
+class JobStore:
+    def __init__(self, path: str):
+        self.path = path
+        with self._conn() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    schedule TEXT NOT NULL,
+                    jitter_seconds INTEGER NOT NULL DEFAULT 0,
+                    enabled INTEGER NOT NULL DEFAULT 1,
+                    next_run_ts REAL,
+                    last_run_ts REAL,
+                    last_status TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS job_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    trigger TEXT NOT NULL,
+                    instance TEXT NOT NULL,
+                    started_ts REAL NOT NULL,
+                    finished_ts REAL,
+                    duration_ms INTEGER,
+                    status TEXT NOT NULL,
+                    detail TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs(job_id, started_ts);
+                """
+            )
+
+    @contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def ensure_job(self, job_id: str, name: str, schedule: str, jitter_seconds: int) -> None:
+        """首次启动时注册默认任务；已存在的任务保留其 (可能经 API 修改过的) 排期"""
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, name, schedule, jitter_seconds) VALUES (?, ?, ?, ?)",
+                (job_id, name, schedule, jitter_seconds),
+            )
+
+    def list_jobs(self) -> List[Job]:
+        with self._conn() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY job_id").fetchall()
+        return [Job(**{**row, "enabled": bool(row["enabled"])}) for row in rows]
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return next((job for job in self.list_jobs() if job.job_id == job_id), None)
+
+    def update_job(self, job_id: str, **fields) -> None:
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._conn() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def start_run(self, job_id: str, trigger: str, instance: str) -> int:
+        with self._conn() as conn:
+            cursor = conn.execute(
+                "INSERT INTO job_runs (job_id, trigger, instance, started_ts, status) VALUES (?, ?, ?, ?, 'running')",
+                (job_id, trigger, instance, time.time()),
+            )
+            return cursor.lastrowid
+
+    def finish_run(self, run_id: int, status: str, detail: Optional[str] = None) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT job_id, started_ts FROM job_runs WHERE id = ?", (run_id,)).fetchone()
+            conn.execute(
+                "UPDATE job_runs SET finished_ts = ?, duration_ms = ?, status = ?, detail = ? WHERE id = ?",
+                (now, int((now - row["started_ts"]) * 1000), status, detail, run_id),
+            )
+            conn.execute(
+                "UPDATE jobs SET last_run_ts = ?, last_status = ? WHERE job_id = ?",
+                (row["started_ts"], status, row["job_id"]),
+            )
+
+    def abandon_running(self, job_id: str, started_before: float) -> int:
+        """
+        任务租约已不存在 (运行它的实例退出或崩溃) 时，把 started_before 之前开始、仍为 running 的运行标记为 abandoned。
+        之后才开始的运行可能是刚获取租约的新运行，不受影响。
+        """
+        with self._conn() as conn:
+            cursor = conn.execute(
+                "UPDATE job_runs SET status = 'abandoned' WHERE status = 'running' AND job_id = ? AND started_ts < ?",
+                (job_id, started_before),
+            )
+            return cursor.rowcount
+
+    def list_runs(self, job_id: str, limit: int = 20) -> List[JobRun]:
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT * FROM job_runs WHERE job_id = ? ORDER BY started_ts DESC LIMIT ?",
+                (job_id, limit),
+            ).fetchall()
+        return [JobRun(**row) for row in rows]
+
+    def run_stats(self, job_id: str, limit: int = 50) -> Dict[str, Optional[float]]:
+        """最近若干次成功运行的耗时"""
+        durations = sorted(
+            run.duration_ms for run in self.list_runs(job_id, limit)
+            if run.status == "succeeded" and run.duration_ms is not None
+        )
+        if not durations:
+            return {"runs": 0, "p50_ms": None, "max_ms": None}
+        return {"runs": len(durations), "p50_ms": durations[len(durations) // 2], "max_ms": durations[-1]}
@@ -0,0 +1,66 @@
+# 分布式租约 (Redis)
+# SET key token NX PX 获取，持有期间定期续期；续期与释放用 Lua 校验 token，不会误删别人的租约。
+# 持有者崩溃后租约在 ttl 后自动过期，其他实例即可接手。
+
+import asyncio
+import uuid
+from typing import Optional
+
+import redis.asyncio as redis
+
+LEASE_KEY_PREFIX = "antiLLMade:scheduler:lease:"
+
+_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class Lease:
+    def __init__(self, client: redis.Redis, name: str, owner: str, ttl_seconds: float = 60):
+        self.client = client
+        self.key = f"{LEASE_KEY_PREFIX}{name}"
+        self.token = f"{owner}:{uuid.uuid4().hex[:8]}"
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self._keepalive: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> bool:
+        acquired = bool(await self.client.set(self.key, self.token, nx=True, px=self.ttl_ms))
+        if acquired:
+            self._keepalive = asyncio.create_task(self._renew_loop())
+        return acquired
+
+    async def renew(self) -> bool:
+        return bool(await self.client.eval(_RENEW, 1, self.key, self.token, self.ttl_ms))
+
+    async def _renew_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_ms / 3000)
+            if not await self.renew():
+                print(f"Lease {self.key} lost")
+                return
+
+    async def release(self) -> None:
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+            self._keepalive = None
+        await self.client.eval(_RELEASE, 1, self.key, self.token)
+
+    async def ensure(self) -> bool:
+        """长期持有的租约 (如调度主节点)：仍在续期则返回 True，否则尝试重新获取"""
+        if self._keepalive is not None and not self._keepalive.done():
+            return True
+        return await self.acquire()
+
+
+async def lease_holder(client: redis.Redis, name: str) -> Optional[str]:
+    value = await client.get(f"{LEASE_KEY_PREFIX}{name}")
+    return value.decode() if value else None
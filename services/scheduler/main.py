@@ -1,92 +1,363 @@
 # Scheduler Service - 自动化调度服务
-# 基于 Cron 的定时任务调度
+# 1. 按源自适应轮询：每个订阅源有各自的间隔 (见 polling.py)，到期的源小批量派发给 rss-service
+# 2. Cron 任务 (如全量 ingest)：排期与运行历史保存在 SQLite (jobstore.py)，
+#    运行期间持有 Redis 租约 (lease.py)，同一任务在所有实例上同时只会运行一次
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
 import asyncio
+import hashlib
 import httpx
+import json
 import os
+import socket
+import time
+import redis.asyncio as redis
+
+from cron import CronError, CronExpression
+from jobstore import Job, JobStore
+from lease import Lease, lease_holder
+from polling import PollingScheduler
 
 # 配置
-SCHEDULE_INTERVAL = int(os.getenv("SCHEDULE_INTERVAL_MINUTES", "60"))
+SCHEDULE_INTERVAL = int(os.getenv("SCHEDULE_INTERVAL_MINUTES", "60"))  # 新源的初始间隔
+POLL_MIN_INTERVAL = int(os.getenv("POLL_MIN_INTERVAL_MINUTES", "15"))
+POLL_MAX_INTERVAL = int(os.getenv("POLL_MAX_INTERVAL_MINUTES", "1440"))
+TARGET_NEW_ITEMS = float(os.getenv("TARGET_NEW_ITEMS", "2"))  # 期望每次拉取带回的新条目数
+DISPATCH_BATCH_SIZE = int(os.getenv("DISPATCH_BATCH_SIZE", "10"))  # 每次 /ingest 携带的源数
+DISPATCH_SPACING = float(os.getenv("DISPATCH_SPACING_SECONDS", "2"))  # 批次之间的间隔
+SCHEDULER_TICK = float(os.getenv("SCHEDULER_TICK_SECONDS", "30"))  # 最长休眠时间 (检查拉取结果)
+SOURCE_REFRESH = int(os.getenv("SOURCE_REFRESH_MINUTES", "10"))
 INGEST_ENDPOINT = os.getenv("INGEST_ENDPOINT", "http://localhost:8000/ingest")
+# GET {INGEST_STATUS_ENDPOINT}/{job_id} 查询 ingest 任务进度
+INGEST_STATUS_ENDPOINT = os.getenv("INGEST_STATUS_ENDPOINT", INGEST_ENDPOINT.rsplit("/", 1)[0] + "/job")
+SOURCE_SERVICE_URL = os.getenv("SOURCE_SERVICE_URL", "http://localhost:8002")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 NOTIFICATION_WEBHOOK = os.getenv("NOTIFICATION_WEBHOOK", "")
 
-app = FastAPI(title="Scheduler Service")
+# Cron 任务
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "./scheduler.db")
+INGEST_CRON = os.getenv("INGEST_CRON", "0 4 * * *")  # 全量 ingest，兜底自适应轮询
+INGEST_JITTER = int(os.getenv("INGEST_JITTER_SECONDS", "600"))
+INGEST_RUN_TIMEOUT = float(os.getenv("INGEST_RUN_TIMEOUT_SECONDS", "3600"))
+INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_SECONDS", "5"))
+LEASE_TTL = float(os.getenv("LEASE_TTL_SECONDS", "60"))
+INSTANCE_ID = os.getenv("SCHEDULER_INSTANCE", socket.gethostname())
+
+# rss-service 写入的每源拉取结果，以及本服务持久化的排期
+FEED_STATS_KEY = "antiLLMade:rss:feed_stats"
+POLLING_STATE_KEY = "antiLLMade:scheduler:polling"
+# 每个 cron 触发时刻只由一个实例认领
+FIRED_KEY_PREFIX = "antiLLMade:scheduler:fired:"
+
+redis_client: Optional[redis.Redis] = None
+http_client: Optional[httpx.AsyncClient] = None
+store: Optional[JobStore] = None
+polling = PollingScheduler(
+    min_interval=POLL_MIN_INTERVAL * 60,
+    max_interval=POLL_MAX_INTERVAL * 60,
+    default_interval=SCHEDULE_INTERVAL * 60,
+    target_new_items=TARGET_NEW_ITEMS,
+)
+polling_lease: Optional[Lease] = None
+background_tasks: set = set()
 
 
 class JobStatus(BaseModel):
     job_id: str
     name: str
     schedule: str
+    jitter_seconds: int = 0
+    enabled: bool = True
     last_run: Optional[str]
     next_run: Optional[str]
+    status: str  # running / scheduled / disabled / 上次运行结果
+    running_on: Optional[str] = None
+    recent_runs: int = 0
+    p50_duration_ms: Optional[int] = None
+    max_duration_ms: Optional[int] = None
+
+
+class JobUpdate(BaseModel):
+    schedule: Optional[str] = None
+    jitter_seconds: Optional[int] = None
+    enabled: Optional[bool] = None
+
+
+class JobRunInfo(BaseModel):
+    id: int
+    trigger: str
+    instance: str
+    started_at: str
+    finished_at: Optional[str] = None
+    duration_ms: Optional[int] = None
     status: str
+    detail: Optional[str] = None
 
 
-jobs: dict[str, dict] = {}
+class SourcePolling(BaseModel):
+    url: str
+    title: str
+    interval_minutes: float
+    next_due: str
+    rate_per_hour: Optional[float] = None
+    ttl: Optional[int] = None
+    max_age: Optional[int] = None
+    polls: int = 0
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 启动调度器
-    print(f"Scheduler started, interval={SCHEDULE_INTERVAL}min")
-    asyncio.create_task(scheduler_loop())
+    global redis_client, http_client, store, polling_lease
+    redis_client = redis.from_url(REDIS_URL)
+    http_client = httpx.AsyncClient(timeout=300)
+    store = JobStore(JOB_DB_PATH)
+    store.ensure_job("ingest", "RSS Ingest (全量)", INGEST_CRON, INGEST_JITTER)
+    try:
+        abandoned = await abandon_orphaned_runs()
+        if abandoned:
+            print(f"Marked {abandoned} unfinished runs without a lease as abandoned")
+    except Exception as e:
+        print(f"Orphaned runs not checked: {e}")
+    polling_lease = Lease(redis_client, "polling", INSTANCE_ID, LEASE_TTL)
+    try:
+        states = await redis_client.hvals(POLLING_STATE_KEY)
+        polling.load(json.loads(state) for state in states)
+    except Exception as e:
+        print(f"Polling state not restored: {e}")
+    print(f"Scheduler {INSTANCE_ID} started, polling interval {POLL_MIN_INTERVAL}-{POLL_MAX_INTERVAL}min, "
+          f"{len(polling.sources)} sources, jobs in {JOB_DB_PATH}")
+    tasks = [asyncio.create_task(scheduler_loop()), asyncio.create_task(job_loop())]
     yield
+    for task in tasks + list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*tasks, *background_tasks, return_exceptions=True)
+    await polling_lease.release()
+    await http_client.aclose()
+    await redis_client.close()
+
+
+app = FastAPI(title="Scheduler Service", lifespan=lifespan)
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.utcfromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+# ========== 自适应轮询 ==========
+
+async def refresh_sources():
+    resp = await http_client.get(f"{SOURCE_SERVICE_URL}/sources", timeout=30)
+    resp.raise_for_status()
+    polling.sync_sources(resp.json())
+    # 已删除的源不再保留排期
+    stale = [url for url in await redis_client.hkeys(POLLING_STATE_KEY) if url.decode() not in polling.sources]
+    if stale:
+        await redis_client.hdel(POLLING_STATE_KEY, *stale)
+
+
+async def collect_stats():
+    """读取已派发源的拉取结果并重新排期"""
+    urls = polling.awaiting()
+    if not urls:
+        return
+    updated = []
+    for url, raw in zip(urls, await redis_client.hmget(FEED_STATS_KEY, urls)):
+        if raw and polling.observe(url, json.loads(raw)):
+            updated.append(url)
+    await save_state(updated)
+
+
+async def save_state(urls: List[str]):
+    sources = [polling.sources[url] for url in urls if url in polling.sources]
+    if sources:
+        await redis_client.hset(
+            POLLING_STATE_KEY, mapping={source.url: json.dumps(source.as_dict()) for source in sources}
+        )
 
 
 async def scheduler_loop():
-    """主调度循环"""
+    """主调度循环：取出到期的源，按批派发，然后休眠到下一个到期时间。只有持有 polling 租约的实例派发"""
+    last_refresh = 0.0
     while True:
         try:
-            # 触发 ingest 任务
-            await trigger_ingest()
-            jobs["ingest"]["last_run"] = datetime.utcnow().isoformat()
-            jobs["ingest"]["next_run"] = (
-                datetime.utcnow() + timedelta(minutes=SCHEDULE_INTERVAL)
-            ).isoformat()
+            if await polling_lease.ensure():
+                if time.time() - last_refresh >= SOURCE_REFRESH * 60:
+                    await refresh_sources()
+                    last_refresh = time.time()
+                await collect_stats()
+                # 全量 ingest 运行期间暂停按源派发，避免同一批条目被重复拉取和摘要
+                if not await lease_holder(redis_client, "job:ingest"):
+                    await dispatch_due_sources()
         except Exception as e:
-            jobs["ingest"]["status"] = f"error: {e}"
-            print(f"Ingest job error: {e}")
-        
-        await asyncio.sleep(SCHEDULE_INTERVAL * 60)
+            print(f"Polling error: {e}")
+
+        next_due = polling.next_due()
+        delay = SCHEDULER_TICK if next_due is None else min(max(next_due - time.time(), 1), SCHEDULER_TICK)
+        await asyncio.sleep(delay)
 
 
-async def trigger_ingest():
-    """触发 RSS 拉取"""
-    async with httpx.AsyncClient(timeout=300) as client:
-        response = await client.post(INGEST_ENDPOINT, json={})
+async def dispatch_due_sources():
+    while True:
+        batch = polling.pop_due(limit=DISPATCH_BATCH_SIZE)
+        if not batch:
+            return
+        sources = [
+            {"url": source.url, "title": source.title, "category": source.category, "weight": source.weight}
+            for source in batch
+        ]
+        response = await http_client.post(INGEST_ENDPOINT, json=sources)
         response.raise_for_status()
-        
-        # 发送通知
-        if NOTIFICATION_WEBHOOK:
-            await client.post(
-                NOTIFICATION_WEBHOOK,
-                json={
+        await save_state([source.url for source in batch])
+        await asyncio.sleep(DISPATCH_SPACING)
+
+
+# ========== Cron 任务 ==========
+
+def _jitter(job: Job, slot: datetime) -> int:
+    """同一触发时刻在所有实例上得到相同的抖动，保证各实例计算出的运行时间一致"""
+    if job.jitter_seconds <= 0:
+        return 0
+    digest = hashlib.blake2b(f"{job.job_id}:{slot.isoformat()}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % (job.jitter_seconds + 1)
+
+
+def next_run_ts(job: Job, after: float) -> float:
+    slot = CronExpression(job.schedule).next_after(datetime.utcfromtimestamp(after))
+    return (slot - datetime(1970, 1, 1)).total_seconds() + _jitter(job, slot)
+
+
+async def run_ingest() -> str:
+    """触发全量 ingest，并等待 rss-service 报告完成 (租约覆盖整个运行过程)"""
+    response = await http_client.post(INGEST_ENDPOINT, json=None)
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    deadline = time.monotonic() + INGEST_RUN_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(INGEST_POLL_INTERVAL)
+        status_response = await http_client.get(f"{INGEST_STATUS_ENDPOINT}/{job_id}", timeout=30)
+        if status_response.status_code == 404:
+            continue
+        status_response.raise_for_status()
+        job = status_response.json()
+        if job["status"] == "failed":
+            raise RuntimeError(f"ingest {job_id} failed: {job.get('error')}")
+        if job["status"] == "completed":
+            summary = {
+                key: job.get(key)
+                for key in ("job_id", "sources_total", "sources_failed", "entries_fetched", "entries_persisted")
+            }
+            if NOTIFICATION_WEBHOOK:
+                await http_client.post(NOTIFICATION_WEBHOOK, json={
                     "type": "ingest_completed",
                     "timestamp": datetime.utcnow().isoformat(),
-                    "result": response.json(),
-                }
-            )
+                    "result": summary,
+                })
+            return json.dumps(summary)
+    raise TimeoutError(f"ingest {job_id} still running after {INGEST_RUN_TIMEOUT:.0f}s")
 
 
-# ========== API ==========
+JOB_HANDLERS: Dict[str, Callable[[], Awaitable[str]]] = {
+    "ingest": run_ingest,
+}
+
+
+async def abandon_orphaned_runs() -> int:
+    """
+    运行期间任务租约一直存在；租约已过期 (持有的实例退出或崩溃) 而记录仍为 running 的运行标记为 abandoned。
+    先取时间再查租约：查询之后才获取租约的运行开始得更晚，不会被误标。
+    """
+    checked_at = time.time()
+    abandoned = 0
+    for job in store.list_jobs():
+        if not await lease_holder(redis_client, f"job:{job.job_id}"):
+            abandoned += store.abandon_running(job.job_id, checked_at)
+    return abandoned
+
+
+async def run_with_lease(job_id: str, trigger: str, lease: Lease):
+    run_id = store.start_run(job_id, trigger, INSTANCE_ID)
+    try:
+        detail = await JOB_HANDLERS[job_id]()
+        store.finish_run(run_id, "succeeded", detail)
+    except Exception as e:
+        store.finish_run(run_id, "failed", str(e))
+        print(f"Job {job_id} failed: {e}")
+    finally:
+        await lease.release()
 
-@app.on_event("startup")
-def startup():
-    # 注册任务
-    jobs["ingest"] = {
-        "job_id": "ingest",
-        "name": "RSS Ingest",
-        "schedule": f"每 {SCHEDULE_INTERVAL} 分钟",
-        "last_run": None,
-        "next_run": None,
-        "status": "scheduled",
-    }
 
+def start_job(job_id: str, trigger: str, lease: Lease):
+    task = asyncio.create_task(run_with_lease(job_id, trigger, lease))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def job_loop():
+    """
+    到期的 cron 任务：先认领本次触发时刻 (多实例只有一个执行)，再获取任务租约
+    (上一次运行或手动运行尚未结束时跳过本次)。下次运行时间按 cron 从当前时刻起算，与本次耗时无关。
+    """
+    while True:
+        wake_at = time.time() + SCHEDULER_TICK
+        try:
+            await abandon_orphaned_runs()
+            for job in store.list_jobs():
+                if not job.enabled or job.job_id not in JOB_HANDLERS:
+                    continue
+                now = time.time()
+                if job.next_run_ts is None:
+                    job.next_run_ts = next_run_ts(job, now)
+                    store.update_job(job.job_id, next_run_ts=job.next_run_ts)
+                if job.next_run_ts > now:
+                    wake_at = min(wake_at, job.next_run_ts)
+                    continue
+
+                fired_key = f"{FIRED_KEY_PREFIX}{job.job_id}:{int(job.next_run_ts)}"
+                upcoming = next_run_ts(job, now)
+                store.update_job(job.job_id, next_run_ts=upcoming)
+                wake_at = min(wake_at, upcoming)
+                if not await redis_client.set(fired_key, INSTANCE_ID, nx=True, ex=2 * 86400):
+                    continue
+                lease = Lease(redis_client, f"job:{job.job_id}", INSTANCE_ID, LEASE_TTL)
+                if not await lease.acquire():
+                    print(f"Job {job.job_id} is still running, skipped the run due at {_iso(job.next_run_ts)}")
+                    continue
+                start_job(job.job_id, "schedule", lease)
+        except Exception as e:
+            print(f"Job loop error: {e}")
+        await asyncio.sleep(max(wake_at - time.time(), 1))
+
+
+async def _job_status(job: Job) -> JobStatus:
+    holder = await lease_holder(redis_client, f"job:{job.job_id}")
+    stats = store.run_stats(job.job_id)
+    if holder:
+        status = "running"
+    elif not job.enabled:
+        status = "disabled"
+    else:
+        status = job.last_status or "scheduled"
+    return JobStatus(
+        job_id=job.job_id,
+        name=job.name,
+        schedule=job.schedule,
+        jitter_seconds=job.jitter_seconds,
+        enabled=job.enabled,
+        last_run=_iso(job.last_run_ts),
+        next_run=_iso(job.next_run_ts) if job.enabled else None,
+        status=status,
+        running_on=holder.split(":", 1)[0] if holder else None,
+        recent_runs=stats["runs"],
+        p50_duration_ms=stats["p50_ms"],
+        max_duration_ms=stats["max_ms"],
+    )
+
+
+# ========== API ==========
 
 @app.get("/health")
 def health():
@@ -94,24 +365,88 @@ def health():
 
 
 @app.get("/jobs", response_model=list[JobStatus])
-def list_jobs():
-    return [JobStatus(**job) for job in jobs.values()]
+async def list_jobs():
+    return [await _job_status(job) for job in store.list_jobs()]
+
+
+@app.put("/jobs/{job_id}", response_model=JobStatus)
+async def update_job(job_id: str, payload: JobUpdate):
+    """修改 cron 表达式、抖动或启停；下次运行时间立即按新排期重算"""
+    job = store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    fields = payload.model_dump(exclude_none=True)
+    if "schedule" in fields:
+        try:
+            CronExpression(fields["schedule"]).next_after(datetime.utcnow())
+        except CronError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cron expression: {e}")
+    if fields.get("jitter_seconds", 0) < 0:
+        raise HTTPException(status_code=400, detail="jitter_seconds must be >= 0")
+    for name, value in fields.items():
+        setattr(job, name, value)
+    fields["next_run_ts"] = next_run_ts(job, time.time())
+    store.update_job(job_id, **fields)
+    return await _job_status(store.get_job(job_id))
+
+
+@app.get("/jobs/{job_id}/runs", response_model=list[JobRunInfo])
+def job_runs(job_id: str, limit: int = 20):
+    return [
+        JobRunInfo(
+            id=run.id,
+            trigger=run.trigger,
+            instance=run.instance,
+            started_at=_iso(run.started_ts),
+            finished_at=_iso(run.finished_ts),
+            duration_ms=run.duration_ms,
+            status=run.status,
+            detail=run.detail,
+        )
+        for run in store.list_runs(job_id, limit)
+    ]
 
 
 @app.post("/jobs/{job_id}/run")
-async_id: str):
- def run_job(job    """手动触发任务"""
-    if job_id == "ingest":
-        asyncio.create_task(trigger_ingest())
-        return {"status": "triggered", "job_id": job_id}
-    return {"error": "Job not found"}
+async def run_job(job_id: str):
+    """手动触发任务；同一任务正在运行 (任一实例) 时返回 409"""
+    if job_id not in JOB_HANDLERS or store.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    lease = Lease(redis_client, f"job:{job_id}", INSTANCE_ID, LEASE_TTL)
+    if not await lease.acquire():
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is already running")
+    start_job(job_id, "manual", lease)
+    return {"status": "triggered", "job_id": job_id}
+
+
+@app.get("/polling", response_model=list[SourcePolling])
+def list_polling():
+    """各源当前的轮询间隔与下次拉取时间"""
+    return [
+        SourcePolling(
+            url=source.url,
+            title=source.title,
+            interval_minutes=round(source.interval / 60, 1),
+            next_due=_iso(source.next_due),
+            rate_per_hour=round(source.rate, 3) if source.rate is not None else None,
+            ttl=source.ttl,
+            max_age=source.max_age,
+            polls=source.polls,
+        )
+        for source in sorted(polling.sources.values(), key=lambda source: source.next_due)
+    ]
 
 
 @app.get("/status")
 def status():
     return {
         "service": "scheduler",
-        "interval_minutes": SCHEDULE_INTERVAL,
-        "active_jobs": len(jobs),
+        "instance": INSTANCE_ID,
+        "interval_minutes": {"min": POLL_MIN_INTERVAL, "max": POLL_MAX_INTERVAL, "initial": SCHEDULE_INTERVAL},
+        "active_jobs": sum(1 for job in store.list_jobs() if job.enabled),
+        "sources": len(polling.sources),
+        # 当前排期下的预计拉取次数，以及按固定间隔轮询全部源的次数
+        "fetches_per_day": round(polling.fetches_per_day()),
+        "fixed_fetches_per_day": round(len(polling.sources) * 1440 / SCHEDULE_INTERVAL),
         "timestamp": datetime.utcnow().isoformat(),
     }
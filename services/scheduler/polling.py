@@ -0,0 +1,163 @@
+# 自适应轮询
+# 每个源按观测到的发布速率估算轮询间隔：期望每次拉取大约带回 TARGET_NEW_ITEMS 条新条目。
+# RSS <ttl> 与 Cache-Control max-age 作为间隔下限，最终限定在 [min_interval, max_interval]。
+# 下次到期时间放在最小堆里，调度循环每次取出已到期的源按小批量派发。
+
+import heapq
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 发布速率 (条/小时) 的指数滑动平均中新观测的权重
+RATE_SMOOTHING = 0.3
+# 没有任何新条目也没有日期可参考时，间隔按此倍数放宽
+IDLE_BACKOFF = 2.0
+
+
+@dataclass
+class SourceSchedule:
+    url: str
+    title: str
+    category: str
+    interval: float  # 秒
+    next_due: float  # epoch 秒
+    rate: Optional[float] = None  # 条/小时
+    ttl: Optional[int] = None  # 分钟
+    max_age: Optional[int] = None  # 秒
+    last_fetched_at: Optional[int] = None  # 最近一次已计入的拉取
+    dispatched_at: Optional[float] = None  # 已派发、尚未收到拉取结果
+    polls: int = 0
+    weight: float = 1.0  # 来源权重，派发时随源一起传给 rss-service
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class PollingScheduler:
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        default_interval: float,
+        target_new_items: float = 1.0,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = self._clamp(default_interval)
+        self.target_new_items = target_new_items
+        self.sources: Dict[str, SourceSchedule] = {}
+        # (next_due, url)；重新排期时不删除旧项，出堆时与 source.next_due 不一致的视为过期
+        self._heap: List[Tuple[float, str]] = []
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _push(self, source: SourceSchedule) -> None:
+        heapq.heappush(self._heap, (source.next_due, source.url))
+
+    def load(self, states: Iterable[dict]) -> None:
+        """恢复持久化的排期 (服务重启后沿用已学到的间隔)"""
+        for state in states:
+            source = SourceSchedule(**state)
+            source.interval = self._clamp(source.interval)
+            self.sources[source.url] = source
+            self._push(source)
+
+    def sync_sources(self, sources: Iterable[dict], now: Optional[float] = None) -> None:
+        """与订阅源列表对齐：新源立即到期 (按序错开一秒)，已删除的源移出调度"""
+        now = now or time.time()
+        current = {source["url"]: source for source in sources}
+        for url in list(self.sources):
+            if url not in current:
+                del self.sources[url]
+        for index, (url, info) in enumerate(current.items()):
+            existing = self.sources.get(url)
+            if existing is not None:
+                existing.title = info.get("title", existing.title)
+                existing.category = info.get("category", existing.category)
+                existing.weight = info.get("weight", existing.weight)
+                continue
+            source = SourceSchedule(
+                url=url,
+                title=info.get("title", url),
+                category=info.get("category", "默认"),
+                weight=info.get("weight", 1.0),
+                interval=self.default_interval,
+                next_due=now + index % 60,
+            )
+            self.sources[url] = source
+            self._push(source)
+
+    def pop_due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[SourceSchedule]:
+        """
+        取出已到期的源 (最早到期的在前)。先按当前间隔预排下一次，
+        收到拉取结果后再由 observe 修正；拉取失败时按原间隔重试。
+        """
+        now = now or time.time()
+        due: List[SourceSchedule] = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+            next_due, url = heapq.heappop(self._heap)
+            source = self.sources.get(url)
+            if source is None or source.next_due != next_due:
+                continue
+            source.dispatched_at = now
+            source.polls += 1
+            source.next_due = now + source.interval
+            self._push(source)
+            due.append(source)
+        return due
+
+    def awaiting(self) -> List[str]:
+        return [url for url, source in self.sources.items() if source.dispatched_at is not None]
+
+    def _observed_rate(self, source: SourceSchedule, stats: dict) -> Optional[float]:
+        if source.last_fetched_at is not None:
+            hours = (stats["fetched_at"] - source.last_fetched_at) / 3600
+            if hours > 0:
+                return stats.get("new", 0) / hours
+        # 第一次拉取：用 feed 中现有条目的时间跨度估算
+        published = stats.get("published") or []
+        if len(published) >= 2:
+            hours = (max(published) - min(published)) / 3600
+            if hours > 0:
+                return (len(published) - 1) / hours
+        return None
+
+    def observe(self, url: str, stats: dict) -> Optional[SourceSchedule]:
+        """根据 rss-service 记录的拉取结果更新速率与间隔，并按新间隔重新排期"""
+        source = self.sources.get(url)
+        if source is None or not stats.get("fetched_at"):
+            return None
+        if source.last_fetched_at is not None and stats["fetched_at"] <= source.last_fetched_at:
+            return None
+
+        observed = self._observed_rate(source, stats)
+        if observed is not None:
+            source.rate = observed if source.rate is None else (
+                source.rate * (1 - RATE_SMOOTHING) + observed * RATE_SMOOTHING
+            )
+        if source.rate:
+            interval = self.target_new_items / source.rate * 3600
+        else:
+            interval = source.interval * IDLE_BACKOFF
+        source.ttl = stats.get("ttl")
+        source.max_age = stats.get("max_age")
+        floor = max((source.ttl or 0) * 60, source.max_age or 0)
+        source.interval = self._clamp(max(interval, floor))
+        source.last_fetched_at = stats["fetched_at"]
+        source.dispatched_at = None
+        source.next_due = stats["fetched_at"] + source.interval
+        self._push(source)
+        return source
+
+    def next_due(self) -> Optional[float]:
+        while self._heap:
+            next_due, url = self._heap[0]
+            source = self.sources.get(url)
+            if source is not None and source.next_due == next_due:
+                return next_due
+            heapq.heappop(self._heap)
+        return None
+
+    def fetches_per_day(self) -> float:
+        return sum(86400 / source.interval for source in self.sources.values())
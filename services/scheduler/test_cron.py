@@ -0,0 +1,78 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from cron import CronError, CronExpression  # noqa: E402
+
+
+class TestCronExpression:
+    def test_fields_accept_ranges_steps_lists_and_names(self):
+        cron = CronExpression("*/15 9-17/4 1,15 jan-mar mon-fri")
+        assert cron.minutes == {0, 15, 30, 45}
+        assert cron.hours == {9, 13, 17}
+        assert cron.days == {1, 15}
+        assert cron.months == {1, 2, 3}
+        assert cron.weekdays == {1, 2, 3, 4, 5}
+
+    def test_single_value_with_step_runs_to_the_end_of_the_range(self):
+        assert CronExpression("50/5 * * * *").minutes == {50, 55}
+
+    def test_sunday_is_zero_or_seven(self):
+        assert CronExpression("0 0 * * 7").weekdays == {0}
+        assert CronExpression("0 0 * * SUN").weekdays == {0}
+
+    def test_macros(self):
+        assert CronExpression("@hourly").next_after(datetime(2024, 5, 1, 10, 30)) == datetime(2024, 5, 1, 11, 0)
+        assert CronExpression("@weekly").next_after(datetime(2024, 5, 1, 10, 30)) == datetime(2024, 5, 5, 0, 0)
+
+    @pytest.mark.parametrize("expression", [
+        "* * * *",
+        "60 * * * *",
+        "* 24 * * *",
+        "* * 0 * *",
+        "* * * 13 *",
+        "* * * * 8",
+        "5-1 * * * *",
+        "*/0 * * * *",
+        "*/x * * * *",
+        "foo * * * *",
+    ])
+    def test_invalid_expressions_raise(self, expression):
+        with pytest.raises(CronError):
+            CronExpression(expression)
+
+    def test_next_after_is_strictly_later(self):
+        cron = CronExpression("0 4 * * *")
+        assert cron.next_after(datetime(2024, 5, 1, 4, 0)) == datetime(2024, 5, 2, 4, 0)
+        assert cron.next_after(datetime(2024, 5, 1, 3, 59, 59)) == datetime(2024, 5, 1, 4, 0)
+
+    def test_day_of_month_and_weekday_are_a_union_when_both_restricted(self):
+        # 每月 13 日或每周五
+        cron = CronExpression("0 0 13 * fri")
+        # 2024-09-01 是周日：下一个周五是 6 日，13 日本身也是周五
+        fired = []
+        moment = datetime(2024, 9, 1)
+        for _ in range(4):
+            moment = cron.next_after(moment)
+            fired.append(moment.day)
+        assert fired == [6, 13, 20, 27]
+
+        moment = cron.next_after(datetime(2024, 10, 12))
+        assert moment == datetime(2024, 10, 13)  # 周日，只因日期匹配
+
+    def test_day_of_month_and_weekday_intersect_when_one_is_wildcard(self):
+        assert CronExpression("0 0 * * mon").next_after(datetime(2024, 9, 1)) == datetime(2024, 9, 2)
+        assert CronExpression("0 0 13 * *").next_after(datetime(2024, 9, 1)) == datetime(2024, 9, 13)
+
+    def test_leap_day(self):
+        assert CronExpression("0 0 29 2 *").next_after(datetime(2024, 3, 1)) == datetime(2028, 2, 29)
+
+    def test_expression_that_never_fires_raises(self):
+        with pytest.raises(CronError, match="never fires"):
+            CronExpression("0 0 30 2 *").next_after(datetime(2024, 1, 1))
+        with pytest.raises(CronError, match="never fires"):
+            CronExpression("0 0 31 4,6,9,11 *").next_after(datetime(2024, 1, 1))
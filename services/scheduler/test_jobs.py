@@ -0,0 +1,90 @@
+import asyncio
+import importlib.util
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parent
+sys.path.append(str(SERVICE_DIR))
+
+from jobstore import Job, JobStore  # noqa: E402
+from lease import Lease  # noqa: E402
+
+# 后端同样有 main 模块，按文件路径以独立名称加载调度服务
+_spec = importlib.util.spec_from_file_location("scheduler_main", SERVICE_DIR / "main.py")
+scheduler = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(scheduler)
+
+
+def _job(job_id="ingest", schedule="0 4 * * *", jitter_seconds=600):
+    return Job(job_id, "Ingest", schedule, jitter_seconds, True, None, None, None)
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    job_store = JobStore(str(tmp_path / "scheduler.db"))
+    job_store.ensure_job("ingest", "Ingest", "0 4 * * *", 600)
+    monkeypatch.setattr(scheduler, "store", job_store)
+    return job_store
+
+
+class TestJitter:
+    def test_jitter_is_deterministic_per_job_and_slot(self):
+        slot = datetime(2024, 5, 1, 4, 0)
+        first = scheduler._jitter(_job(), slot)
+        assert first == scheduler._jitter(_job(), slot)
+        assert 0 <= first <= 600
+
+        slots = [datetime(2024, 5, day, 4, 0) for day in range(1, 31)]
+        jitters = {scheduler._jitter(_job(), moment) for moment in slots}
+        # 不同触发时刻、不同任务分散开
+        assert len(jitters) > 20
+        assert [scheduler._jitter(_job("other"), moment) for moment in slots] != [
+            scheduler._jitter(_job(), moment) for moment in slots
+        ]
+
+    def test_zero_jitter(self):
+        assert scheduler._jitter(_job(jitter_seconds=0), datetime(2024, 5, 1, 4, 0)) == 0
+
+    def test_next_run_adds_jitter_to_the_cron_slot(self):
+        after = (datetime(2024, 5, 1, 12, 0) - datetime(1970, 1, 1)).total_seconds()
+        slot = datetime(2024, 5, 2, 4, 0)
+        expected = (slot - datetime(1970, 1, 1)).total_seconds() + scheduler._jitter(_job(), slot)
+        assert scheduler.next_run_ts(_job(), after) == expected
+        # 各实例对同一任务算出同一运行时间
+        assert scheduler.next_run_ts(_job(), after + 60) == expected
+
+
+class TestAbandonRuns:
+    def test_store_only_abandons_runs_started_before_the_check(self, store):
+        old_run = store.start_run("ingest", "schedule", "scheduler-1")
+        checked_at = time.time()
+        time.sleep(0.01)
+        new_run = store.start_run("ingest", "manual", "scheduler-2")
+
+        assert store.abandon_running("ingest", checked_at) == 1
+        statuses = {run.id: run.status for run in store.list_runs("ingest")}
+        assert statuses == {old_run: "abandoned", new_run: "running"}
+
+    def test_runs_without_a_lease_are_abandoned_regardless_of_host(self, store, make_redis, monkeypatch):
+        async def scenario():
+            client = await make_redis()
+            monkeypatch.setattr(scheduler, "redis_client", client)
+            # 另一台主机 (容器重建后主机名已变) 留下的运行，其租约已过期
+            orphaned = store.start_run("ingest", "schedule", "old-container")
+            assert await scheduler.abandon_orphaned_runs() == 1
+
+            # 仍持有租约的运行不受影响
+            lease = Lease(client, "job:ingest", "scheduler-1", ttl_seconds=30)
+            assert await lease.acquire()
+            running = store.start_run("ingest", "manual", "scheduler-1")
+            assert await scheduler.abandon_orphaned_runs() == 0
+            await lease.release()
+
+            statuses = {run.id: run.status for run in store.list_runs("ingest")}
+            assert statuses == {orphaned: "abandoned", running: "running"}
+
+        asyncio.run(scenario())
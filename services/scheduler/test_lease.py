@@ -0,0 +1,86 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from lease import LEASE_KEY_PREFIX, Lease, lease_holder  # noqa: E402
+
+
+class TestLease:
+    def test_only_one_owner_holds_the_lease(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            first = Lease(client, "job:ingest", "a", ttl_seconds=30)
+            second = Lease(client, "job:ingest", "b", ttl_seconds=30)
+
+            assert await first.acquire()
+            assert not await second.acquire()
+            assert await lease_holder(client, "job:ingest") == first.token
+            assert first.token.startswith("a:")
+
+            await first.release()
+            assert await lease_holder(client, "job:ingest") is None
+            assert await second.acquire()
+            await second.release()
+
+        asyncio.run(scenario())
+
+    def test_renew_and_release_check_the_token(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            holder = Lease(client, "polling", "a", ttl_seconds=30)
+            # 同一 owner 的另一个进程 token 不同，也不能续期或释放
+            other = Lease(client, "polling", "a", ttl_seconds=30)
+            assert holder.token != other.token
+
+            assert await holder.acquire()
+            assert not await other.renew()
+            await other.release()
+            assert await lease_holder(client, "polling") == holder.token
+
+            assert await holder.renew()
+            assert await client.pttl(f"{LEASE_KEY_PREFIX}polling") > 29000
+            await holder.release()
+            assert not await holder.renew()
+
+        asyncio.run(scenario())
+
+    def test_expired_lease_can_be_taken_over(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            crashed = Lease(client, "job:ingest", "a", ttl_seconds=0.2)
+            assert await crashed.acquire()
+            # 模拟持有者崩溃：不再续期
+            crashed._keepalive.cancel()
+
+            successor = Lease(client, "job:ingest", "b", ttl_seconds=30)
+            assert not await successor.acquire()
+            await asyncio.sleep(0.3)
+            assert await successor.acquire()
+
+            # 原持有者恢复后不能续期或释放接手者的租约
+            assert not await crashed.renew()
+            await crashed.release()
+            assert await lease_holder(client, "job:ingest") == successor.token
+            await successor.release()
+
+        asyncio.run(scenario())
+
+    def test_ensure_keeps_or_reacquires(self, make_redis):
+        async def scenario():
+            client = await make_redis()
+            lease = Lease(client, "polling", "a", ttl_seconds=30)
+            assert await lease.ensure()
+            assert await lease.ensure()
+
+            await client.delete(f"{LEASE_KEY_PREFIX}polling")
+            # 续期任务发现租约丢失后退出，下一次 ensure 重新获取
+            assert not await lease.renew()
+            lease._keepalive.cancel()
+            await asyncio.sleep(0)
+            assert await lease.ensure()
+            assert await lease_holder(client, "polling") == lease.token
+            await lease.release()
+
+        asyncio.run(scenario())
@@ -0,0 +1,126 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import bench_polling  # noqa: E402
+import polling  # noqa: E402
+from polling import PollingScheduler  # noqa: E402
+
+NOW = 1_000_000_000
+URL = "https://example.com/feed.xml"
+
+
+def _scheduler(**kwargs):
+    options = {"min_interval": 900, "max_interval": 86400, "default_interval": 3600, "target_new_items": 2}
+    options.update(kwargs)
+    scheduler = PollingScheduler(**options)
+    scheduler.sync_sources([{"url": URL, "title": "Example"}], now=NOW)
+    return scheduler
+
+
+class TestPollingScheduler:
+    def test_first_fetch_estimates_rate_from_published_span(self):
+        scheduler = _scheduler()
+        # 5 条条目跨 2 小时 -> 2 条/小时 -> 每 1 小时拉一次可带回 2 条
+        published = [NOW - 7200 + i * 1800 for i in range(5)]
+        source = scheduler.observe(URL, {"fetched_at": NOW, "new": 5, "published": published})
+
+        assert source.rate == pytest.approx(2.0)
+        assert source.interval == pytest.approx(3600)
+        assert source.next_due == pytest.approx(NOW + 3600)
+
+    def test_rate_is_smoothed_across_fetches(self):
+        scheduler = _scheduler()
+        published = [NOW - 7200 + i * 1800 for i in range(5)]
+        scheduler.observe(URL, {"fetched_at": NOW, "new": 5, "published": published})
+        # 之后 1 小时内来了 8 条：观测 8 条/小时，与旧值 2 按 RATE_SMOOTHING 混合
+        source = scheduler.observe(URL, {"fetched_at": NOW + 3600, "new": 8})
+
+        expected = 2.0 * (1 - polling.RATE_SMOOTHING) + 8.0 * polling.RATE_SMOOTHING
+        assert source.rate == pytest.approx(expected)
+        assert source.interval == pytest.approx(2 / expected * 3600)
+
+    def test_interval_backs_off_without_rate(self):
+        scheduler = _scheduler()
+        source = scheduler.observe(URL, {"fetched_at": NOW, "new": 0, "published": []})
+        assert source.rate is None
+        assert source.interval == pytest.approx(3600 * polling.IDLE_BACKOFF)
+
+        source = scheduler.observe(URL, {"fetched_at": NOW + 7200, "new": 0})
+        assert source.rate == 0
+        assert source.interval == pytest.approx(3600 * polling.IDLE_BACKOFF ** 2)
+
+    def test_ttl_and_max_age_are_a_floor(self):
+        scheduler = _scheduler()
+        # 10 条/小时 -> 12 分钟，低于 min_interval，但 ttl 要求至少 60 分钟
+        published = [NOW - 3600 + i * 360 for i in range(11)]
+        source = scheduler.observe(URL, {"fetched_at": NOW, "new": 11, "published": published, "ttl": 60})
+        assert source.interval == pytest.approx(3600)
+
+        source = scheduler.observe(URL, {"fetched_at": NOW + 3600, "new": 10, "max_age": 5400})
+        assert source.ttl is None
+        assert source.interval == pytest.approx(5400)
+
+    def test_interval_is_clamped(self):
+        scheduler = _scheduler()
+        busy = [NOW - 600 + i * 10 for i in range(61)]
+        assert scheduler.observe(URL, {"fetched_at": NOW, "new": 61, "published": busy}).interval == 900
+
+        scheduler = _scheduler()
+        # ttl 要求 2 天，仍不超过 max_interval
+        source = scheduler.observe(URL, {"fetched_at": NOW, "new": 0, "ttl": 2880})
+        assert source.interval == 86400
+
+        states = [dict(source.as_dict(), interval=10)]
+        restored = PollingScheduler(900, 86400, 3600)
+        restored.load(states)
+        assert restored.sources[URL].interval == 900
+
+    def test_stale_heap_entries_are_skipped(self):
+        scheduler = _scheduler()
+        assert [s.url for s in scheduler.pop_due(NOW)] == [URL]
+        # pop_due 预排在 NOW + 3600；observe 改排到更晚，旧堆项随之过期
+        published = [NOW - 86400 + i * 21600 for i in range(5)]
+        scheduler.observe(URL, {"fetched_at": NOW, "new": 5, "published": published})
+        source = scheduler.sources[URL]
+        assert source.next_due > NOW + 3600
+
+        assert scheduler.pop_due(NOW + 3600) == []
+        assert scheduler.next_due() == source.next_due
+        assert [s.url for s in scheduler.pop_due(source.next_due)] == [URL]
+        assert source.polls == 2
+
+    def test_removed_sources_are_not_dispatched(self):
+        scheduler = _scheduler()
+        scheduler.sync_sources([], now=NOW)
+        assert scheduler.pop_due(NOW + 86400) == []
+        assert scheduler.next_due() is None
+
+    def test_observe_ignores_old_or_unknown_results(self):
+        scheduler = _scheduler()
+        published = [NOW - 7200 + i * 1800 for i in range(5)]
+        scheduler.observe(URL, {"fetched_at": NOW, "new": 5, "published": published})
+        assert scheduler.observe(URL, {"fetched_at": NOW, "new": 50}) is None
+        assert scheduler.observe("https://unknown.example.com/", {"fetched_at": NOW + 60}) is None
+        assert scheduler.sources[URL].rate == pytest.approx(2.0)
+
+    def test_simulation_fetches_less_than_fixed_polling(self):
+        days = 3
+        feeds = bench_polling.make_feeds(days, seed=1)
+        fixed = bench_polling.simulate(feeds, days)
+        adaptive = bench_polling.simulate(feeds, days, PollingScheduler(900, 86400, 3600, 2))
+
+        def total(result):
+            return sum(polls for polls, _ in result.values())
+
+        def median(delays):
+            return sorted(delays)[len(delays) // 2]
+
+        assert total(fixed) == 70 * 24 * days
+        assert total(adaptive) < total(fixed) * 0.6
+        # 高频源拉得更勤，新条目延迟更短
+        assert adaptive["busy"][0] > fixed["busy"][0]
+        assert median(adaptive["busy"][1]) < median(fixed["busy"][1])
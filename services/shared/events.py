@@ -0,0 +1,40 @@
+# 事件流
+# 每种事件一个 Redis Stream (antiLLMade:events:{type})，消费者只订阅自己关心的类型。
+# 流条目只有一个字段 d：msgpack 编码的事件数据 (时间取流 ID，不再单独保存)。
+# XADD 带近似 MAXLEN (~) 限制流长度；已被消费的旧事件由 digest-service 的压缩任务折叠进快照后按 MINID 裁剪。
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+import msgpack
+
+STREAM_PREFIX = "antiLLMade:events:"
+# 旧版本所有事件写入同一个流，字段为 type / data(JSON) / timestamp；
+# digest-service 启动时把其中未确认的 entry.summarized 补写进日报后删除该流
+LEGACY_STREAM = "antiLLMade:events"
+STREAM_MAXLEN = int(os.getenv("EVENT_STREAM_MAXLEN", "100000"))
+
+
+def stream_key(event_type: str) -> str:
+    return f"{STREAM_PREFIX}{event_type}"
+
+
+def encode(data: Dict[str, Any]) -> Dict[str, bytes]:
+    return {"d": msgpack.packb(data, use_bin_type=True, default=str)}
+
+
+def decode(fields: Optional[Dict[bytes, bytes]]) -> Optional[Dict[str, Any]]:
+    """流条目 -> 事件数据；兼容旧版 JSON 条目 (回放 LEGACY_STREAM 时)，已被删除的条目 (字段为空) 返回 None"""
+    if not fields:
+        return None
+    if b"d" in fields:
+        return msgpack.unpackb(fields[b"d"], raw=False)
+    if b"data" in fields:
+        return json.loads(fields[b"data"])
+    return None
+
+
+def xadd_kwargs(maxlen: int = STREAM_MAXLEN) -> Dict[str, Any]:
+    """XADD 的裁剪参数：近似裁剪只在整个宏节点可删除时才删除，开销可以忽略"""
+    return {"maxlen": maxlen, "approximate": True} if maxlen > 0 else {}
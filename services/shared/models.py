@@ -11,6 +11,7 @@ class Source(BaseModel):
     url: str
     title: str
     category: str
+    weight: float = 1.0
 
 
 class Entry(BaseModel):
@@ -55,6 +56,16 @@ class EntrySummarizedEvent(BaseModel):
     entry_id: int
     summary: str
     model: str
+    # 日报所需的其余字段，digest-service 据此增量更新当日日报而无需回查 data-service
+    source_id: int
+    title: str
+    link: str
+    content: str
+    published_at: datetime
+    category: str
+    source_title: str
+    # 来源权重 (source-service 配置)，日报 rank=score 时使用
+    source_weight: float = 1.0
 
 
 class DigestReadyEvent(BaseModel):
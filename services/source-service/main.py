@@ -2,7 +2,7 @@
 # 独立的订阅源管理微服务
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from contextlib import asynccontextmanager
 from datetime import datetime
 import sqlite3
@@ -23,6 +23,12 @@ class SourceCreate(BaseModel):
     url: str
     title: str
     category: str = "默认"
+    # 排序时的来源权重 (日报 rank=score)，与后端 sources.weight 含义一致
+    weight: float = Field(default=1.0, ge=0)
+
+
+class SourceWeight(BaseModel):
+    weight: float = Field(ge=0)
 
 
 class SourceResponse(BaseModel):
@@ -30,6 +36,7 @@ class SourceResponse(BaseModel):
     url: str
     title: str
     category: str
+    weight: float = 1.0
 
 
 class SourceMeta(BaseModel):
@@ -54,6 +61,10 @@ def init_db():
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        try:
+            conn.execute("ALTER TABLE sources ADD COLUMN weight REAL NOT NULL DEFAULT 1.0")
+        except sqlite3.OperationalError:
+            pass  # 列已存在
 
 
 def get_conn():
@@ -72,7 +83,7 @@ def health():
 def list_sources():
     with get_conn() as conn:
         rows = conn.execute(
-            "SELECT id, url, title, category FROM sources ORDER BY id DESC"
+            "SELECT id, url, title, category, weight FROM sources ORDER BY id DESC"
         ).fetchall()
         return [dict(row) for row in rows]
 
@@ -111,8 +122,8 @@ def list_sources_with_meta():
 def create_source(payload: SourceCreate):
     with get_conn() as conn:
         cursor = conn.execute(
-            "INSERT OR IGNORE INTO sources (url, title, category) VALUES (?, ?, ?)",
-            (payload.url, payload.title, payload.category),
+            "INSERT OR IGNORE INTO sources (url, title, category, weight) VALUES (?, ?, ?, ?)",
+            (payload.url, payload.title, payload.category, payload.weight),
         )
         if cursor.lastrowid:
             source_id = cursor.lastrowid
@@ -123,12 +134,25 @@ def create_source(payload: SourceCreate):
             ).fetchone()["id"]
 
         row = conn.execute(
-            "SELECT id, url, title, category FROM sources WHERE id = ?",
+            "SELECT id, url, title, category, weight FROM sources WHERE id = ?",
             (source_id,),
         ).fetchone()
         return dict(row)
 
 
+@app.put("/sources/{source_id}/weight", response_model=SourceResponse)
+def update_source_weight(source_id: int, payload: SourceWeight):
+    with get_conn() as conn:
+        conn.execute("UPDATE sources SET weight = ? WHERE id = ?", (payload.weight, source_id))
+        row = conn.execute(
+            "SELECT id, url, title, category, weight FROM sources WHERE id = ?",
+            (source_id,),
+        ).fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Source not found")
+        return dict(row)
+
+
 @app.delete("/sources/{source_id}")
 def delete_source(source_id: int):
     with get_conn() as conn:
@@ -141,7 +165,7 @@ def delete_source(source_id: int):
 def get_source(source_id: int):
     with get_conn() as conn:
         row = conn.execute(
-            "SELECT id, url, title, category FROM sources WHERE id = ?",
+            "SELECT id, url, title, category, weight FROM sources WHERE id = ?",
             (source_id,),
         ).fetchone()
         if not row:
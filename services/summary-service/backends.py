@@ -0,0 +1,202 @@
+# 摘要后端注册表
+# OpenAI 兼容接口 / 本地抽取式摘要 / 确定性 stub，通过 SUMMARY_BACKEND 切换
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from textwrap import shorten
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+
+SUMMARY_BACKEND = os.getenv("SUMMARY_BACKEND", "")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# 自建的 OpenAI 兼容服务 (vLLM / llama.cpp / 本地 stub) 只需改这里
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "20"))
+
+SYSTEM_PROMPT = "你是新闻摘要助手。请给出一句话总结，并列出2-3条关键信息。"
+MAX_INPUT_CHARS = 6000
+SUMMARY_WIDTH = 240
+
+
+class SummaryBackend:
+    """摘要后端基类，summarize 返回 None 表示交给调用方回退"""
+
+    name = "base"
+    model = "none"
+
+    async def summarize(self, text: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def stream(self, text: str) -> AsyncIterator[str]:
+        """逐段产出摘要；不支持流式的后端一次性产出完整结果"""
+        summary = await self.summarize(text)
+        if summary:
+            yield summary
+
+    async def aclose(self) -> None:
+        return None
+
+
+class OpenAICompatibleBackend(SummaryBackend):
+    """任意实现了 /chat/completions 的 OpenAI 兼容服务"""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        base_url: str = OPENAI_BASE_URL,
+        api_key: Optional[str] = OPENAI_API_KEY,
+        model: str = OPENAI_MODEL,
+        timeout: float = OPENAI_TIMEOUT,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        # 自建服务通常不校验 key
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _payload(self, text: str, stream: bool = False) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": text[:MAX_INPUT_CHARS]},
+            ],
+            "temperature": 0.3,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def summarize(self, text: str) -> Optional[str]:
+        try:
+            response = await self._client.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._headers(),
+                json=self._payload(text),
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data["choices"][0]["message"]["content"].strip()
+        except Exception as e:
+            print(f"OpenAI-compatible backend error ({self.base_url}): {e}")
+            return None
+
+    async def stream(self, text: str) -> AsyncIterator[str]:
+        """转发上游 SSE 的 delta 内容，错误交给调用方处理"""
+        async with self._client.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json=self._payload(text, stream=True),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    yield delta
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[。！？!?；;])|(?<=\.)\s+")
+_TOKEN = re.compile(r"[一-鿿]|[A-Za-z0-9]+")
+_CJK_GAP = re.compile(r"(?<=[。！？；])\s+")
+
+
+class ExtractiveBackend(SummaryBackend):
+    """本地抽取式摘要：按词频给句子打分，按原文顺序拼出前几句"""
+
+    name = "extractive"
+    model = "local-extractive"
+
+    def __init__(self, max_sentences: int = 3, width: int = SUMMARY_WIDTH):
+        self.max_sentences = max_sentences
+        self.width = width
+
+    def extract(self, text: str) -> str:
+        sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and s.strip()]
+        if len(sentences) <= 1:
+            return shorten(text, width=self.width, placeholder="...")
+
+        freq = Counter(token.lower() for token in _TOKEN.findall(text))
+        scored = []
+        for index, sentence in enumerate(sentences):
+            tokens = [token.lower() for token in _TOKEN.findall(sentence)]
+            if not tokens:
+                continue
+            score = sum(freq[token] for token in tokens) / len(tokens)
+            scored.append((score, index))
+
+        top = sorted(scored, reverse=True)[: self.max_sentences]
+        picked: List[str] = [sentences[index] for _, index in sorted(top, key=lambda item: item[1])]
+        # 中文句子之间不需要空格
+        joined = _CJK_GAP.sub("", " ".join(picked))
+        return shorten(joined, width=self.width, placeholder="...")
+
+    async def summarize(self, text: str) -> Optional[str]:
+        return self.extract(text)
+
+
+class StubBackend(SummaryBackend):
+    """确定性 stub：同样的输入永远得到同样的输出，不依赖网络"""
+
+    name = "stub"
+    model = "stub"
+
+    @staticmethod
+    def render(text: str) -> str:
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+        return f"[stub:{digest}] " + shorten(text, width=120, placeholder="...")
+
+    async def summarize(self, text: str) -> Optional[str]:
+        return self.render(text)
+
+
+_REGISTRY: Dict[str, Callable[[], SummaryBackend]] = {}
+
+
+def register_backend(name: str, factory: Callable[[], SummaryBackend]) -> None:
+    """注册摘要后端工厂"""
+    _REGISTRY[name] = factory
+
+
+def available_backends() -> List[str]:
+    return sorted(_REGISTRY)
+
+
+def default_backend_name() -> str:
+    if SUMMARY_BACKEND:
+        return SUMMARY_BACKEND
+    return "openai" if OPENAI_API_KEY else "extractive"
+
+
+def create_backend(name: Optional[str] = None) -> SummaryBackend:
+    """按名称创建后端，未指定时读取 SUMMARY_BACKEND"""
+    name = name or default_backend_name()
+    if name not in _REGISTRY:
+        raise ValueError(f"Unknown summary backend: {name} (available: {', '.join(available_backends())})")
+    return _REGISTRY[name]()
+
+
+register_backend("openai", OpenAICompatibleBackend)
+register_backend("extractive", ExtractiveBackend)
+register_backend("stub", StubBackend)
@@ -0,0 +1,149 @@
+# 摘要请求优先级队列
+# interactive / ingest / backfill 三条通道，按权重做平滑加权轮询 (smooth WRR)
+# 通道空闲时其余通道可以用满全部并发，繁忙时交互请求按权重优先出队
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Literal, Tuple
+
+Lane = Literal["interactive", "ingest", "backfill"]
+LANES = ("interactive", "ingest", "backfill")
+# 未声明 priority 的调用方 (旧客户端、回填脚本) 走 ingest，不与用户请求争抢；网关会为用户请求显式标记 interactive
+DEFAULT_LANE = "ingest"
+DEFAULT_WEIGHTS = {"interactive": 8, "ingest": 3, "backfill": 1}
+WAIT_SAMPLES = 1024  # 每条通道保留最近 N 次排队耗时用于分位数
+
+
+def parse_weights(raw: str) -> Dict[str, int]:
+    """解析 "interactive=8,ingest=3,backfill=1" 形式的权重配置"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        lane, value = part.split("=", 1)
+        lane = lane.strip()
+        if lane in weights:
+            weights[lane] = max(int(value), 1)
+    return weights
+
+
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+SUMMARY_LANE_WEIGHTS = parse_weights(os.getenv("SUMMARY_LANE_WEIGHTS", ""))
+SUMMARY_MAX_QUEUE = int(os.getenv("SUMMARY_MAX_QUEUE", "10000"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class _Lane:
+    def __init__(self, name: str, weight: int):
+        self.name = name
+        self.weight = weight
+        self.current = 0  # smooth WRR 的当前权重
+        self.items: Deque[Tuple[float, Callable[[], Awaitable[Any]], asyncio.Future]] = deque()
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class LaneScheduler:
+    """固定数量的 worker 从多条优先级通道按权重取任务"""
+
+    def __init__(
+        self,
+        weights: Dict[str, int] = SUMMARY_LANE_WEIGHTS,
+        concurrency: int = SUMMARY_CONCURRENCY,
+        max_queue: int = SUMMARY_MAX_QUEUE,
+    ):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.lanes = {name: _Lane(name, weights.get(name, 1)) for name in LANES}
+        self._pending = asyncio.Semaphore(0)
+        self._workers: List[asyncio.Task] = []
+        self.in_flight = 0
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, lane: str, job: Callable[[], Awaitable[Any]]) -> Any:
+        """放入对应通道，轮到时执行 job 并返回其结果"""
+        queue = self.lanes.get(lane) or self.lanes[DEFAULT_LANE]
+        if len(queue.items) >= self.max_queue:
+            raise QueueFullError(f"lane {queue.name} is full")
+        future = asyncio.get_running_loop().create_future()
+        queue.items.append((time.monotonic(), job, future))
+        queue.submitted += 1
+        self._pending.release()
+        return await future
+
+    def _next_lane(self) -> _Lane:
+        """smooth WRR：只在非空通道之间分配"""
+        ready = [lane for lane in self.lanes.values() if lane.items]
+        total = sum(lane.weight for lane in ready)
+        best = None
+        for lane in ready:
+            lane.current += lane.weight
+            if best is None or lane.current > best.current:
+                best = lane
+        best.current -= total
+        return best
+
+    async def _worker(self) -> None:
+        while True:
+            await self._pending.acquire()
+            lane = self._next_lane()
+            enqueued_at, job, future = lane.items.popleft()
+            lane.waits.append(time.monotonic() - enqueued_at)
+            if future.cancelled():
+                continue
+            self.in_flight += 1
+            try:
+                result = await job()
+                lane.completed += 1
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                lane.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.in_flight -= 1
+
+    def metrics(self) -> dict:
+        lanes = {}
+        for name, lane in self.lanes.items():
+            waits = list(lane.waits)
+            lanes[name] = {
+                "weight": lane.weight,
+                "depth": len(lane.items),
+                "submitted": lane.submitted,
+                "completed": lane.completed,
+                "failed": lane.failed,
+                "wait_ms_p50": round(_percentile(waits, 50) * 1000, 2),
+                "wait_ms_p99": round(_percentile(waits, 99) * 1000, 2),
+                "wait_ms_max": round(max(waits, default=0.0) * 1000, 2),
+            }
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "lanes": lanes,
+        }
@@ -1,25 +1,42 @@
 # AI Summary Service
 # 独立的 AI 摘要生成微服务
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import httpx
+import asyncio
+import hashlib
+import json
 import os
 from contextlib import asynccontextmanager
+from textwrap import shorten
+from typing import Any, Awaitable, Callable, Optional
+
+from backends import SummaryBackend, create_backend, default_backend_name
+from lanes import DEFAULT_LANE, Lane, LaneScheduler, QueueFullError
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
 # 简单的内存缓存 (生产环境用 Redis)
 _cache = {}
 
+backend: Optional[SummaryBackend] = None
+scheduler: Optional[LaneScheduler] = None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global backend, scheduler
+    backend = create_backend()
+    scheduler = LaneScheduler()
+    scheduler.start()
     # 启动时连接 Redis (可选)
-    print(f"Summary Service started, REDIS_URL={REDIS_URL}")
+    print(f"Summary Service started, backend={backend.name}, model={backend.model}, REDIS_URL={REDIS_URL}")
     yield
     # 清理
+    await scheduler.stop()
+    await backend.aclose()
+
 
 app = FastAPI(title="AI Summary Service", lifespan=lifespan)
 
@@ -27,75 +44,142 @@ app = FastAPI(title="AI Summary Service", lifespan=lifespan)
 class SummarizeRequest(BaseModel):
     text: str
     use_cache: bool = True
+    # interactive: 用户触发 / ingest: 定时拉取 / backfill: 批量回填
+    priority: Lane = DEFAULT_LANE
 
 
 class SummarizeResponse(BaseModel):
     summary: str
     cached: bool = False
-    model: str = OPENAI_MODEL
+    model: str = ""
+
+
+def _get_backend() -> SummaryBackend:
+    global backend
+    if backend is None:
+        backend = create_backend()
+    return backend
+
+
+def _cache_key(active: SummaryBackend, text: str) -> str:
+    return hashlib.sha256(f"{active.name}:{active.model}:{text}".encode("utf-8")).hexdigest()
+
+
+async def _run_in_lane(priority: str, job: Callable[[], Awaitable[Any]]) -> Any:
+    if scheduler is None:
+        return await job()
+    return await scheduler.submit(priority, job)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "summary"}
+    return {"status": "ok", "service": "summary", "backend": default_backend_name()}
+
+
+@app.get("/metrics")
+def metrics():
+    """各优先级通道的队列深度与排队耗时"""
+    if scheduler is None:
+        return {"concurrency": 0, "in_flight": 0, "lanes": {}}
+    return scheduler.metrics()
 
 
 @app.post("/summarize", response_model=SummarizeResponse)
 async def summarize(request: SummarizeRequest):
-    # 缓存检查
-    if request.use_cache:
-        cache_key = request.text[:100]  # 简化缓存键
-        if cache_key in _cache:
-            return SummarizeResponse(summary=_cache[cache_key], cached=True)
+    active = _get_backend()
 
     # 清理文本
     cleaned = " ".join(request.text.split())
     if not cleaned:
-        return SummarizeResponse(summary="暂无可用内容。")
+        return SummarizeResponse(summary="暂无可用内容。", model=active.model)
 
-    # OpenAI 摘要
-    if OPENAI_API_KEY:
-        summary = await _summarize_with_openai(cleaned)
-        if summary:
-            _cache[cache_key] = summary
-            return SummarizeResponse(summary=summary)
+    # 缓存检查
+    cache_key = _cache_key(active, cleaned)
+    if request.use_cache and cache_key in _cache:
+        return SummarizeResponse(summary=_cache[cache_key], cached=True, model=active.model)
+
+    try:
+        summary = await _run_in_lane(request.priority, lambda: active.summarize(cleaned))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if summary:
+        _cache[cache_key] = summary
+        return SummarizeResponse(summary=summary, model=active.model)
 
     # 回退: 文本截取
-    from textwrap import shorten
     summary = shorten(cleaned, width=240, placeholder="...")
-    return SummarizeResponse(summary=summary)
+    return SummarizeResponse(summary=summary, model="truncate")
 
 
-async def _summarize_with_openai(text: str) -> str | None:
-    """调用 OpenAI API 生成摘要"""
-    try:
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "model": OPENAI_MODEL,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "你是新闻摘要助手。请给出一句话总结，并列出2-3条关键信息。",
-                },
-                {"role": "user", "content": text[:6000]},
-            ],
-            "temperature": 0.3,
-        }
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
-    except Exception as e:
-        print(f"OpenAI API error: {e}")
-        return None
+@app.post("/summarize/stream")
+async def summarize_stream(request: SummarizeRequest):
+    """
+    SSE 流式摘要
+    token 事件逐段转发上游输出，done 事件给出完整摘要；缓存命中时只发一个 done 事件
+    """
+    active = _get_backend()
+    cleaned = " ".join(request.text.split())
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    if not cleaned:
+        done = {"summary": "暂无可用内容。", "cached": False, "model": active.model}
+        return StreamingResponse(iter([_sse("done", done)]), media_type="text/event-stream", headers=headers)
+
+    cache_key = _cache_key(active, cleaned)
+    if request.use_cache and cache_key in _cache:
+        done = {"summary": _cache[cache_key], "cached": True, "model": active.model}
+        return StreamingResponse(iter([_sse("done", done)]), media_type="text/event-stream", headers=headers)
+
+    tokens: asyncio.Queue = asyncio.Queue()
+
+    async def produce() -> dict:
+        # 在通道 worker 中执行，客户端断开也会跑完并写入缓存
+        parts = []
+        try:
+            async for chunk in active.stream(cleaned):
+                parts.append(chunk)
+                tokens.put_nowait(chunk)
+        except Exception as e:
+            print(f"Summary stream error: {e}")
+            if not parts:
+                return {"summary": shorten(cleaned, width=240, placeholder="..."), "cached": False, "model": "truncate"}
+            return {"summary": "".join(parts).strip(), "cached": False, "model": active.model}
+        finally:
+            tokens.put_nowait(None)
+        summary = "".join(parts).strip()
+        if not summary:
+            return {"summary": shorten(cleaned, width=240, placeholder="..."), "cached": False, "model": "truncate"}
+        _cache[cache_key] = summary
+        return {"summary": summary, "cached": False, "model": active.model}
+
+    async def run() -> dict:
+        try:
+            return await _run_in_lane(request.priority, produce)
+        except QueueFullError:
+            # 排队失败时 produce 不会执行，需要手动结束 token 流
+            tokens.put_nowait(None)
+            raise
+
+    task = asyncio.create_task(run())
+
+    async def events():
+        while True:
+            chunk = await tokens.get()
+            if chunk is None:
+                break
+            yield _sse("token", {"text": chunk})
+        try:
+            done = await task
+        except QueueFullError as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+        yield _sse("done", done)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
 
 
 # gRPC 端口 (可选)
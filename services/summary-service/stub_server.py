@@ -0,0 +1,176 @@
+# OpenAI 兼容的本地 Stub LLM 服务
+# 用于离线压测 ingest → summarize → digest 全链路，可配置延迟、错误率与限流
+#
+# 启动:
+#   python stub_server.py --port 9000 --latency-ms 400 --error-rate 0.02 --rate-limit 20
+# 然后让 summary-service 指向它:
+#   SUMMARY_BACKEND=openai OPENAI_BASE_URL=http://localhost:9000/v1
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from typing import List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from backends import StubBackend
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "200"))
+STUB_JITTER_MS = float(os.getenv("STUB_JITTER_MS", "50"))
+STUB_TOKEN_MS = float(os.getenv("STUB_TOKEN_MS", "20"))  # 流式输出时每个分片的间隔
+STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+STUB_RATE_LIMIT = float(os.getenv("STUB_RATE_LIMIT", "0"))  # 每秒请求数，0 表示不限
+STUB_BURST = int(os.getenv("STUB_BURST", "0"))
+
+app = FastAPI(title="Stub LLM Server")
+
+
+class TokenBucket:
+    """与上游供应商类似的令牌桶限流"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1) if burst else max(int(rate), 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> Optional[float]:
+        """成功返回 None，否则返回建议的重试秒数"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return (1 - self.tokens) / self.rate
+
+
+class StubConfig:
+    latency_ms = STUB_LATENCY_MS
+    jitter_ms = STUB_JITTER_MS
+    token_ms = STUB_TOKEN_MS
+    error_rate = STUB_ERROR_RATE
+    bucket: Optional[TokenBucket] = TokenBucket(STUB_RATE_LIMIT, STUB_BURST) if STUB_RATE_LIMIT > 0 else None
+
+
+stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class ChatCompletionRequest(BaseModel):
+    model: str = "stub"
+    messages: List[ChatMessage]
+    temperature: float = 0.3
+    stream: bool = False
+
+
+_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+async def _stream_chunks(completion_id: str, model: str, content: str):
+    """按 OpenAI 的 chat.completion.chunk 格式逐词输出"""
+    for piece in _CHUNK.findall(content):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(StubConfig.token_ms / 1000)
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "service": "stub-llm", **stats}
+
+
+@app.get("/v1/models")
+def list_models():
+    return {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: ChatCompletionRequest):
+    stats["requests"] += 1
+
+    if StubConfig.bucket is not None:
+        retry_after = StubConfig.bucket.take()
+        if retry_after is not None:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                headers={"Retry-After": f"{retry_after:.3f}"},
+            )
+
+    delay = StubConfig.latency_ms + random.uniform(-StubConfig.jitter_ms, StubConfig.jitter_ms)
+    await asyncio.sleep(max(delay, 0) / 1000)
+
+    if random.random() < StubConfig.error_rate:
+        stats["errors"] += 1
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"message": "Injected failure", "type": "server_error"}},
+        )
+
+    user_text = next((m.content for m in reversed(request.messages) if m.role == "user"), "")
+    content = StubBackend.render(user_text)
+    completion_id = f"chatcmpl-stub-{stats['requests']}"
+    if request.stream:
+        return StreamingResponse(
+            _stream_chunks(completion_id, request.model, content),
+            media_type="text/event-stream",
+        )
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": len(user_text),
+            "completion_tokens": len(content),
+            "total_tokens": len(user_text) + len(content),
+        },
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=STUB_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=STUB_JITTER_MS)
+    parser.add_argument("--token-ms", type=float, default=STUB_TOKEN_MS)
+    parser.add_argument("--error-rate", type=float, default=STUB_ERROR_RATE)
+    parser.add_argument("--rate-limit", type=float, default=STUB_RATE_LIMIT, help="requests per second, 0 = unlimited")
+    parser.add_argument("--burst", type=int, default=STUB_BURST)
+    args = parser.parse_args()
+
+    StubConfig.latency_ms = args.latency_ms
+    StubConfig.jitter_ms = args.jitter_ms
+    StubConfig.token_ms = args.token_ms
+    StubConfig.error_rate = args.error_rate
+    StubConfig.bucket = TokenBucket(args.rate_limit, args.burst) if args.rate_limit > 0 else None
+
+    uvicorn.run(app, host=args.host, port=args.port)